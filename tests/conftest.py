@@ -30,6 +30,18 @@ assert any(
     app in INSTALLED_APPS for app in ["posts.apps.PostsConfig", "posts"]
 ), "Пожалуйста зарегистрируйте приложение в `settings.INSTALLED_APPS`"
 
+import pytest
+
+from core.test_runner import temporary_caches
+
+
+@pytest.fixture(autouse=True, scope="session")
+def isolated_caches():
+    # Кэш сервера в файлах переживает перезапуск: тестам нужен свой.
+    with temporary_caches():
+        yield
+
+
 pytest_plugins = [
     "tests.fixtures.fixture_user",
     "tests.fixtures.fixture_data",
@@ -185,7 +185,7 @@ class TestFollow:
             "page_obj" in response.context
         ), "Проверьте, что передали переменную `page_obj` в контекст страницы `/follow/`"
         assert (
-            type(response.context["page_obj"]) == Page
+            isinstance(response.context["page_obj"], Page)
         ), "Проверьте, что переменная `page_obj` на странице `/follow/` типа `Page`"
         assert (
             len(response.context["page_obj"]) == 2
@@ -1,8 +1,10 @@
+from django.core.cache import cache
 from django.test import TestCase, Client
 
 
 class StaticPagesURLTests(TestCase):
     def setUp(self):
+        cache.clear()
         # Создаем неавторизованый клиент
         self.guest_client = Client()
 
@@ -1,11 +1,21 @@
 # файл about/urls.py
 from django.urls import path
+
+from core.page_cache import cache_anonymous_page
 from . import views
 
 
 app_name = "about"
 
 urlpatterns = [
-    path("author/", views.AboutAuthorView.as_view(), name="author"),
-    path("tech/", views.AboutTechView.as_view(), name="tech"),
+    path(
+        "author/",
+        cache_anonymous_page(views.AboutAuthorView.as_view()),
+        name="author",
+    ),
+    path(
+        "tech/",
+        cache_anonymous_page(views.AboutTechView.as_view()),
+        name="tech",
+    ),
 ]
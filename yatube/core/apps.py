@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = "core"
+
+    def ready(self):
+        from django.core.signals import request_started
+
+        from . import metrics, pool
+
+        metrics.install_template_timer()
+        request_started.connect(pool.check_connections)
@@ -0,0 +1,188 @@
+"""ASGI-вход для проекта на Django 2.2.
+
+В Django 2.2 нет ни ASGI-обработчика, ни асинхронных представлений,
+поэтому запрос по-прежнему обрабатывает WSGIHandler, но в пуле
+потоков, а в цикле событий остаются ввод-вывод с клиентом: тело
+запроса читается целиком до того, как занять поток, а готовый ответ
+отправляется уже после того, как поток освободился. Медленный клиент,
+который долго загружает картинку или читает страницу, занимает
+только сопрограмму, и один процесс держит сотни таких соединений
+при нескольких потоках. Потоковые ответы (выгрузки) передаются
+по кускам из потока, где они создаются, чтобы курсор базы и
+соединение оставались в своём потоке.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+# Тело запроса больше этого размера (как у загрузок Django) пишется
+# во временный файл, а не держится в памяти.
+SPOOL_SIZE = 2621440
+
+
+async def read_body(receive):
+    """Тело запроса из сообщений http.request; None, если клиент ушёл."""
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            body.close()
+            return None
+        body.write(message.get("body", b""))
+        if not message.get("more_body", False):
+            body.seek(0)
+            return body
+
+
+def environ(scope, body):
+    """WSGI environ по области ASGI."""
+    server = scope.get("server") or ("localhost", 80)
+    result = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        # WSGI ждёт путь в latin-1 поверх байтов UTF-8.
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": "HTTP/" + scope.get("http_version", "1.1"),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        result["REMOTE_ADDR"], port = scope["client"]
+        result["REMOTE_PORT"] = str(port)
+    for name, value in scope.get("headers", ()):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = "HTTP_" + name
+        value = value.decode("latin-1")
+        if name in result:
+            value = result[name] + "," + value
+        result[name] = value
+    return result
+
+
+class AsgiHandler:
+    """Приложение ASGI 3, выполняющее WSGI-приложение в пуле потоков."""
+
+    def __init__(self, wsgi_application, threads):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="asgi"
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f"Неподдерживаемый тип {scope['type']}")
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def http(self, scope, receive, send):
+        body = await read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        with body:
+            status, headers, content = await loop.run_in_executor(
+                self.executor,
+                self.call,
+                environ(scope, body),
+                _ThreadSender(loop, send),
+            )
+        if content is None:
+            return
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": headers,
+            }
+        )
+        await send({"type": "http.response.body", "body": content})
+
+    def call(self, environ, sender):
+        """Выполняет запрос в потоке пула.
+
+        Обычный ответ возвращается целиком, потоковый отправляется
+        отсюда по кускам, и тогда content равен None.
+        """
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers
+            ]
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            if isinstance(result, (list, tuple)) or not getattr(
+                result, "streaming", True
+            ):
+                content = b"".join(result)
+                return response["status"], response["headers"], content
+            sender.send(
+                {
+                    "type": "http.response.start",
+                    "status": response["status"],
+                    "headers": response["headers"],
+                }
+            )
+            for chunk in result:
+                if chunk:
+                    sender.send(
+                        {
+                            "type": "http.response.body",
+                            "body": chunk,
+                            "more_body": True,
+                        }
+                    )
+            sender.send({"type": "http.response.body", "body": b""})
+            return response["status"], response["headers"], None
+        finally:
+            # close() шлёт request_finished: соединения с базой этого
+            # потока закрываются в нём же.
+            if hasattr(result, "close"):
+                result.close()
+
+
+class _ThreadSender:
+    def __init__(self, loop, send):
+        self.loop = loop
+        self.send_coroutine = send
+
+    def send(self, message):
+        asyncio.run_coroutine_threadsafe(
+            self.send_coroutine(message), self.loop
+        ).result()
+
+
+def get_asgi_application():
+    """Как django.core.asgi.get_asgi_application() из Django 3."""
+    wsgi_application = get_wsgi_application()
+    return AsgiHandler(
+        wsgi_application, getattr(settings, "ASGI_THREADS", 8)
+    )
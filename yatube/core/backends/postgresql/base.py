@@ -0,0 +1,8 @@
+"""PostgreSQL с пулом соединений core.pool."""
+from django.db.backends.postgresql import base
+
+from core.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
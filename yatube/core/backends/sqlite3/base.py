@@ -0,0 +1,8 @@
+"""SQLite с пулом соединений core.pool."""
+from django.db.backends.sqlite3 import base
+
+from core.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
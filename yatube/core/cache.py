@@ -0,0 +1,280 @@
+"""Кэш в файле SQLite, общий для всех процессов одной машины.
+
+У LocMemCache каждый воркер gunicorn держит свою копию, и она пропадает
+при перезапуске. Этот бэкенд хранит записи в одном файле SQLite в
+режиме WAL: воркеры читают параллельно, а пишут по очереди. Объём
+ограничен числом записей (MAX_ENTRIES) и суммарным размером значений
+в байтах (MAX_SIZE); лишнее вытесняется по давности чтения (LRU).
+
+    CACHES = {
+        "default": {
+            "BACKEND": "core.cache.SQLiteCache",
+            "LOCATION": "/var/cache/yatube/default.sqlite3",
+            "OPTIONS": {"MAX_ENTRIES": 100000, "MAX_SIZE": 256 * 2 ** 20},
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+# Время чтения обновляется не чаще раза в ACCESS_RESOLUTION секунд,
+# иначе каждое попадание в кэш было бы записью в файл.
+ACCESS_RESOLUTION = 60
+BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE TABLE IF NOT EXISTS cache_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_totals VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_totals
+    SET entries = entries + 1, size = size + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache
+BEGIN
+    UPDATE cache_totals SET size = size - OLD.size + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_totals
+    SET entries = entries - 1, size = size - OLD.size;
+END;
+"""
+
+UPSERT = """
+INSERT INTO cache (key, value, size, expires, accessed)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    value = excluded.value,
+    size = excluded.size,
+    expires = excluded.expires,
+    accessed = excluded.accessed
+"""
+
+
+def _batches(items):
+    items = list(items)
+    for start in range(0, len(items), BATCH_SIZE):
+        yield items[start:start + BATCH_SIZE]
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get("OPTIONS", {})
+        self._max_size = options.get("MAX_SIZE", 64 * 2 ** 20)
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        # Соединение своё у каждого потока и каждого процесса: после
+        # fork() соединение родителя использовать нельзя.
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            self._local.db = self._connect()
+            self._local.pid = pid
+        return self._local.db
+
+    def _connect(self):
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+        db.execute("PRAGMA journal_mode = WAL")
+        db.execute("PRAGMA synchronous = NORMAL")
+        db.executescript(SCHEMA)
+        return db
+
+    @contextmanager
+    def _write(self):
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _store(self, db, key, value, timeout, now):
+        expires = self.get_backend_timeout(timeout)
+        if expires is not None and expires <= now:
+            db.execute("DELETE FROM cache WHERE key = ?", (key,))
+            return
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        db.execute(UPSERT, (key, data, len(data), expires, now))
+
+    def _cull(self, db, now):
+        entries, size = db.execute(
+            "SELECT entries, size FROM cache_totals"
+        ).fetchone()
+        if entries <= self._max_entries and size <= self._max_size:
+            return
+        db.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+        if self._cull_frequency == 0:
+            db.execute("DELETE FROM cache")
+            return
+        while True:
+            entries, size = db.execute(
+                "SELECT entries, size FROM cache_totals"
+            ).fetchone()
+            if entries <= self._max_entries and size <= self._max_size:
+                return
+            excess = max(entries - self._max_entries, 0)
+            db.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY accessed LIMIT ?)",
+                (max(excess, entries // self._cull_frequency, 1),),
+            )
+
+    def _fetch(self, keys, now):
+        """Живые значения по ключам; заодно отмечает время чтения."""
+        found = {}
+        stale = []
+        for batch in _batches(keys):
+            rows = self._db.execute(
+                "SELECT key, value, accessed FROM cache "
+                f"WHERE key IN ({', '.join('?' * len(batch))}) "
+                "AND (expires IS NULL OR expires > ?)",
+                (*batch, now),
+            )
+            for key, value, accessed in rows:
+                found[key] = pickle.loads(value)
+                if accessed < now - ACCESS_RESOLUTION:
+                    stale.append(key)
+        metrics.record_cache(len(found), len(keys) - len(found))
+        if stale:
+            self._db.executemany(
+                "UPDATE cache SET accessed = ? WHERE key = ?",
+                ((now, key) for key in stale),
+            )
+        return found
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as db:
+            exists = db.execute(
+                "SELECT 1 FROM cache WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                (key, now),
+            ).fetchone()
+            if exists:
+                return False
+            self._store(db, key, value, timeout, now)
+            self._cull(db, now)
+        return True
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._fetch([key], time.time()).get(key, default)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as db:
+            self._store(db, key, value, timeout, now)
+            self._cull(db, now)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as db:
+            updated = db.execute(
+                "UPDATE cache SET expires = ? WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                (self.get_backend_timeout(timeout), key, now),
+            ).rowcount
+        return bool(updated)
+
+    def incr(self, key, delta=1, version=None):
+        # В BaseCache это get() и set(), между которыми успел бы
+        # записать другой процесс.
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as db:
+            row = db.execute(
+                "SELECT value FROM cache WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            db.execute(
+                "UPDATE cache SET value = ?, size = ?, accessed = ? "
+                "WHERE key = ?",
+                (data, len(data), now, key),
+            )
+        return value
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        with self._write() as db:
+            deleted = db.execute(
+                "DELETE FROM cache WHERE key = ?", (key,)
+            ).rowcount
+        return bool(deleted)
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._db.execute(
+            "SELECT 1 FROM cache WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def get_many(self, keys, version=None):
+        cache_keys = {self._key(key, version): key for key in keys}
+        found = self._fetch(cache_keys, time.time())
+        return {cache_keys[key]: value for key, value in found.items()}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        with self._write() as db:
+            for key, value in data.items():
+                self._store(
+                    db, self._key(key, version), value, timeout, now
+                )
+            self._cull(db, now)
+        return []
+
+    def delete_many(self, keys, version=None):
+        cache_keys = [self._key(key, version) for key in keys]
+        with self._write() as db:
+            for batch in _batches(cache_keys):
+                db.execute(
+                    "DELETE FROM cache "
+                    f"WHERE key IN ({', '.join('?' * len(batch))})",
+                    batch,
+                )
+
+    def clear(self):
+        with self._write() as db:
+            db.execute("DELETE FROM cache")
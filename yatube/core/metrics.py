@@ -0,0 +1,236 @@
+"""Метрики запросов: время, SQL, шаблоны и кэш по каждому view.
+
+MetricsMiddleware заводит на запрос RequestStats, а счётчики в него
+пишут обёртка execute_wrapper вокруг SQL, обёртка Template.render и
+кэш core.cache.SQLiteCache. Итоги копятся в REGISTRY процесса:
+скользящее окно последних WINDOW запросов каждого view для
+перцентилей и накопительные суммы. /metrics отдаёт их в текстовом
+формате Prometheus; у каждого воркера gunicorn свой реестр.
+"""
+import contextvars
+import math
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.template.base import Template
+
+from . import pool
+
+WINDOW = 1000
+QUANTILES = (0.5, 0.9, 0.99)
+# Для журнала медленных запросов хватит первых запросов к БД.
+MAX_LOGGED_QUERIES = 50
+
+SUMMARIES = (
+    ("duration", "request_duration_seconds", "Время ответа view."),
+    ("queries", "db_queries", "Число SQL-запросов на ответ."),
+    ("db_time", "db_duration_seconds", "Время SQL-запросов на ответ."),
+    ("template_time", "template_duration_seconds", "Время рендера шаблонов."),
+)
+COUNTERS = (
+    ("cache_hits", "cache_hits_total", "Попадания в кэш."),
+    ("cache_misses", "cache_misses_total", "Промахи кэша."),
+)
+
+_current = contextvars.ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.sql = []
+        self._template_depth = 0
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += elapsed
+            if len(self.sql) < MAX_LOGGED_QUERIES:
+                self.sql.append((elapsed, sql))
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.windows = {name: deque(maxlen=WINDOW) for name, *_ in SUMMARIES}
+        self.sums = dict.fromkeys(self.windows, 0.0)
+        self.counters = {name: 0 for name, *_ in COUNTERS}
+        self.count = 0
+
+    def add(self, stats):
+        self.count += 1
+        for name in self.windows:
+            value = getattr(stats, name)
+            self.windows[name].append(value)
+            self.sums[name] += value
+        for name in self.counters:
+            self.counters[name] += getattr(stats, name)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = defaultdict(ViewMetrics)
+
+    def record(self, view, stats):
+        with self._lock:
+            self._views[view].add(stats)
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+    def snapshot(self):
+        """Копия окон и сумм, чтобы не считать перцентили под замком."""
+        with self._lock:
+            return {
+                view: (
+                    {name: list(window) for name, window in m.windows.items()},
+                    dict(m.sums),
+                    dict(m.counters),
+                    m.count,
+                )
+                for view, m in self._views.items()
+            }
+
+
+REGISTRY = Registry()
+
+
+def start():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def current():
+    """RequestStats текущего запроса или None вне запроса."""
+    return _current.get()
+
+
+def record_cache(hits, misses):
+    stats = _current.get()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+def quantile(values, q):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = math.ceil(round(q * len(ordered), 9))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def render_prometheus(prefix="yatube"):
+    snapshot = sorted(REGISTRY.snapshot().items())
+    lines = []
+    for name, metric, help_text in SUMMARIES:
+        lines.append(f"# HELP {prefix}_{metric} {help_text}")
+        lines.append(f"# TYPE {prefix}_{metric} summary")
+        for view, (windows, sums, _, count) in snapshot:
+            label = f'view="{_label(view)}"'
+            for q in QUANTILES:
+                value = quantile(windows[name], q)
+                lines.append(
+                    f'{prefix}_{metric}{{{label},quantile="{q}"}} {value:g}'
+                )
+            lines.append(f"{prefix}_{metric}_sum{{{label}}} {sums[name]:g}")
+            lines.append(f"{prefix}_{metric}_count{{{label}}} {count}")
+    for name, metric, help_text in COUNTERS:
+        lines.append(f"# HELP {prefix}_{metric} {help_text}")
+        lines.append(f"# TYPE {prefix}_{metric} counter")
+        for view, (_, _, counters, _) in snapshot:
+            lines.append(
+                f'{prefix}_{metric}{{view="{_label(view)}"}} {counters[name]}'
+            )
+    lines.extend(_render_pools(prefix))
+    return "\n".join(lines) + "\n"
+
+
+def _render_pools(prefix):
+    pools = sorted(pool.pools().items())
+    if not pools:
+        return []
+    lines = [
+        f"# HELP {prefix}_db_pool_checkout_wait_seconds "
+        "Ожидание соединения из пула.",
+        f"# TYPE {prefix}_db_pool_checkout_wait_seconds summary",
+    ]
+    for alias, item in pools:
+        label = f'alias="{_label(alias)}"'
+        waits = list(item.waits) or [0.0]
+        for q in QUANTILES:
+            lines.append(
+                f"{prefix}_db_pool_checkout_wait_seconds"
+                f'{{{label},quantile="{q}"}} {quantile(waits, q):g}'
+            )
+        lines.append(
+            f"{prefix}_db_pool_checkout_wait_seconds_sum{{{label}}} "
+            f"{item.wait_sum:g}"
+        )
+        lines.append(
+            f"{prefix}_db_pool_checkout_wait_seconds_count{{{label}}} "
+            f"{item.checkouts}"
+        )
+    for metric, kind, attr, help_text in (
+        ("db_pool_size", "gauge", "size", "Открытые соединения пула."),
+        ("db_pool_idle", "gauge", "idle", "Свободные соединения пула."),
+        ("db_pool_max_size", "gauge", "max_size", "Предел размера пула."),
+        (
+            "db_pool_timeouts_total",
+            "counter",
+            "timeouts",
+            "Не дождались соединения.",
+        ),
+    ):
+        lines.append(f"# HELP {prefix}_{metric} {help_text}")
+        lines.append(f"# TYPE {prefix}_{metric} {kind}")
+        for alias, item in pools:
+            lines.append(
+                f'{prefix}_{metric}{{alias="{_label(alias)}"}} '
+                f"{getattr(item, attr)}"
+            )
+    return lines
+
+
+def install_template_timer():
+    """Оборачивает Template.render; вложенные include не считаются дважды."""
+    render = Template.render
+    if getattr(render, "timed", False):
+        return
+
+    def timed_render(self, context):
+        stats = _current.get()
+        if stats is None or stats._template_depth:
+            return render(self, context)
+        stats._template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            stats.template_time += time.perf_counter() - start
+            stats._template_depth -= 1
+
+    timed_render.timed = True
+    Template.render = timed_render
@@ -0,0 +1,56 @@
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger("core.metrics")
+
+
+class MetricsMiddleware:
+    """Меряет каждый запрос и пишет в журнал медленные вместе с SQL."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats, token = metrics.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(stats.execute_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            stats.finish()
+            metrics.stop(token)
+        match = request.resolver_match
+        view = match.view_name if match else "unresolved"
+        metrics.REGISTRY.record(view, stats)
+        self.log_if_slow(request, view, stats)
+        return response
+
+    def log_if_slow(self, request, view, stats):
+        threshold = getattr(settings, "METRICS_SLOW_REQUEST_MS", None)
+        if threshold is None or stats.duration * 1000 < threshold:
+            return
+        queries = "\n".join(
+            f"  {elapsed * 1000:.1f} мс  {sql}" for elapsed, sql in stats.sql
+        )
+        logger.warning(
+            "Медленный запрос %s %s (%s): %.0f мс, SQL %d за %.0f мс, "
+            "шаблоны %.0f мс, кэш %d/%d\n%s",
+            request.method,
+            request.path,
+            view,
+            stats.duration * 1000,
+            stats.queries,
+            stats.db_time * 1000,
+            stats.template_time * 1000,
+            stats.cache_hits,
+            stats.cache_hits + stats.cache_misses,
+            queries,
+        )
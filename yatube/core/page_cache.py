@@ -0,0 +1,96 @@
+"""Кэш целых страниц для анонимных посетителей.
+
+Страница кэшируется готовым HTML, но части, зависящие от посетителя
+(меню с именем пользователя), в кэш не попадают: тег {% hole %} на
+время рендера для кэша оставляет вместо них метку, а при каждой выдаче
+метки заменяются свежим рендером фрагмента — как ESI на CDN.
+Авторизованные посетители кэш не используют: их страницы рендерятся
+целиком.
+"""
+import hashlib
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+HOLE = "<!--page-hole:{}-->"
+_HOLE_RE = re.compile(r"<!--page-hole:([\w./-]+)-->")
+
+
+def hole_marker(template_name):
+    return mark_safe(HOLE.format(template_name))
+
+
+def is_cacheable_request(request):
+    return request.method in ("GET", "HEAD") and not (
+        request.user.is_authenticated
+    )
+
+
+def fill_holes(request, html):
+    fragments = {}
+
+    def replace(match):
+        name = match.group(1)
+        if name not in fragments:
+            fragments[name] = render_to_string(name, request=request)
+        return fragments[name]
+
+    return _HOLE_RE.sub(replace, html)
+
+
+def _key(request, version):
+    fingerprint = f"{request.get_full_path()}|{version}"
+    return "page:" + hashlib.md5(fingerprint.encode()).hexdigest()
+
+
+def serve(request, view, args, kwargs, version="", store=True):
+    """Ответ view из кэша страниц или свежий рендер, который туда кладётся.
+
+    version — строка, меняющаяся вместе с содержимым страницы.
+    store=False — рендер не кладётся в кэш, например если он мог
+    отстать от версии. PAGE_CACHE_TIMEOUT = 0 отключает кэш.
+    """
+    if not settings.PAGE_CACHE_TIMEOUT or not is_cacheable_request(request):
+        return view(request, *args, **kwargs)
+    key = _key(request, version)
+    html = cache.get(key)
+    if html is not None:
+        response = HttpResponse(fill_holes(request, html))
+        response["X-Page-Cache"] = "hit"
+        return response
+    if not store:
+        return view(request, *args, **kwargs)
+    request.page_cache_holes = True
+    response = view(request, *args, **kwargs)
+    if hasattr(response, "render") and not response.is_rendered:
+        response.render()
+    if (
+        response.status_code != 200
+        or response.streaming
+        or response.cookies
+        or request.META.get("CSRF_COOKIE_USED")
+    ):
+        # Страница с формой или куками принадлежит одному посетителю.
+        if not response.streaming:
+            response.content = fill_holes(request, response.content.decode())
+        return response
+    html = response.content.decode()
+    cache.set(key, html, settings.PAGE_CACHE_TIMEOUT)
+    response.content = fill_holes(request, html)
+    response["X-Page-Cache"] = "miss"
+    return response
+
+
+def cache_anonymous_page(view):
+    """Кэширует страницу без своих данных, например статическую."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return serve(request, view, args, kwargs)
+
+    return wrapper
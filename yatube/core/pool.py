@@ -0,0 +1,182 @@
+"""Пул соединений с базой внутри процесса и проверка их исправности.
+
+В Django 2.2 соединение либо открывается на каждый запрос
+(CONN_MAX_AGE = 0), либо живёт в своём потоке до CONN_MAX_AGE секунд.
+Движки core.backends.sqlite3 и core.backends.postgresql вместо
+закрытия возвращают соединение в общий пул алиаса, а новое берут
+из пула, так что потоки ASGI и gunicorn делят ограниченное число
+открытых соединений. Если все заняты, поток ждёт свободное не дольше
+POOL["TIMEOUT"] секунд. Время ожидания, размер пула и число выдач
+попадают в /metrics.
+
+CONN_HEALTH_CHECKS (как в Django 4.1) проверяет простым запросом
+соединение из пула перед выдачей и постоянное соединение в начале
+запроса: оборванное закрывается и открывается заново, а не роняет
+первый запрос после перезапуска базы.
+
+Пулы принадлежат процессу: после fork() ребёнок начинает с пустых,
+а соединения родителя не выдаёт, не возвращает в пул и не закрывает.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from django.db import OperationalError, connections
+
+WINDOW = 1000
+DEFAULTS = {"MAX_SIZE": 10, "TIMEOUT": 5}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """Ограниченный пул сырых соединений DB-API одного алиаса."""
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.size = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.waits = deque(maxlen=WINDOW)
+        self.wait_sum = 0.0
+        self._idle = deque()
+        self._condition = threading.Condition()
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    def checkout(self, connect):
+        """Свободное соединение или новое от connect(), если есть место."""
+        start = time.perf_counter()
+        with self._condition:
+            while not self._idle and self.size >= self.max_size:
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f"Нет свободного соединения за {self.timeout} с"
+                    )
+                self._condition.wait(remaining)
+            # Последнее возвращённое соединение — самое «тёплое».
+            raw = self._idle.pop() if self._idle else None
+            if raw is None:
+                self.size += 1
+            wait = time.perf_counter() - start
+            self.checkouts += 1
+            self.waits.append(wait)
+            self.wait_sum += wait
+        if raw is None:
+            try:
+                raw = connect()
+            except Exception:
+                self.discard(None)
+                raise
+        return raw
+
+    def checkin(self, raw):
+        with self._condition:
+            self._idle.append(raw)
+            self._condition.notify()
+
+    def discard(self, raw):
+        """Выводит соединение из пула, освобождая место под новое."""
+        if raw is not None:
+            try:
+                raw.close()
+            except Exception:
+                pass
+        with self._condition:
+            self.size -= 1
+            self._condition.notify()
+
+
+def _forget_pools():
+    global _pools_lock
+    # Блокировку мог держать поток родителя, которого в ребёнке нет.
+    _pools_lock = threading.Lock()
+    _pools.clear()
+
+
+os.register_at_fork(after_in_child=_forget_pools)
+
+
+def get_pool(alias, settings_dict):
+    with _pools_lock:
+        if alias not in _pools:
+            options = dict(DEFAULTS, **settings_dict.get("POOL", {}))
+            _pools[alias] = ConnectionPool(
+                options["MAX_SIZE"], options["TIMEOUT"]
+            )
+        return _pools[alias]
+
+
+def pools():
+    with _pools_lock:
+        return dict(_pools)
+
+
+def ping(raw):
+    """True, если соединение отвечает на простой запрос."""
+    try:
+        cursor = raw.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        finally:
+            cursor.close()
+    except Exception:
+        return False
+    return True
+
+
+class PooledDatabaseWrapperMixin:
+    """Подмешивается к DatabaseWrapper движка Django."""
+
+    def get_new_connection(self, conn_params):
+        pool = get_pool(self.alias, self.settings_dict)
+
+        def connect():
+            return super(PooledDatabaseWrapperMixin, self).get_new_connection(
+                conn_params
+            )
+
+        raw = pool.checkout(connect)
+        if self.settings_dict.get("CONN_HEALTH_CHECKS") and not ping(raw):
+            pool.discard(raw)
+            raw = pool.checkout(connect)
+        self._pool_pid = os.getpid()
+        return raw
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if getattr(self, "_pool_pid", None) != os.getpid():
+            # Соединение открыто до fork(): им распоряжается родитель.
+            return
+        pool = get_pool(self.alias, self.settings_dict)
+        try:
+            # Незавершённая транзакция не должна достаться другому.
+            self.connection.rollback()
+        except Exception:
+            pool.discard(self.connection)
+        else:
+            pool.checkin(self.connection)
+
+
+def check_connections(**kwargs):
+    """Закрывает оборванные постоянные соединения в начале запроса."""
+    for connection in connections.all():
+        if (
+            connection.connection is not None
+            and connection.settings_dict.get("CONN_HEALTH_CHECKS")
+            and not connection.in_atomic_block
+            and not connection.is_usable()
+        ):
+            connection.close()
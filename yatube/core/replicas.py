@@ -0,0 +1,121 @@
+"""Чтение с реплик базы и запись в основную.
+
+ReplicaMiddleware разрешает читать с реплик только безопасным
+запросам (GET, HEAD, OPTIONS); всё прочее, команды manage.py и
+фоновые потоки работают с основной базой. Как только запрос что-то
+пишет, его оставшиеся чтения тоже идут в основную базу, а браузер
+получает куку REPLICA_STICKY_COOKIE: пока она жива, запросы этого
+пользователя читают основную базу и видят свои записи, даже если
+реплики ещё не догнали её. Реплика выбирается одна на запрос, чтобы
+страница не смешивала данные реплик с разным отставанием.
+
+Реплики — алиасы из DATABASES, перечисленные в DATABASE_REPLICAS.
+Сессии всегда читаются из основной базы: иначе вход отставал бы
+на время репликации.
+
+Запись сразу меняет версии страниц в кэше, а реплика её ещё не видит:
+рендер с реплики под новой версией нельзя класть в кэши, иначе
+устаревшая страница жила бы до следующей записи. may_be_stale()
+сообщает, что версия моложе REPLICA_STICKY_SECONDS и читается реплика.
+"""
+import contextvars
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_STICKY_COOKIE = "db_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+PRIMARY_APPS = ("sessions",)
+NANOSECONDS = 10 ** 9
+
+_current = contextvars.ContextVar("replica_routing", default=None)
+
+
+class Routing:
+    """Состояние маршрутизации одного запроса."""
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+def replicas():
+    return list(getattr(settings, "DATABASE_REPLICAS", ()))
+
+
+def sticky_seconds():
+    return getattr(settings, "REPLICA_STICKY_SECONDS", 5)
+
+
+def reads_replica():
+    """Читает ли текущий запрос с реплики."""
+    routing = _current.get()
+    return (
+        routing is not None
+        and routing.replica is not None
+        and not routing.wrote
+    )
+
+
+def may_be_stale(*versions):
+    """Рендер по данным с версиями versions (в нс) мог отстать."""
+    if not versions or not reads_replica():
+        return False
+    lag = sticky_seconds() * NANOSECONDS
+    return time.time_ns() - max(versions) < lag
+
+
+class ReplicaRouter:
+    """None оставляет выбор Django: база объекта-подсказки или default."""
+
+    def db_for_read(self, model, **hints):
+        if not reads_replica() or model._meta.app_label in PRIMARY_APPS:
+            return None
+        return _current.get().replica
+
+    def db_for_write(self, model, **hints):
+        routing = _current.get()
+        if routing is not None and model._meta.app_label not in PRIMARY_APPS:
+            routing.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+class ReplicaMiddleware:
+    """Выбирает базу для чтения и ставит куку после записи."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        aliases = replicas()
+        readable = (
+            aliases
+            and request.method in SAFE_METHODS
+            and REPLICA_STICKY_COOKIE not in request.COOKIES
+        )
+        routing = Routing(random.choice(aliases) if readable else None)
+        token = _current.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        if routing.wrote and aliases:
+            response.set_cookie(
+                REPLICA_STICKY_COOKIE,
+                "1",
+                max_age=sticky_seconds(),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,15 @@
+from django import template
+from django.template.loader import render_to_string
+
+from core.page_cache import hole_marker
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name):
+    """Фрагмент посетителя: при рендере для кэша страниц — метка."""
+    request = context.get("request")
+    if getattr(request, "page_cache_holes", False):
+        return hole_marker(template_name)
+    return render_to_string(template_name, request=request)
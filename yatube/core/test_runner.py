@@ -0,0 +1,47 @@
+"""Тесты с отдельным пустым кэшем.
+
+Кэш в файлах SQLite общий для воркеров сервера и переживает
+перезапуск, поэтому тесты кладут его файлы во временный каталог:
+иначе страницы и версии из прошлого запуска подмешивались бы в тесты.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+@contextmanager
+def temporary_caches():
+    """Переносит файлы всех кэшей во временный каталог."""
+    directory = tempfile.mkdtemp(prefix="yatube-cache-")
+    caches = {
+        alias: dict(
+            config,
+            LOCATION=os.path.join(
+                directory, os.path.basename(config["LOCATION"])
+            ),
+        )
+        if config.get("LOCATION")
+        else config
+        for alias, config in settings.CACHES.items()
+    }
+    try:
+        with override_settings(CACHES=caches):
+            yield directory
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._stack = ExitStack()
+        self._stack.enter_context(temporary_caches())
+
+    def teardown_test_environment(self, **kwargs):
+        self._stack.close()
+        super().teardown_test_environment(**kwargs)
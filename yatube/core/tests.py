@@ -0,0 +1,531 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.utils import load_backend
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from posts import cards, versions
+from posts.models import Comment, Post
+
+from yatube.database import databases
+
+from . import asgi, metrics, page_cache, pool, replicas
+from .cache import ACCESS_RESOLUTION, SQLiteCache
+
+User = get_user_model()
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(
+            os.path.join(self.directory, "cache.sqlite3"),
+            {"OPTIONS": options},
+        )
+
+    def test_values_are_shared_between_instances(self):
+        """Два процесса с одним файлом видят записи друг друга."""
+        first, second = self.make_cache(), self.make_cache()
+        first.set("key", {"text": "значение"})
+        self.assertEqual(second.get("key"), {"text": "значение"})
+        second.delete("key")
+        self.assertIsNone(first.get("key"))
+
+    def test_expired_values_are_missing(self):
+        """Просроченная запись не отдаётся и не мешает add()."""
+        cache = self.make_cache()
+        cache.set("key", "old", timeout=1)
+        with mock.patch("time.time", return_value=time.time() + 2):
+            self.assertIsNone(cache.get("key"))
+            self.assertTrue(cache.add("key", "new"))
+        self.assertFalse(cache.add("key", "newer"))
+        self.assertEqual(cache.get("key"), "new")
+
+    def test_many_and_incr(self):
+        cache = self.make_cache()
+        cache.set_many({"a": 1, "b": 2})
+        self.assertEqual(cache.get_many(["a", "b", "c"]), {"a": 1, "b": 2})
+        self.assertEqual(cache.incr("a", 10), 11)
+        self.assertEqual(cache.decr("b"), 1)
+        with self.assertRaises(ValueError):
+            cache.incr("c")
+        cache.delete_many(["a", "b"])
+        self.assertEqual(cache.get_many(["a", "b"]), {})
+
+    def test_least_recently_read_entries_are_evicted(self):
+        """При переполнении уходят записи, которые давно не читали."""
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        start = time.time()
+        for offset, key in enumerate(["a", "b", "c"]):
+            with mock.patch("time.time", return_value=start + offset):
+                cache.set(key, key)
+        later = start + ACCESS_RESOLUTION + 10
+        with mock.patch("time.time", return_value=later):
+            cache.get("a")
+        with mock.patch("time.time", return_value=later + 1):
+            cache.set("d", "d")
+        self.assertEqual(
+            cache.get_many(["a", "b", "c", "d"]),
+            {"a": "a", "c": "c", "d": "d"},
+        )
+
+    def test_total_size_is_capped(self):
+        """Суммарный размер значений не превышает MAX_SIZE."""
+        cache = self.make_cache(MAX_SIZE=10000)
+        for number in range(20):
+            cache.set(f"key{number}", "x" * 1000)
+        size = cache._db.execute("SELECT size FROM cache_totals").fetchone()
+        self.assertLessEqual(size[0], 10000)
+        self.assertIsNotNone(cache.get("key19"))
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="reader")
+        cls.author = User.objects.create_user(username="author")
+        Post.objects.create(author=cls.author, text="Первый пост")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        """Повторная страница аноним получает без SQL и рендера."""
+        url = reverse("posts:index")
+        self.assertEqual(self.client.get(url)["X-Page-Cache"], "miss")
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertContains(response, "Первый пост")
+        self.assertContains(response, "Войти")
+        Post.objects.create(author=self.author, text="Второй пост")
+        response = self.client.get(url)
+        self.assertEqual(response["X-Page-Cache"], "miss")
+        self.assertContains(response, "Второй пост")
+
+    def test_header_is_a_hole_and_users_bypass_cache(self):
+        """В кэше нет меню посетителя, пользователи кэш не читают."""
+        url = reverse("about:author")
+        response = self.client.get(url)
+        self.assertContains(response, "Войти")
+        html = cache.get(page_cache._key(response.wsgi_request, ""))
+        self.assertIn("<!--page-hole:includes/header_nav.html-->", html)
+        self.assertNotIn("Войти", html)
+        self.client.force_login(self.user)
+        response = self.client.get(url)
+        self.assertNotIn("X-Page-Cache", response)
+        self.assertContains(response, "Пользователь: reader")
+        self.assertNotContains(response, "page-hole")
+
+
+class VersionCommitTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author")
+
+    def test_versions_change_again_after_commit(self):
+        """Рендер, закэшированный до коммита, не достаётся по версии."""
+        with transaction.atomic():
+            post = Post.objects.create(author=self.author, text="Пост")
+            # Параллельный запрос видит базу до коммита.
+            page = versions.get("site")
+            card = cards._versions([post])
+        self.assertNotEqual(versions.get("site"), page)
+        self.assertNotEqual(cards._versions([post]), card)
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username="admin", is_staff=True)
+        cls.user = User.objects.create_user(username="user")
+        Post.objects.create(author=cls.user, text="Пост")
+
+    def setUp(self):
+        cache.clear()
+        metrics.REGISTRY.clear()
+
+    def test_view_metrics_are_recorded(self):
+        """Каждый запрос пишет время, SQL, шаблоны и кэш своего view."""
+        # Анонимам страница отдаётся из кэша страниц без SQL.
+        self.client.force_login(self.user)
+        self.client.get(reverse("posts:index"))
+        self.client.get(reverse("posts:index"))
+        windows, sums, counters, count = metrics.REGISTRY.snapshot()[
+            "posts:index"
+        ]
+        self.assertEqual(count, 2)
+        self.assertTrue(all(windows["queries"]))
+        self.assertGreater(sums["duration"], sums["template_time"])
+        self.assertGreater(sums["template_time"], 0)
+        self.assertGreater(counters["cache_misses"], 0)
+        self.assertGreater(counters["cache_hits"], 0)
+
+    def test_metrics_endpoint_is_for_staff_only(self):
+        self.client.get(reverse("posts:index"))
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 302)
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "# TYPE yatube_db_queries summary")
+        self.assertContains(
+            response, 'yatube_db_queries_count{view="posts:index"} 1'
+        )
+        self.assertContains(
+            response,
+            'yatube_request_duration_seconds{view="posts:index",'
+            'quantile="0.99"}',
+        )
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged_with_sql(self):
+        with self.assertLogs("core.metrics", "WARNING") as logs:
+            self.client.get(reverse("posts:index"))
+        self.assertIn("posts:index", logs.output[0])
+        self.assertIn("SELECT", logs.output[0])
+
+    def test_quantile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(metrics.quantile(values, 0.5), 50)
+        self.assertEqual(metrics.quantile(values, 0.99), 99)
+        self.assertEqual(metrics.quantile([7], 0.9), 7)
+
+
+def echo_application(environ, start_response):
+    start_response("201 Created", [("Content-Type", "text/plain")])
+    body = environ["wsgi.input"].read()
+    return [environ["PATH_INFO"].encode("latin-1"), b" ", body]
+
+
+def streaming_application(environ, start_response):
+    start_response("200 OK", [])
+    return (part for part in (b"first", b"", b"second"))
+
+
+class AsgiHandlerTests(SimpleTestCase):
+    def call(self, application, scope, messages):
+        """Запускает приложение и возвращает отправленные сообщения."""
+        incoming = iter(messages)
+        sent = []
+
+        async def receive():
+            return next(incoming)
+
+        async def send(message):
+            sent.append(message)
+
+        handler = asgi.AsgiHandler(application, threads=2)
+        self.addCleanup(handler.executor.shutdown)
+        asyncio.run(handler(scope, receive, send))
+        return sent
+
+    def scope(self, path, **extra):
+        return dict(
+            type="http", method="POST", path=path, query_string=b"", **extra
+        )
+
+    def test_body_is_read_before_the_thread_is_taken(self):
+        sent = self.call(
+            echo_application,
+            self.scope("/загрузка/", headers=[(b"content-length", b"6")]),
+            [
+                {"type": "http.request", "body": b"abc", "more_body": True},
+                {"type": "http.request", "body": b"def"},
+            ],
+        )
+        self.assertEqual(sent[0]["status"], 201)
+        self.assertIn((b"content-type", b"text/plain"), sent[0]["headers"])
+        self.assertEqual(sent[1]["body"], "/загрузка/ abcdef".encode())
+
+    def test_streaming_responses_are_sent_in_parts(self):
+        sent = self.call(
+            streaming_application,
+            self.scope("/"),
+            [{"type": "http.request"}],
+        )
+        self.assertEqual(
+            [message.get("body") for message in sent[1:]],
+            [b"first", b"second", b""],
+        )
+
+    def test_disconnected_client_is_not_served(self):
+        sent = self.call(
+            echo_application,
+            self.scope("/"),
+            [{"type": "http.disconnect"}],
+        )
+        self.assertEqual(sent, [])
+
+    def test_django_page_and_lifespan(self):
+        cache.clear()
+        sent = self.call(
+            WSGIHandler(),
+            dict(self.scope(reverse("about:author")), method="GET"),
+            [{"type": "http.request"}],
+        )
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertIn("<html".encode(), sent[1]["body"])
+        sent = self.call(
+            WSGIHandler(),
+            {"type": "lifespan"},
+            [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}],
+        )
+        self.assertEqual(
+            [message["type"] for message in sent],
+            ["lifespan.startup.complete", "lifespan.shutdown.complete"],
+        )
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(TestCase):
+    """Реплика — отдельный файл SQLite, отстающий от основной базы."""
+
+    databases = {DEFAULT_DB_ALIAS, "replica"}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        connections.databases["replica"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.path.join(cls.directory, "replica.sqlite3"),
+        }
+        call_command("migrate", database="replica", verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections["replica"].close()
+        del connections.databases["replica"]
+        delattr(connections._connections, "replica")
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="author")
+        User.objects.using("replica").create(
+            id=cls.user.id, username="author"
+        )
+        # Пост ещё не доехал до реплики.
+        cls.post = Post.objects.create(author=cls.user, text="Новый пост")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_safe_requests_read_replica(self):
+        url = reverse("posts:post_comments", args=(self.post.id,))
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.cookies[replicas.REPLICA_STICKY_COOKIE] = "1"
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_author_reads_own_writes_after_posting(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("posts:add_comment", args=(self.post.id,)),
+            {"text": "Комментарий"},
+        )
+        self.assertTrue(Comment.objects.filter(post=self.post).exists())
+        cookie = response.cookies[replicas.REPLICA_STICKY_COOKIE]
+        self.assertEqual(cookie["max-age"], 5)
+        response = self.client.get(
+            reverse("posts:post_detail", args=(self.post.id,))
+        )
+        self.assertContains(response, "Комментарий")
+
+    def test_pages_rendered_from_lagging_replica_are_not_cached(self):
+        """Страница с реплики под свежей версией не попадает в кэш."""
+        versions.bump("site")
+        response = self.client.get(reverse("posts:index"))
+        self.assertNotContains(response, "Новый пост")
+        self.assertNotIn("ETag", response)
+        # Реплика догнала основную базу.
+        Post.objects.using("replica").bulk_create(
+            [
+                Post(
+                    id=self.post.id,
+                    author_id=self.user.id,
+                    text=self.post.text,
+                    pub_date=self.post.pub_date,
+                )
+            ]
+        )
+        response = self.client.get(reverse("posts:index"))
+        self.assertNotEqual(response.get("X-Page-Cache"), "hit")
+        self.assertContains(response, "Новый пост")
+
+    def test_code_outside_requests_uses_primary(self):
+        self.assertTrue(Post.objects.filter(id=self.post.id).exists())
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    def test_defaults_keep_local_sqlite_with_persistent_connections(self):
+        config = databases({}, "/srv/yatube")["default"]
+        self.assertEqual(config["ENGINE"], "django.db.backends.sqlite3")
+        self.assertEqual(config["NAME"], "/srv/yatube/db.sqlite3")
+        self.assertEqual(config["CONN_MAX_AGE"], 60)
+        self.assertTrue(config["CONN_HEALTH_CHECKS"])
+
+    def test_postgres_url_replicas_and_pool(self):
+        result = databases(
+            {
+                "DATABASE_URL": "postgres://yatube:p%40ss@db:5433/yatube",
+                "DATABASE_REPLICA_URLS": "postgres://ro@replica/yatube",
+                "DB_POOL_SIZE": "8",
+                "DB_CONN_MAX_AGE": "none",
+            },
+            "/srv/yatube",
+        )
+        self.assertEqual(list(result), ["default", "replica1"])
+        default = result["default"]
+        self.assertEqual(default["ENGINE"], "core.backends.postgresql")
+        self.assertEqual(
+            (default["USER"], default["PASSWORD"], default["HOST"]),
+            ("yatube", "p@ss", "db"),
+        )
+        self.assertEqual(default["PORT"], "5433")
+        # С пулом соединение возвращается в пул после каждого запроса.
+        self.assertEqual(default["CONN_MAX_AGE"], 0)
+        self.assertEqual(default["POOL"]["MAX_SIZE"], 8)
+        self.assertEqual(result["replica1"]["TEST"], {"MIRROR": "default"})
+
+    def test_unknown_scheme_is_rejected(self):
+        with self.assertRaises(ValueError):
+            databases({"DATABASE_URL": "oracle://db/yatube"}, "/srv")
+
+
+class FakeConnection:
+    def close(self):
+        pass
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def test_connections_are_reused(self):
+        item = pool.ConnectionPool(max_size=2, timeout=1)
+        first = item.checkout(FakeConnection)
+        item.checkin(first)
+        self.assertIs(item.checkout(FakeConnection), first)
+        self.assertEqual((item.size, item.idle, item.checkouts), (1, 0, 2))
+
+    def test_checkout_waits_for_a_returned_connection(self):
+        item = pool.ConnectionPool(max_size=1, timeout=5)
+        first = item.checkout(FakeConnection)
+        threading.Timer(0.05, item.checkin, (first,)).start()
+        self.assertIs(item.checkout(FakeConnection), first)
+        self.assertGreater(max(item.waits), 0.01)
+
+    def test_exhausted_pool_times_out(self):
+        item = pool.ConnectionPool(max_size=1, timeout=0.01)
+        item.checkout(FakeConnection)
+        with self.assertRaises(pool.PoolTimeout):
+            item.checkout(FakeConnection)
+        self.assertEqual(item.timeouts, 1)
+
+    def test_failed_connect_frees_its_place(self):
+        item = pool.ConnectionPool(max_size=1, timeout=0.01)
+
+        def refuse():
+            raise RuntimeError("база недоступна")
+
+        with self.assertRaises(RuntimeError):
+            item.checkout(refuse)
+        self.assertEqual(item.size, 0)
+        self.assertIsInstance(item.checkout(FakeConnection), FakeConnection)
+
+
+class PooledBackendTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.alias = "pooled"
+        self.addCleanup(pool._pools.pop, self.alias, None)
+        self.settings_dict = {
+            "ENGINE": "core.backends.sqlite3",
+            "NAME": os.path.join(directory, "pooled.sqlite3"),
+            "CONN_MAX_AGE": 0,
+            "CONN_HEALTH_CHECKS": True,
+            "POOL": {"MAX_SIZE": 2},
+            "OPTIONS": {},
+            "TIME_ZONE": None,
+            "AUTOCOMMIT": True,
+            "ATOMIC_REQUESTS": False,
+        }
+
+    def wrapper(self):
+        backend = load_backend(self.settings_dict["ENGINE"])
+        return backend.DatabaseWrapper(self.settings_dict, self.alias)
+
+    def test_closed_connection_returns_to_pool(self):
+        first = self.wrapper()
+        first.ensure_connection()
+        raw = first.connection
+        first.close()
+        second = self.wrapper()
+        with second.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        self.assertIs(second.connection, raw)
+        item = pool.pools()[self.alias]
+        self.assertEqual((item.size, item.checkouts), (1, 2))
+        self.assertIn(
+            'yatube_db_pool_size{alias="pooled"} 1',
+            metrics.render_prometheus(),
+        )
+        second.close()
+
+    def test_broken_connection_is_replaced(self):
+        first = self.wrapper()
+        first.ensure_connection()
+        raw = first.connection
+        first.close()
+        raw.close()
+        second = self.wrapper()
+        second.ensure_connection()
+        self.assertIsNot(second.connection, raw)
+        self.assertEqual(pool.pools()[self.alias].size, 1)
+        second.close()
+
+    def test_child_process_does_not_inherit_pools(self):
+        idle, held = self.wrapper(), self.wrapper()
+        idle.ensure_connection()
+        held.ensure_connection()
+        raw = idle.connection
+        idle.close()
+        pid = os.fork()
+        if pid == 0:
+            inherited = True
+            try:
+                held.close()
+                fresh = self.wrapper()
+                fresh.ensure_connection()
+                inherited = (
+                    fresh.connection is raw
+                    or pool.pools()[self.alias].idle
+                    or pool.pools()[self.alias].size != 1
+                )
+            finally:
+                os._exit(1 if inherited else 0)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.WEXITSTATUS(status), 0)
+        self.assertTrue(pool.ping(raw))
+        self.assertTrue(pool.ping(held.connection))
+        self.assertEqual(pool.pools()[self.alias].size, 2)
+        held.close()
@@ -1,5 +1,9 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from . import metrics
+
 
 def page_not_found(request, exception):
     return render(request, "core/404.html", {"path": request.path}, status=404)
@@ -11,3 +15,12 @@ def csrf_failure(request, reason=""):
 
 def internal_server_error(request):
     return render(request, "core/500.html", {"path": request.path}, status=500)
+
+
+@staff_member_required
+def metrics_view(request):
+    """Метрики запросов этого процесса в формате Prometheus."""
+    return HttpResponse(
+        metrics.render_prometheus(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -1,6 +1,27 @@
 from django.contrib import admin
+from django.http import StreamingHttpResponse
 
+from .export import TABLES, stream_json_lines
 from .models import Post, Group, Comment
+from .search import SimpleSearchBackend, get_backend
+
+
+def export_json_lines(table):
+    """Действие админки: выбранные строки потоком в JSON Lines."""
+
+    def action(modeladmin, request, queryset):
+        response = StreamingHttpResponse(
+            stream_json_lines(queryset, TABLES[table][1]),
+            content_type="application/x-ndjson",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{table}.jsonl"'
+        )
+        return response
+
+    action.__name__ = f"export_{table}"
+    action.short_description = "Выгрузить выбранное в JSON Lines"
+    return action
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -15,6 +36,15 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ("text",)
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
+    actions = (export_json_lines("posts"),)
+
+    def get_search_results(self, request, queryset, search_term):
+        backend = get_backend()
+        if not search_term or isinstance(backend, SimpleSearchBackend):
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return backend.search(queryset, search_term), False
 
 
 admin.site.register(Post, PostAdmin)
@@ -39,6 +69,7 @@ class CommentAdmin(admin.ModelAdmin):
     search_fields = ("text",)
     list_filter = ("created",)
     empty_value_display = "-пусто-"
+    actions = (export_json_lines("comments"),)
 
 
 admin.site.register(Comment, CommentAdmin)
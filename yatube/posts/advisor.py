@@ -0,0 +1,99 @@
+"""Подсказки по индексам: EXPLAIN для каждого SQL-запроса страниц лент.
+
+Страницы из bench.targets() запрашиваются тестовым клиентом, их
+SELECT-запросы перехватываются execute_wrapper на всех базах, включая
+реплики, и прогоняются через EXPLAIN QUERY PLAN (SQLite) или EXPLAIN
+(PostgreSQL) на той же базе. Полный проход по таблице и сортировка
+без индекса — повод добавить индекс. Как и в bench.run, кэш страниц
+отключён, а кэши перенесены во временный каталог: иначе страница из
+кэша не выполнила бы ни одного запроса.
+"""
+import re
+from contextlib import ExitStack
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client, override_settings
+
+from core.test_runner import temporary_caches
+
+from . import bench
+
+FULL_SCAN = "полный проход"
+SORT = "сортировка без индекса"
+
+_POSTGRES_SEQ_SCAN = re.compile(r"Seq Scan on (\w+)")
+_POSTGRES_SORT = re.compile(r"^\s*(?:->\s*)?Sort\b")
+
+
+def capture(url, user=None):
+    """SELECT-запросы страницы: тройки (база, SQL, параметры)."""
+    queries = []
+
+    def wrapper(execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith("SELECT"):
+            queries.append((context["connection"].alias, sql, params))
+        return execute(sql, params, many, context)
+
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(wrapper))
+        client.get(url)
+    return queries
+
+
+def explain(sql, params, using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        prefix, column = "EXPLAIN QUERY PLAN ", -1
+    else:
+        prefix, column = "EXPLAIN ", 0
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        return [str(row[column]) for row in cursor.fetchall()]
+
+
+def problems(plan, using=DEFAULT_DB_ALIAS):
+    """Пары (вид проблемы, строка плана)."""
+    vendor = connections[using].vendor
+    found = []
+    for line in plan:
+        if vendor == "sqlite":
+            if (
+                line.startswith("SCAN ")
+                and " USING " not in line
+                and "VIRTUAL TABLE" not in line
+                and "CONSTANT ROW" not in line
+            ):
+                found.append((FULL_SCAN, line))
+            elif line == "USE TEMP B-TREE FOR ORDER BY":
+                # «RIGHT PART OF ORDER BY» — досортировка равных ключей,
+                # она останавливается на LIMIT и индекса не требует.
+                found.append((SORT, line))
+        elif _POSTGRES_SEQ_SCAN.search(line):
+            found.append((FULL_SCAN, line.strip()))
+        elif _POSTGRES_SORT.search(line):
+            found.append((SORT, line.strip()))
+    return found
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+def audit(scenarios=bench.SCENARIOS):
+    """Проблемные запросы по сценариям: {сценарий: [(sql, проблемы)]}."""
+    targets = bench.targets()
+    report = {}
+    with temporary_caches():
+        for name in scenarios:
+            url, user = targets[name]
+            seen = set()
+            report[name] = []
+            for using, sql, params in capture(url, user):
+                if (using, sql) in seen:
+                    continue
+                seen.add((using, sql))
+                found = problems(explain(sql, params, using), using)
+                if found:
+                    report[name].append((sql, found))
+    return report
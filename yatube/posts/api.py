@@ -0,0 +1,197 @@
+"""JSON API только для чтения: ленты, посты и комментарии.
+
+Строки читаются через values() и сериализуются без создания моделей.
+Списки листаются курсорами, как HTML-ленты. Ответы страниц несут
+ETag по содержимому и Last-Modified по версиям областей (posts.versions),
+которые меняются при любой правке, поэтому повторный запрос клиента
+получает 304 без тела. Выгрузка всех постов
+отдаётся потоком JSON Lines кусками по первичному ключу и не держит
+в памяти больше одного куска.
+"""
+import json
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, set_response_etag
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from . import versions
+from .models import Comment, Group, Post, User
+from .paginators import FEED_ORDERING, KeysetPaginator
+from .views import COMMENT_ORDERING
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+EXPORT_CHUNK_SIZE = 2000
+
+POST_FIELDS = (
+    "id",
+    "text",
+    "pub_date",
+    "author__username",
+    "group__slug",
+    "image",
+    "comment_count",
+)
+COMMENT_FIELDS = ("id", "post_id", "text", "created", "author__username")
+
+
+def serialize_post(row):
+    return {
+        "id": row["id"],
+        "text": row["text"],
+        "pub_date": row["pub_date"],
+        "author": row["author__username"],
+        "group": row["group__slug"],
+        "image": default_storage.url(row["image"]) if row["image"] else None,
+        "comment_count": row["comment_count"],
+    }
+
+
+def serialize_comment(row):
+    return {
+        "id": row["id"],
+        "post": row["post_id"],
+        "text": row["text"],
+        "created": row["created"],
+        "author": row["author__username"],
+    }
+
+
+def not_found(detail):
+    return JsonResponse({"detail": detail}, status=404)
+
+
+def conditional(request, data, scopes):
+    """JSON-ответ с валидаторами; 304, если у клиента та же версия.
+
+    Дата публикации не годится для Last-Modified: правка поста её
+    не меняет, и If-Modified-Since получал бы устаревший 304.
+    """
+    response = JsonResponse(data, json_dumps_params={"ensure_ascii": False})
+    set_response_etag(response)
+    last_modified = (
+        max(versions.get_many(scopes).values()) // versions.NANOSECONDS
+    )
+    response["Last-Modified"] = http_date(last_modified)
+    return get_conditional_response(
+        request,
+        etag=response["ETag"],
+        last_modified=last_modified,
+        response=response,
+    )
+
+
+def _page_size(request):
+    try:
+        size = int(request.GET.get("limit", PAGE_SIZE))
+    except ValueError:
+        return PAGE_SIZE
+    return min(max(size, 1), MAX_PAGE_SIZE)
+
+
+def _page(request, rows, ordering, serialize, scope):
+    paginator = KeysetPaginator(rows, _page_size(request), ordering)
+    page = paginator.get_page(request.GET.get("cursor"))
+    data = {
+        "results": [serialize(row) for row in page],
+        "next_cursor": page.next_cursor,
+        "previous_cursor": page.previous_cursor,
+    }
+    return conditional(request, data, [scope])
+
+
+def _post_page(request, posts, scope):
+    return _page(
+        request,
+        posts.values(*POST_FIELDS),
+        FEED_ORDERING,
+        serialize_post,
+        scope,
+    )
+
+
+@require_safe
+def post_list(request):
+    return _post_page(request, Post.objects.all(), "site")
+
+
+@require_safe
+def post_detail(request, post_id):
+    row = Post.objects.filter(pk=post_id).values(*POST_FIELDS).first()
+    if row is None:
+        return not_found("Пост не найден")
+    return conditional(request, serialize_post(row), [f"post:{post_id}"])
+
+
+@require_safe
+def group_posts(request, slug):
+    group_id = (
+        Group.objects.filter(slug=slug).values_list("id", flat=True).first()
+    )
+    if group_id is None:
+        return not_found("Группа не найдена")
+    return _post_page(
+        request, Post.objects.filter(group_id=group_id), f"group:{group_id}"
+    )
+
+
+@require_safe
+def author_posts(request, username):
+    author_id = (
+        User.objects.filter(username=username)
+        .values_list("id", flat=True)
+        .first()
+    )
+    if author_id is None:
+        return not_found("Автор не найден")
+    return _post_page(
+        request,
+        Post.objects.filter(author_id=author_id),
+        f"author:{author_id}",
+    )
+
+
+@require_safe
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return not_found("Пост не найден")
+    return _page(
+        request,
+        Comment.objects.filter(post_id=post_id).values(*COMMENT_FIELDS),
+        COMMENT_ORDERING,
+        serialize_comment,
+        f"post:{post_id}",
+    )
+
+
+def export_lines(posts, chunk_size=EXPORT_CHUNK_SIZE):
+    """Строки JSON Lines по всем постам, кусками по возрастанию id."""
+    rows = posts.order_by("id").values(*POST_FIELDS)
+    last_id = 0
+    while True:
+        chunk = list(rows.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        for row in chunk:
+            yield json.dumps(
+                serialize_post(row), cls=DjangoJSONEncoder, ensure_ascii=False
+            ) + "\n"
+        last_id = chunk[-1]["id"]
+
+
+@require_safe
+def post_export(request):
+    """Все посты потоком; необязательные фильтры group и author."""
+    posts = Post.objects.all()
+    if request.GET.get("group"):
+        posts = posts.filter(group__slug=request.GET["group"])
+    if request.GET.get("author"):
+        posts = posts.filter(author__username=request.GET["author"])
+    response = StreamingHttpResponse(
+        export_lines(posts), content_type="application/x-ndjson"
+    )
+    response["Content-Disposition"] = 'attachment; filename="posts.jsonl"'
+    return response
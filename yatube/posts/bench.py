@@ -0,0 +1,293 @@
+"""Замеры страниц лент: время ответа, число SQL-запросов и память.
+
+Каждый сценарий — URL на текущих данных и, если нужно, читатель.
+Первый запрос идёт в пустой кэш (cold_ms), затем прогрев и repeat
+замеренных запросов; отдельный прогон под tracemalloc считает пик
+памяти и SQL, чтобы трассировка не искажала время. Результаты
+сравниваются с сохранённым JSON-эталоном с допуском tolerance. Кэш
+страниц анонимов на время замеров отключён: иначе после первого
+запроса замерялось бы чтение готового HTML, а не рендер ленты.
+
+servers() сравнивает пропускную способность WSGI и ASGI (core.asgi)
+на тех же страницах, когда клиенты медленные: каждый тратит delay
+секунд на передачу запроса и столько же на чтение ответа.
+connection_modes() сравнивает соединение на запрос, постоянные
+соединения и пул core.pool.
+"""
+import asyncio
+import io
+import json
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import asgi, metrics, pool
+from yatube.database import POOLED_ENGINES
+
+from .models import AuthorStats, Group, Post
+
+SCENARIOS = ("index", "group_posts", "profile", "post_detail", "follow_index")
+# Метрики, по которым ищется регрессия; запросы сравниваются без допуска.
+TIMED = ("p50_ms", "p95_ms", "peak_kib")
+
+
+class BenchError(Exception):
+    pass
+
+
+def targets():
+    """Самые тяжёлые страницы каждого сценария на текущих данных."""
+    group = Group.objects.order_by("-post_count").first()
+    author = AuthorStats.objects.order_by("-post_count").first()
+    reader = AuthorStats.objects.order_by("-following_count").first()
+    post = Post.objects.order_by("-comment_count", "id").first()
+    if not (group and author and reader and post):
+        raise BenchError("Нет данных для замеров: сначала заполните базу.")
+    return {
+        "index": (reverse("posts:index"), None),
+        "group_posts": (
+            reverse("posts:group_list", args=(group.slug,)),
+            None,
+        ),
+        "profile": (
+            reverse("posts:profile", args=(author.user.username,)),
+            None,
+        ),
+        "post_detail": (reverse("posts:post_detail", args=(post.id,)), None),
+        "follow_index": (reverse("posts:follow_index"), reader.user),
+    }
+
+
+def _get(client, url):
+    response = client.get(url)
+    if response.status_code != 200:
+        raise BenchError(f"{url} ответил {response.status_code}")
+    return response
+
+
+def measure(client, url, repeat=20, warmup=3):
+    cache.clear()
+    start = time.perf_counter()
+    _get(client, url)
+    cold = time.perf_counter() - start
+    for _ in range(warmup):
+        _get(client, url)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _get(client, url)
+        timings.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            _get(client, url)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    timings.sort()
+    return {
+        "cold_ms": round(cold * 1000, 2),
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[int(0.95 * (len(timings) - 1))], 2),
+        "queries": len(queries),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+def run(scenarios=SCENARIOS, repeat=20, warmup=3):
+    urls = targets()
+    results = {}
+    for name in scenarios:
+        url, user = urls[name]
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        results[name] = dict(
+            measure(client, url, repeat, warmup), url=url
+        )
+    return results
+
+
+def _scope(url):
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": url,
+        "query_string": b"",
+        "headers": [],
+    }
+
+
+def _wsgi_server(urls, threads, delay):
+    """Поток сервера занят, пока клиент шлёт запрос и читает ответ."""
+    handler = WSGIHandler()
+
+    def start_response(status, headers, exc_info=None):
+        if not status.startswith("200"):
+            raise BenchError(f"WSGI ответил {status}")
+
+    def request(url):
+        time.sleep(delay)
+        environ = asgi.environ(_scope(url), io.BytesIO())
+        response = handler(environ, start_response)
+        try:
+            b"".join(response)
+        finally:
+            response.close()
+        time.sleep(delay)
+
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(request, urls))
+
+
+async def _asgi_server(urls, clients, threads, delay):
+    """Поток занят только обработкой, клиенты ждут в цикле событий."""
+    application = asgi.AsgiHandler(WSGIHandler(), threads)
+    semaphore = asyncio.Semaphore(clients)
+
+    async def receive():
+        await asyncio.sleep(delay)
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        if message.get("status", 200) != 200:
+            raise BenchError(f"ASGI ответил {message['status']}")
+        if message["type"] == "http.response.body" and not message.get(
+            "more_body"
+        ):
+            await asyncio.sleep(delay)
+
+    async def request(url):
+        async with semaphore:
+            await application(_scope(url), receive, send)
+
+    try:
+        await asyncio.gather(*(request(url) for url in urls))
+    finally:
+        application.executor.shutdown()
+
+
+def _public_urls(scenarios, requests):
+    """requests адресов по кругу из страниц сценариев без читателя."""
+    pages = [url for url, user in map(targets().get, scenarios) if not user]
+    if not pages:
+        raise BenchError("Нет сценариев без читателя")
+    return [pages[number % len(pages)] for number in range(requests)]
+
+
+def _throughput(requests, seconds):
+    return {
+        "requests": requests,
+        "seconds": round(seconds, 2),
+        "rps": round(requests / seconds, 1),
+    }
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+def servers(
+    scenarios=SCENARIOS, requests=200, clients=50, threads=4, delay=0.05
+):
+    """Запросов в секунду у WSGI и ASGI с threads потоками.
+
+    Берутся страницы сценариев без читателя; у ASGI одновременно
+    открыто не больше clients соединений.
+    """
+    urls = _public_urls(scenarios, requests)
+    elapsed = {}
+    start = time.perf_counter()
+    _wsgi_server(urls, threads, delay)
+    elapsed["wsgi"] = time.perf_counter() - start
+    start = time.perf_counter()
+    asyncio.run(_asgi_server(urls, clients, threads, delay))
+    elapsed["asgi"] = time.perf_counter() - start
+    return {
+        name: _throughput(requests, seconds)
+        for name, seconds in elapsed.items()
+    }
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+def connection_modes(scenarios=SCENARIOS, requests=200, threads=4):
+    """Запросов в секунду при разных способах держать соединения.
+
+    Каждый режим идёт в новых потоках: их соединения создаются уже
+    по настройкам режима. Для пула добавляется ожидание выдачи.
+    """
+    urls = _public_urls(scenarios, requests)
+    config = connections.databases[DEFAULT_DB_ALIAS]
+    saved = dict(config)
+    modes = (
+        ("per_request", {"CONN_MAX_AGE": 0}),
+        ("persistent", {"CONN_MAX_AGE": 60}),
+        (
+            "pool",
+            {
+                "CONN_MAX_AGE": 0,
+                "ENGINE": POOLED_ENGINES.get(
+                    saved["ENGINE"], saved["ENGINE"]
+                ),
+                "POOL": {"MAX_SIZE": threads},
+            },
+        ),
+    )
+    results = {}
+    try:
+        for name, changes in modes:
+            config.update(changes)
+            start = time.perf_counter()
+            _wsgi_server(urls, threads, 0)
+            results[name] = _throughput(
+                requests, time.perf_counter() - start
+            )
+    finally:
+        config.clear()
+        config.update(saved)
+    used = pool.pools().get(DEFAULT_DB_ALIAS)
+    if used is not None and used.waits:
+        results["pool"].update(
+            pool_size=used.size,
+            wait_p99_ms=round(metrics.quantile(used.waits, 0.99) * 1000, 3),
+        )
+    return results
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Список регрессий относительно эталона; пустой, если их нет."""
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if result["queries"] > expected["queries"]:
+            regressions.append(
+                f"{name}: SQL-запросов {result['queries']} "
+                f"вместо {expected['queries']}"
+            )
+        for metric in TIMED:
+            limit = expected[metric] * (1 + tolerance)
+            if result[metric] > limit:
+                regressions.append(
+                    f"{name}: {metric} {result[metric]} "
+                    f"при эталоне {expected[metric]} (+{tolerance:.0%})"
+                )
+    return regressions
+
+
+def load_baseline(path):
+    with open(path, encoding="utf-8") as file_:
+        return json.load(file_)
+
+
+def save_baseline(path, results):
+    with open(path, "w", encoding="utf-8") as file_:
+        json.dump(results, file_, ensure_ascii=False, indent=2, sort_keys=True)
+        file_.write("\n")
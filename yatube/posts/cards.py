@@ -0,0 +1,86 @@
+"""Кэш отрендеренных карточек постов для лент.
+
+Ключ фрагмента включает версии поста и его группы. Сигналы меняют
+версию при сохранении или удалении поста, комментария или группы,
+поэтому правка видна сразу, а остальные карточки остаются в кэше.
+Как и версии страниц, версия меняется ещё раз после коммита.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core import replicas
+
+CARD_TEMPLATE = "posts/includes/post_card.html"
+CARD_TIMEOUT = 60 * 60 * 24
+
+
+def _version_key(kind, pk):
+    return f"post_card_version:{kind}:{pk}"
+
+
+def _bump(key):
+    cache.set(key, time.time_ns(), None)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.set(key, time.time_ns(), None))
+
+
+def bump_post(post_id):
+    _bump(_version_key("post", post_id))
+
+
+def bump_group(group_id):
+    _bump(_version_key("group", group_id))
+
+
+def _versions(posts):
+    keys = {_version_key("post", post.id) for post in posts}
+    keys |= {
+        _version_key("group", post.group_id)
+        for post in posts
+        if post.group_id
+    }
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        # Версия потерялась (вытеснена) — заводим новую, а не нулевую,
+        # чтобы не подхватить устаревший фрагмент.
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
+
+
+def render_cards(posts, template=CARD_TEMPLATE):
+    """Проставляет постам атрибут card с HTML карточки из кэша."""
+    posts = list(posts)
+    versions = _versions(posts)
+    fragment_keys = {}
+    for post in posts:
+        group_version = versions.get(_version_key("group", post.group_id))
+        fragment_keys[post.id] = "post_card:{}:{}:{}:{}".format(
+            template,
+            post.id,
+            versions[_version_key("post", post.id)],
+            group_version,
+        )
+    fragments = cache.get_many(fragment_keys.values())
+    rendered = {}
+    for post in posts:
+        key = fragment_keys[post.id]
+        if key not in fragments:
+            fragments[key] = render_to_string(template, {"post": post})
+            post_versions = [versions[_version_key("post", post.id)]]
+            if post.group_id:
+                post_versions.append(
+                    versions[_version_key("group", post.group_id)]
+                )
+            # Карточку по данным отстающей реплики не кэшируем.
+            if not replicas.may_be_stale(*post_versions):
+                rendered[key] = fragments[key]
+        post.card = mark_safe(fragments[key])
+    if rendered:
+        cache.set_many(rendered, CARD_TIMEOUT)
+    return posts
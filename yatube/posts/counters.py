@@ -0,0 +1,107 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются из сигналов в той же транзакции, что и сама запись,
+а rebuild() пересчитывает их целиком набором UPDATE-запросов.
+recount() пересчитывает так же только указанных пользователей и группы.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+
+def author_stats(user):
+    """Счётчики пользователя; нулевые, если он ещё ничего не делал."""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return AuthorStats(user=user)
+
+
+def change_author_stats(user_id, field, delta):
+    updated = AuthorStats.objects.filter(user_id=user_id).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+    if not updated and delta > 0:
+        AuthorStats.objects.get_or_create(
+            user_id=user_id, defaults={field: delta}
+        )
+
+
+def change_comment_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=Greatest(F("comment_count") + delta, 0)
+    )
+
+
+def change_group_post_count(group_id, delta):
+    Group.objects.filter(pk=group_id).update(
+        post_count=Greatest(F("post_count") + delta, 0)
+    )
+
+
+def _count(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+@transaction.atomic
+def rebuild():
+    """Пересчитывает все счётчики по текущим данным."""
+    Post.objects.update(comment_count=_count(Comment, "post"))
+    Group.objects.update(post_count=_count(Post, "group"))
+    missing = User.objects.filter(stats__isnull=True).order_by("pk")
+    last_pk = 0
+    while True:
+        user_ids = list(
+            missing.filter(pk__gt=last_pk).values_list("pk", flat=True)[
+                :BATCH_SIZE
+            ]
+        )
+        if not user_ids:
+            break
+        AuthorStats.objects.bulk_create(
+            AuthorStats(user_id=user_id) for user_id in user_ids
+        )
+        last_pk = user_ids[-1]
+    AuthorStats.objects.update(
+        post_count=_count(Post, "author"),
+        follower_count=_count(Follow, "author"),
+        following_count=_count(Follow, "user"),
+    )
+
+
+@transaction.atomic
+def recount(user_ids=(), group_ids=()):
+    """rebuild() только для пользователей user_ids и групп group_ids."""
+    group_ids = sorted(set(group_ids))
+    for start in range(0, len(group_ids), BATCH_SIZE):
+        Group.objects.filter(
+            pk__in=group_ids[start:start + BATCH_SIZE]
+        ).update(post_count=_count(Post, "group"))
+    user_ids = sorted(set(user_ids))
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        batch = user_ids[start:start + BATCH_SIZE]
+        AuthorStats.objects.bulk_create(
+            (AuthorStats(user_id=user_id) for user_id in batch),
+            ignore_conflicts=True,
+        )
+        AuthorStats.objects.filter(user_id__in=batch).update(
+            post_count=_count(Post, "author"),
+            follower_count=_count(Follow, "author"),
+            following_count=_count(Follow, "user"),
+        )
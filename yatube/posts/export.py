@@ -0,0 +1,228 @@
+"""Потоковая выгрузка постов, комментариев и подписок.
+
+Строки читаются кусками по первичному ключу через values_list(), так
+что память не растёт с размером таблицы. Каждый кусок дописывается
+в файл отдельным кадром gzip/zstd (склеенные кадры — корректный
+архив), после чего в контрольную точку рядом с файлом пишутся
+последний pk и длина файла. Прерванная выгрузка с resume=True обрезает
+файл до контрольной точки и продолжает со следующего pk.
+
+Формат parquet и сжатие zstd требуют pyarrow и zstandard; без них
+доступны JSON Lines и CSV со сжатием gzip.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Follow, Post
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+CHUNK_SIZE = 10000
+TABLES = {
+    "posts": (
+        Post,
+        (
+            "id",
+            "author_id",
+            "group_id",
+            "text",
+            "pub_date",
+            "image",
+            "comment_count",
+        ),
+    ),
+    "comments": (
+        Comment,
+        ("id", "post_id", "author_id", "text", "created"),
+    ),
+    "follows": (Follow, ("id", "user_id", "author_id")),
+}
+FORMATS = ("jsonl", "csv", "parquet")
+COMPRESSIONS = ("gzip", "zstd")
+EXTENSIONS = {"jsonl": ".jsonl", "csv": ".csv", "parquet": ".parquet"}
+
+
+class ExportError(Exception):
+    pass
+
+
+def chunks(queryset, fields, chunk_size=CHUNK_SIZE, after=0):
+    """Куски строк (кортежи fields) по возрастанию pk после after."""
+    rows = queryset.order_by("pk").values_list(*fields)
+    while True:
+        chunk = list(rows.filter(pk__gt=after)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        after = chunk[-1][0]
+
+
+def json_lines(fields, chunk):
+    return "".join(
+        json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder) + "\n"
+        for row in chunk
+    )
+
+
+def csv_lines(chunk, header=None):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(header)
+    writer.writerows(chunk)
+    return buffer.getvalue()
+
+
+def _compress(data, compression):
+    if compression == "gzip":
+        return gzip.compress(data)
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+
+def _check(format_, compression, resume):
+    if format_ not in FORMATS:
+        raise ExportError(f"Неизвестный формат {format_}")
+    if compression not in (None,) + COMPRESSIONS:
+        raise ExportError(f"Неизвестное сжатие {compression}")
+    if compression == "zstd" and zstandard is None and format_ != "parquet":
+        raise ExportError("Для zstd установите пакет zstandard")
+    if format_ == "parquet":
+        if pyarrow is None:
+            raise ExportError("Для parquet установите пакет pyarrow")
+        if resume:
+            raise ExportError("Файл parquet нельзя дописать после обрыва")
+
+
+def file_name(table, format_, compression=None):
+    name = table + EXTENSIONS[format_]
+    if compression and format_ != "parquet":
+        name += ".gz" if compression == "gzip" else ".zst"
+    return name
+
+
+def _read_checkpoint(path):
+    try:
+        with open(path, encoding="utf-8") as file_:
+            return json.load(file_)
+    except FileNotFoundError:
+        return None
+
+
+def _write_checkpoint(path, checkpoint):
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as file_:
+        json.dump(checkpoint, file_)
+    os.replace(temporary, path)
+
+
+def export_table(
+    table,
+    path,
+    format_="jsonl",
+    compression=None,
+    chunk_size=CHUNK_SIZE,
+    resume=False,
+    progress=None,
+):
+    """Выгружает таблицу в файл path, возвращает число строк в файле."""
+    _check(format_, compression, resume)
+    model, fields = TABLES[table]
+    queryset = model.objects.all()
+    if format_ == "parquet":
+        return _export_parquet(
+            table, path, compression, chunk_size, progress
+        )
+    checkpoint_path = path + ".checkpoint"
+    checkpoint = {"last_pk": 0, "offset": 0, "rows": 0}
+    if resume:
+        checkpoint = _read_checkpoint(checkpoint_path) or checkpoint
+    with open(path, "ab" if resume else "wb") as file_:
+        # Хвост после контрольной точки — недописанный кусок.
+        file_.truncate(checkpoint["offset"])
+        for chunk in chunks(
+            queryset, fields, chunk_size, after=checkpoint["last_pk"]
+        ):
+            if format_ == "jsonl":
+                text = json_lines(fields, chunk)
+            else:
+                text = csv_lines(
+                    chunk, header=fields if not checkpoint["rows"] else None
+                )
+            file_.write(_compress(text.encode(), compression))
+            file_.flush()
+            checkpoint = {
+                "last_pk": chunk[-1][0],
+                "offset": file_.tell(),
+                "rows": checkpoint["rows"] + len(chunk),
+            }
+            _write_checkpoint(checkpoint_path, checkpoint)
+            if progress is not None:
+                progress(table, checkpoint["rows"])
+    return checkpoint["rows"]
+
+
+def _parquet_schema(model, fields):
+    types = {
+        "DateTimeField": pyarrow.timestamp("us", tz="UTC"),
+        "TextField": pyarrow.string(),
+        "CharField": pyarrow.string(),
+        "FileField": pyarrow.string(),
+        "ImageField": pyarrow.string(),
+    }
+    return pyarrow.schema(
+        (
+            name,
+            types.get(
+                model._meta.get_field(name).get_internal_type(),
+                pyarrow.int64(),
+            ),
+        )
+        for name in fields
+    )
+
+
+def _export_parquet(table, path, compression, chunk_size, progress):
+    model, fields = TABLES[table]
+    schema = _parquet_schema(model, fields)
+    rows = 0
+    writer = pyarrow.parquet.ParquetWriter(
+        path, schema, compression=compression or "none"
+    )
+    try:
+        # Каждый кусок — отдельная группа строк parquet.
+        for chunk in chunks(model.objects.all(), fields, chunk_size):
+            columns = [
+                pyarrow.array(column, type=field.type)
+                for column, field in zip(zip(*chunk), schema)
+            ]
+            writer.write_table(
+                pyarrow.Table.from_arrays(columns, schema=schema)
+            )
+            rows += len(chunk)
+            if progress is not None:
+                progress(table, rows)
+    finally:
+        writer.close()
+    return rows
+
+
+def stream_json_lines(queryset, fields, chunk_size=CHUNK_SIZE):
+    """Строки JSON Lines для StreamingHttpResponse."""
+    for chunk in chunks(queryset, fields, chunk_size):
+        yield json_lines(fields, chunk)
@@ -0,0 +1,115 @@
+"""Граф подписок в кэше: кого читает пользователь и сколько читают автора.
+
+Множество авторов пользователя и число подписчиков автора хранятся
+в кэше, поэтому профиль и лента подписок не читают posts_follow.
+Отсутствующая запись загружается из основной базы при первом чтении:
+реплика могла ещё не получить подписку.
+
+Подписка и отписка не правят записи на месте, а удаляют их: сразу,
+чтобы сама транзакция видела свои изменения, и ещё раз после
+коммита, чтобы выбросить то, что параллельные запросы успели
+загрузить до него. Пока удаление ждёт коммита, эти записи читаются
+из базы, но не кладутся в кэш: откат не должен оставить в нём
+незакоммиченные значения. Записи живут FOLLOW_GRAPH_TIMEOUT.
+"""
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .models import AuthorStats, Follow
+
+FOLLOW_GRAPH_TIMEOUT = 60 * 60 * 24
+
+
+def _followees_key(user_id):
+    return f"follow_graph:followees:{user_id}"
+
+
+def _followers_key(author_id):
+    return f"follow_graph:followers:{author_id}"
+
+
+class _Invalidation:
+    """Удаление записей после коммита; откат выбрасывает его сам."""
+
+    def __init__(self, keys):
+        self.keys = keys
+
+    def __call__(self):
+        cache.delete_many(self.keys)
+
+
+def _pending_keys():
+    """Записи, которые текущая транзакция изменила, но не закоммитила."""
+    return {
+        key
+        for _, hook in connections[DEFAULT_DB_ALIAS].run_on_commit
+        if isinstance(hook, _Invalidation)
+        for key in hook.keys
+    }
+
+
+def _store(values):
+    pending = _pending_keys()
+    cache.set_many(
+        {key: value for key, value in values.items() if key not in pending},
+        FOLLOW_GRAPH_TIMEOUT,
+    )
+
+
+def _load_followees(user_id):
+    followees = frozenset(
+        Follow.objects.using(DEFAULT_DB_ALIAS)
+        .filter(user_id=user_id)
+        .values_list("author_id", flat=True)
+    )
+    _store({_followees_key(user_id): followees})
+    return followees
+
+
+def followees(user_id):
+    """Множество id авторов, на которых подписан пользователь."""
+    cached = cache.get(_followees_key(user_id))
+    return cached if cached is not None else _load_followees(user_id)
+
+
+def is_following(user_id, author_id):
+    return author_id in followees(user_id)
+
+
+def follower_counts(author_ids):
+    """Число подписчиков каждого автора: {id автора: число}."""
+    keys = {_followers_key(author_id): author_id for author_id in author_ids}
+    found = cache.get_many(keys)
+    counts = {keys[key]: count for key, count in found.items()}
+    missing = [keys[key] for key in keys if key not in found]
+    if missing:
+        loaded = dict.fromkeys(missing, 0)
+        loaded.update(
+            AuthorStats.objects.using(DEFAULT_DB_ALIAS)
+            .filter(user_id__in=missing)
+            .values_list("user_id", "follower_count")
+        )
+        _store({_followers_key(pk): count for pk, count in loaded.items()})
+        counts.update(loaded)
+    return counts
+
+
+def follower_count(author_id):
+    return follower_counts([author_id])[author_id]
+
+
+def followed(user_id, author_id):
+    forget([user_id], [author_id])
+
+
+def unfollowed(user_id, author_id):
+    forget([user_id], [author_id])
+
+
+def forget(user_ids=(), author_ids=()):
+    """Сбрасывает записи пользователей и авторов, чьи подписки менялись."""
+    keys = [_followees_key(pk) for pk in user_ids] + [
+        _followers_key(pk) for pk in author_ids
+    ]
+    cache.delete_many(keys)
+    transaction.on_commit(_Invalidation(keys), using=DEFAULT_DB_ALIAS)
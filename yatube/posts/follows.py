@@ -0,0 +1,146 @@
+"""Массовые подписки: пачка авторов за запрос и импорт графа подписок.
+
+bulk_create не вызывает сигналы, поэтому то, что сигналы делают для
+одной подписки, — счётчики, ленты, кэш графа и версии страниц — здесь
+обновляется сразу для пачки. Уже существующие пары отбрасываются
+заранее одним запросом, а INSERT с пропуском конфликтов страхует
+от гонки с параллельной подпиской. Сколько строк вставила пачка,
+сообщает rowcount, а счётчики затронутых пользователей
+пересчитываются по posts_follow: при гонке вставляется меньше пар,
+чем ожидалось, и прибавка к счётчикам разошлась бы с базой.
+"""
+import csv
+import itertools
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+from . import counters, follow_graph, timeline, versions
+from .models import Follow
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+
+def _existing(pairs):
+    users = {user_id for user_id, _ in pairs}
+    authors = {author_id for _, author_id in pairs}
+    found = Follow.objects.filter(
+        user_id__in=users, author_id__in=authors
+    ).values_list("user_id", "author_id")
+    return pairs.intersection(found)
+
+
+def _insert(pairs):
+    """Вставляет пары, пропуская существующие; возвращает число новых."""
+    table = Follow._meta.db_table
+    ops = connection.ops
+    pairs = list(pairs)
+    inserted = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(pairs), BATCH_SIZE):
+            batch = pairs[start:start + BATCH_SIZE]
+            cursor.execute(
+                f"{ops.insert_statement(ignore_conflicts=True)} {table} "
+                "(user_id, author_id) VALUES "
+                + ", ".join(["(%s, %s)"] * len(batch))
+                + " "
+                + ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+                [pk for pair in batch for pk in pair],
+            )
+            inserted += cursor.rowcount
+    return inserted
+
+
+def _apply(pairs):
+    """Счётчики, ленты и кэши для созданных пар."""
+    users = {user_id for user_id, _ in pairs}
+    authors = {author_id for _, author_id in pairs}
+    counters.recount(users | authors)
+    # Сначала сбросить кэш: backfill решает, раскладывать ли автора,
+    # по числу подписчиков уже после этой пачки.
+    follow_graph.forget(users, authors)
+    # Пары, вставленные параллельной подпиской, backfill не испортят:
+    # записи ленты тоже вставляются с пропуском существующих.
+    timeline.backfill_many(pairs)
+    versions.bump(*(f"author:{pk}" for pk in users | authors))
+
+
+def follow_many(pairs):
+    """Создаёт подписки (пользователь, автор); возвращает число новых."""
+    pairs = {(user, author) for user, author in pairs if user != author}
+    new = pairs - _existing(pairs)
+    if not new:
+        return 0
+    with transaction.atomic():
+        created = _insert(new)
+        _apply(new)
+    return created
+
+
+def unfollow_many(user_id, author_ids):
+    """Отписывает пользователя от авторов; возвращает число отписок.
+
+    Отписка редка и не массова, поэтому удаление идёт через сигналы.
+    """
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(
+            user_id=user_id, author_id__in=author_ids
+        ).delete()
+    return deleted
+
+
+def user_ids(usernames):
+    return dict(
+        User.objects.filter(username__in=set(usernames)).values_list(
+            "username", "id"
+        )
+    )
+
+
+def read_edges(file_, format_):
+    """Пары (подписчик, автор) по именам из CSV или JSON Lines.
+
+    CSV — с заголовком user,author; JSONL — объекты {"user", "author"}.
+    """
+    if format_ == "csv":
+        for row in csv.DictReader(file_):
+            yield row["user"].strip(), row["author"].strip()
+    else:
+        for line in file_:
+            if line.strip():
+                edge = json.loads(line)
+                yield edge["user"], edge["author"]
+
+
+def import_edges(edges, batch_size=BATCH_SIZE, progress=None):
+    """Импортирует пары имён пачками, возвращает итоговую статистику.
+
+    duplicates — пары, которые уже были в базе или повторились в файле.
+    """
+    stats = dict(read=0, created=0, duplicates=0, unknown=0, self=0)
+    edges = iter(edges)
+    while True:
+        batch = list(itertools.islice(edges, batch_size))
+        if not batch:
+            break
+        ids = user_ids(itertools.chain.from_iterable(batch))
+        pairs = set()
+        valid = 0
+        for user, author in batch:
+            if user not in ids or author not in ids:
+                stats["unknown"] += 1
+            elif user == author:
+                stats["self"] += 1
+            else:
+                valid += 1
+                pairs.add((ids[user], ids[author]))
+        created = follow_many(pairs)
+        stats["read"] += len(batch)
+        stats["created"] += created
+        stats["duplicates"] += valid - created
+        if progress is not None:
+            progress(dict(stats))
+    return stats
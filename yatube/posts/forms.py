@@ -1,7 +1,17 @@
 from django import forms
+from django.db import transaction
+
+from . import thumbnails
 from .models import Post, Comment
 
 
+def check_text(data):
+    """Общее правило для текстов постов и комментариев."""
+    if not data:
+        raise forms.ValidationError("поле Text не должно быть пустым")
+    return data
+
+
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
@@ -17,12 +27,14 @@ class PostForm(forms.ModelForm):
             "image": "Загрузить изображение для поста",
         }
 
-    def clean_text(self):
-        data = self.cleaned_data["text"]
-        if not data:
-            raise forms.ValidationError("поле Text не должно быть пустым")
+    def save(self, commit=True):
+        post = super().save(commit)
+        if "image" in self.changed_data and post.image:
+            transaction.on_commit(lambda: thumbnails.schedule(post))
+        return post
 
-        return data
+    def clean_text(self):
+        return check_text(self.cleaned_data["text"])
 
 
 class CommentForm(forms.ModelForm):
@@ -37,8 +49,4 @@ class CommentForm(forms.ModelForm):
         }
 
     def clean_text(self):
-        data = self.cleaned_data["text"]
-        if not data:
-            raise forms.ValidationError("поле Text не должно быть пустым")
-
-        return data
+        return check_text(self.cleaned_data["text"])
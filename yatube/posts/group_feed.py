@@ -0,0 +1,31 @@
+"""Кэш первой страницы ленты группы.
+
+Первая страница группы — самая читаемая, поэтому её посты хранятся в
+кэше целиком, вместе с курсором следующей страницы. Ключ включает
+версию области группы (см. versions): сигналы меняют её при публикации,
+правке, удалении или переносе поста группы, при комментарии к нему и
+при правке самой группы.
+"""
+from django.core.cache import cache
+
+from core import replicas
+
+from . import versions
+from .paginators import KeysetPage, KeysetPaginator
+
+PAGE_TIMEOUT = 60 * 60
+
+
+def first_page(group, per_page):
+    """Первая страница ленты группы; из кэша, если он не устарел."""
+    paginator = KeysetPaginator(group.posts.for_feed(), per_page)
+    version = versions.get(f"group:{group.id}")
+    key = f"group_feed:{group.id}:{version}:{per_page}"
+    cached = cache.get(key)
+    if cached is not None:
+        rows, next_cursor = cached
+        return KeysetPage(rows, paginator, next_cursor, None)
+    page = paginator.page(None)
+    if not replicas.may_be_stale(version):
+        cache.set(key, (page.object_list, page.next_cursor), PAGE_TIMEOUT)
+    return page
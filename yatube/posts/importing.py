@@ -0,0 +1,241 @@
+"""Импорт постов из JSON Lines и CSV.
+
+Записи читаются потоком и идут пачками: каждая пачка проверяется
+по правилам PostForm, авторы и группы находятся по словарям
+имя -> id, собранным один раз до начала, картинки копируются из
+локального каталога в хранилище, а посты вставляются одним
+bulk_create. Пачки могут обрабатываться в нескольких процессах;
+в обработке одновременно не больше двух пачек на процесс, так что
+память не растёт с размером файла.
+
+Сигналы при bulk_create не срабатывают. Ленты подписок и поисковый
+индекс дополняются сразу после вставки пачки для всех постов новее
+прочитанного перед ней id — это безопасно повторять. Картинки
+копируются в хранилище до вставки и удаляются, если пачка не
+вставилась. В конце пересчитываются счётчики авторов и групп новых
+постов, а версии их страниц сбрасываются.
+"""
+import csv
+import json
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters, search, thumbnails, timeline, versions
+from .forms import PostForm, check_text
+from .models import Group, Post
+from .seeding import explicit_dates
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+# Сколько ошибок с номерами строк попадает в отчёт.
+MAX_ERRORS = 100
+
+# Словари и параметры импорта; процессы-воркеры получают их через fork.
+_state = {}
+
+
+def read_records(file_, format_):
+    """Пары (номер строки, запись) из CSV с заголовком или JSON Lines.
+
+    Строка JSON, которую не удалось разобрать, даёт запись None —
+    она попадёт в отчёт об ошибках, а не прервёт импорт.
+    """
+    if format_ == "csv":
+        reader = csv.DictReader(file_)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(file_, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, None
+
+
+def _pub_date(value):
+    if not value:
+        return _state["now"]
+    date = parse_datetime(str(value))
+    if date is None:
+        raise ValidationError(f"Некорректная дата {value}")
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def _image(name):
+    """Копирует картинку из каталога импорта в хранилище."""
+    if not name:
+        return ""
+    images_dir = _state["images_dir"]
+    if images_dir is None:
+        raise ValidationError("Каталог картинок не задан")
+    if os.path.basename(name) != name:
+        raise ValidationError(f"Картинка {name} вне каталога импорта")
+    path = os.path.join(images_dir, name)
+    if not os.path.isfile(path):
+        raise ValidationError(f"Нет картинки {name}")
+    with open(path, "rb") as file_:
+        image = PostForm.base_fields["image"].clean(File(file_, name=name))
+        return default_storage.save(f"posts/{name}", image)
+
+
+def _post(record):
+    if not isinstance(record, dict):
+        raise ValidationError("Ожидается объект с полями поста")
+    author = record.get("author")
+    author_id = _state["authors"].get(author)
+    if author_id is None:
+        raise ValidationError(f"Нет автора {author}")
+    group_id = None
+    if record.get("group"):
+        group_id = _state["groups"].get(record["group"])
+        if group_id is None:
+            raise ValidationError(f"Нет группы {record['group']}")
+    text = check_text(str(record.get("text") or "").strip())
+    pub_date = _pub_date(record.get("pub_date"))
+    return Post(
+        author_id=author_id,
+        group_id=group_id,
+        text=text,
+        pub_date=pub_date,
+        image=_image(record.get("image")),
+    )
+
+
+def _import_batch(batch):
+    """Проверяет и вставляет пачку; возвращает (создано, ошибки)."""
+    posts, errors = [], []
+    for line, record in batch:
+        try:
+            posts.append(_post(record))
+        except ValidationError as error:
+            errors.append((line, "; ".join(error.messages)))
+    if posts:
+        try:
+            _insert(posts)
+        except Exception:
+            # Откаченной пачке скопированные картинки не нужны.
+            for post in posts:
+                if post.image:
+                    default_storage.delete(post.image.name)
+            raise
+    return len(posts), errors
+
+
+def _insert(posts):
+    with _state.get("write_lock") or nullcontext():
+        with transaction.atomic():
+            last_post_id = _last_post_id()
+            Post.objects.bulk_create(posts)
+            timeline.fan_out_after(last_post_id)
+            backend = search.get_backend()
+            for post in Post.objects.filter(id__gt=last_post_id).only(
+                "id", "text"
+            ):
+                backend.index(post)
+
+
+def _last_post_id():
+    return (
+        Post.objects.order_by("-id").values_list("id", flat=True).first()
+        or 0
+    )
+
+
+def _batches(records, batch_size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _imap(task, batches, processes):
+    """Результаты task по пачкам в их порядке, не больше 2 пачек на воркер."""
+    if processes <= 1:
+        yield from map(task, batches)
+        return
+    context = multiprocessing.get_context("fork")
+    # Как в seeding: SQLite пишет только один процесс за раз.
+    if connection.vendor == "sqlite":
+        _state["write_lock"] = context.Lock()
+    connections.close_all()
+    with ProcessPoolExecutor(processes, mp_context=context) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.submit(task, batch))
+            if len(pending) >= processes * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _finish(last_post_id):
+    """Счётчики, версии страниц и миниатюры для новых постов."""
+    new_posts = Post.objects.filter(id__gt=last_post_id)
+    authors = set(new_posts.values_list("author_id", flat=True).distinct())
+    groups = set(
+        new_posts.exclude(group=None)
+        .values_list("group_id", flat=True)
+        .distinct()
+    )
+    counters.recount(authors, groups)
+    versions.bump(
+        "site",
+        *(f"author:{pk}" for pk in authors),
+        *(f"group:{pk}" for pk in groups),
+    )
+    for post in new_posts.exclude(image="").only("id", "image"):
+        thumbnails.schedule(post)
+
+
+def import_records(
+    records, images_dir=None, batch_size=BATCH_SIZE, processes=1, progress=None
+):
+    """Импортирует пары (строка, запись), возвращает статистику.
+
+    Запись — объект с полями author (имя), text и необязательными
+    group (slug), pub_date (ISO 8601) и image (имя файла в images_dir).
+    """
+    stats = dict(read=0, created=0, invalid=0, errors=[])
+    _state.clear()
+    _state.update(
+        authors=dict(User.objects.values_list("username", "id")),
+        groups=dict(Group.objects.values_list("slug", "id")),
+        images_dir=images_dir,
+        now=timezone.now(),
+    )
+    last_post_id = _last_post_id()
+    batches = _batches(records, batch_size)
+    try:
+        with explicit_dates(Post._meta.get_field("pub_date")):
+            for created, errors in _imap(_import_batch, batches, processes):
+                stats["read"] += created + len(errors)
+                stats["created"] += created
+                stats["invalid"] += len(errors)
+                room = MAX_ERRORS - len(stats["errors"])
+                stats["errors"].extend(errors[:max(room, 0)])
+                if progress is not None:
+                    progress(dict(stats))
+    finally:
+        _state.clear()
+        _finish(last_post_id)
+    return stats
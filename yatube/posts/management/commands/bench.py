@@ -0,0 +1,207 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from core.test_runner import temporary_caches
+from posts import bench, seeding
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет отдельную базу синтетическими данными и замеряет "
+        "ленты: время ответа, SQL-запросы и память."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=2000)
+        parser.add_argument("--groups", type=int, default=50)
+        parser.add_argument("--posts", type=int, default=50000)
+        parser.add_argument("--follows", type=int, default=20000)
+        parser.add_argument("--comments", type=int, default=50000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=bench.SCENARIOS,
+            help="Замерить только этот сценарий; можно повторять.",
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument(
+            "--baseline",
+            help="JSON-эталон, с которым сравниваются результаты.",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Записать результаты в --baseline вместо сравнения.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Допустимый рост времени и памяти, доля от эталона.",
+        )
+        parser.add_argument(
+            "--servers",
+            action="store_true",
+            help=(
+                "Сравнить пропускную способность WSGI и ASGI при "
+                "медленных клиентах вместо замеров страниц."
+            ),
+        )
+        parser.add_argument(
+            "--connections",
+            action="store_true",
+            help=(
+                "Сравнить соединение на запрос, постоянные соединения "
+                "и пул вместо замеров страниц."
+            ),
+        )
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=50,
+            help="Одновременных клиентов у ASGI.",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=4,
+            help="Потоков, обрабатывающих запросы.",
+        )
+        parser.add_argument(
+            "--delay-ms",
+            type=float,
+            default=50,
+            help="Сколько клиент передаёт запрос и столько же читает ответ.",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Не удалять базу замеров, чтобы не заполнять её заново.",
+        )
+
+    def handle(self, *args, **options):
+        if options["save_baseline"] and not options["baseline"]:
+            raise CommandError("--save-baseline требует --baseline")
+        throughput = options["servers"] or options["connections"]
+        if options["servers"] and options["connections"]:
+            raise CommandError("--servers и --connections — разные замеры")
+        if throughput and options["baseline"]:
+            raise CommandError("Замер пропускной способности без эталона")
+        test_settings = connection.settings_dict["TEST"]
+        # Соединение с базой SQLite в памяти Django не закрывает,
+        # поэтому режимы соединений сравниваются на файле.
+        if (
+            (options["keepdb"] or options["connections"])
+            and connection.vendor == "sqlite"
+            and not test_settings.get("NAME")
+        ):
+            test_settings["NAME"] = os.path.join(
+                settings.BASE_DIR, "bench.sqlite3"
+            )
+        setup_test_environment()
+        # Кэши во временном каталоге, чтобы не портить кэш сервера.
+        with temporary_caches(), override_settings(
+            THUMBNAIL_WORKERS=0, METRICS_SLOW_REQUEST_MS=None
+        ):
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, keepdb=options["keepdb"]
+            )
+            try:
+                self.seed(options)
+                results = self.measure(options)
+            except bench.BenchError as error:
+                raise CommandError(error)
+            finally:
+                connection.creation.destroy_test_db(
+                    old_name, verbosity=0, keepdb=options["keepdb"]
+                )
+                teardown_test_environment()
+        if throughput:
+            self.report_throughput(results)
+            return
+        self.report(results)
+        self.check_baseline(results, options)
+
+    def measure(self, options):
+        scenarios = options["scenario"] or bench.SCENARIOS
+        if options["servers"]:
+            return bench.servers(
+                scenarios,
+                options["requests"],
+                options["clients"],
+                options["threads"],
+                options["delay_ms"] / 1000,
+            )
+        if options["connections"]:
+            return bench.connection_modes(
+                scenarios, options["requests"], options["threads"]
+            )
+        return bench.run(scenarios, options["repeat"], options["warmup"])
+
+    def seed(self, options):
+        if Post.objects.count() >= options["posts"]:
+            self.stdout.write("База замеров уже заполнена")
+            return
+        seeding.seed(
+            users=options["users"],
+            groups=options["groups"],
+            posts=options["posts"],
+            follows=options["follows"],
+            comments=options["comments"],
+            seed=options["seed"],
+            log=self.stdout.write,
+        )
+
+    def report(self, results):
+        header = (
+            f"{'сценарий':<14}{'cold':>9}{'p50':>9}{'p95':>9}"
+            f"{'SQL':>6}{'пик КиБ':>10}"
+        )
+        self.stdout.write(header)
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<14}{result['cold_ms']:>9}{result['p50_ms']:>9}"
+                f"{result['p95_ms']:>9}{result['queries']:>6}"
+                f"{result['peak_kib']:>10}"
+            )
+
+    def report_throughput(self, results):
+        self.stdout.write(f"{'режим':<12}{'запросов':>10}{'с':>8}{'RPS':>9}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<12}{result['requests']:>10}{result['seconds']:>8}"
+                f"{result['rps']:>9}"
+            )
+        pool = results.get("pool")
+        if pool and "pool_size" in pool:
+            self.stdout.write(
+                f"Пул: соединений {pool['pool_size']}, "
+                f"ожидание p99 {pool['wait_p99_ms']} мс"
+            )
+
+    def check_baseline(self, results, options):
+        path = options["baseline"]
+        if not path:
+            return
+        if options["save_baseline"]:
+            bench.save_baseline(path, results)
+            self.stdout.write(self.style.SUCCESS(f"Эталон записан в {path}"))
+            return
+        regressions = bench.compare(
+            results, bench.load_baseline(path), options["tolerance"]
+        )
+        if regressions:
+            raise CommandError("Регрессии:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS("Регрессий нет"))
@@ -0,0 +1,61 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгружает посты, комментарии и подписки потоком в JSON Lines, "
+        "CSV или parquet, не загружая таблицы в память."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Каталог для файлов выгрузки.")
+        parser.add_argument(
+            "--table",
+            action="append",
+            choices=tuple(export.TABLES),
+            help="Выгрузить только эту таблицу; можно повторять.",
+        )
+        parser.add_argument(
+            "--format", choices=export.FORMATS, default="jsonl"
+        )
+        parser.add_argument("--compression", choices=export.COMPRESSIONS)
+        parser.add_argument(
+            "--chunk-size", type=int, default=export.CHUNK_SIZE
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Продолжить прерванную выгрузку с контрольной точки.",
+        )
+
+    def handle(self, *args, **options):
+        os.makedirs(options["output"], exist_ok=True)
+        for table in options["table"] or export.TABLES:
+            path = os.path.join(
+                options["output"],
+                export.file_name(
+                    table, options["format"], options["compression"]
+                ),
+            )
+            try:
+                rows = export.export_table(
+                    table,
+                    path,
+                    options["format"],
+                    options["compression"],
+                    options["chunk_size"],
+                    options["resume"],
+                    self.report,
+                )
+            except export.ExportError as error:
+                raise CommandError(error)
+            self.stdout.write(
+                self.style.SUCCESS(f"{table}: {rows} строк в {path}")
+            )
+
+    def report(self, table, rows):
+        self.stdout.write(f"{table}: выгружено {rows}")
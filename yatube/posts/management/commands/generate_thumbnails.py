@@ -0,0 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Готовит недостающие миниатюры и варианты картинок постов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Число потоков, которые режут картинки.",
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image="").only(
+            "id", "image", "image_variants"
+        )
+        missing = [
+            (post.id, post.image.name)
+            for post in posts.iterator()
+            if not post.image_variants
+            or thumbnails.lookup(post.image) is None
+        ]
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            for post_id, image_name in missing:
+                pool.submit(thumbnails.generate_in_worker, post_id, image_name)
+        self.stdout.write(
+            self.style.SUCCESS(f"Подготовлено миниатюр: {len(missing)}")
+        )
@@ -0,0 +1,51 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import follows
+
+
+class Command(BaseCommand):
+    help = (
+        "Импортирует подписки из CSV (user,author) или JSON Lines "
+        '({"user": ..., "author": ...}) пачками через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл с парами имён.")
+        parser.add_argument(
+            "--format",
+            choices=("csv", "jsonl"),
+            help="Формат файла; по умолчанию — по расширению.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=follows.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format_ = options["format"] or (
+            "csv" if path.endswith(".csv") else "jsonl"
+        )
+        if not os.path.exists(path):
+            raise CommandError(f"Нет файла {path}")
+        with open(path, encoding="utf-8", newline="") as file_:
+            try:
+                stats = follows.import_edges(
+                    follows.read_edges(file_, format_),
+                    options["batch_size"],
+                    self.report,
+                )
+            except (KeyError, ValueError) as error:
+                raise CommandError(f"Некорректная строка: {error}")
+        self.stdout.write(self.style.SUCCESS(self.summary(stats)))
+
+    def report(self, stats):
+        self.stdout.write(self.summary(stats))
+
+    @staticmethod
+    def summary(stats):
+        return (
+            "Прочитано {read}, создано {created}, уже были {duplicates}, "
+            "неизвестные имена {unknown}, на себя {self}".format(**stats)
+        )
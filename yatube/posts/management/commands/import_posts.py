@@ -0,0 +1,67 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importing
+
+
+class Command(BaseCommand):
+    help = (
+        "Импортирует посты из JSON Lines или CSV (author, text, group, "
+        "pub_date, image) пачками через bulk_create."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл с постами.")
+        parser.add_argument(
+            "--format",
+            choices=("csv", "jsonl"),
+            help="Формат файла; по умолчанию — по расширению.",
+        )
+        parser.add_argument(
+            "--images-dir", help="Каталог с картинками из поля image."
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=importing.BATCH_SIZE
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Сколько процессов проверяют и вставляют пачки.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format_ = options["format"] or (
+            "csv" if path.endswith(".csv") else "jsonl"
+        )
+        if not os.path.exists(path):
+            raise CommandError(f"Нет файла {path}")
+        images_dir = options["images_dir"]
+        if images_dir is not None and not os.path.isdir(images_dir):
+            raise CommandError(f"Нет каталога {images_dir}")
+        with open(path, encoding="utf-8", newline="") as file_:
+            try:
+                stats = importing.import_records(
+                    importing.read_records(file_, format_),
+                    images_dir=images_dir,
+                    batch_size=options["batch_size"],
+                    processes=options["processes"],
+                    progress=self.report,
+                )
+            except UnicodeDecodeError:
+                raise CommandError(f"Файл {path} не в UTF-8")
+        for line, message in stats["errors"]:
+            self.stderr.write(f"Строка {line}: {message}")
+        self.stdout.write(self.style.SUCCESS(self.summary(stats)))
+
+    def report(self, stats):
+        self.stdout.write(self.summary(stats))
+
+    @staticmethod
+    def summary(stats):
+        return (
+            "Прочитано {read}, создано {created}, "
+            "с ошибками {invalid}".format(**stats)
+        )
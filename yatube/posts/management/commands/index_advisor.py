@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import advisor, bench
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогоняет SQL-запросы страниц лент через EXPLAIN и показывает "
+        "полные проходы по таблицам и сортировки без индекса."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=bench.SCENARIOS,
+            help="Проверить только этот сценарий; можно повторять.",
+        )
+        parser.add_argument(
+            "--strict",
+            action="store_true",
+            help="Завершиться ошибкой, если найдены проблемы.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = advisor.audit(options["scenario"] or bench.SCENARIOS)
+        except bench.BenchError as error:
+            raise CommandError(error)
+        total = 0
+        for name, queries in report.items():
+            if not queries:
+                self.stdout.write(self.style.SUCCESS(f"{name}: без замечаний"))
+                continue
+            self.stdout.write(self.style.WARNING(f"{name}:"))
+            for sql, found in queries:
+                total += len(found)
+                self.stdout.write(f"  {sql}")
+                for problem, line in found:
+                    self.stdout.write(f"    {problem}: {line}")
+        if total and options["strict"]:
+            raise CommandError(f"Найдено проблем: {total}")
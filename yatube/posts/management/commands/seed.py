@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу синтетическими пользователями, группами, постами, "
+        "комментариями и подписками для нагрузочных проверок."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--groups", type=int, default=100)
+        parser.add_argument("--posts", type=int, default=100000)
+        parser.add_argument("--follows", type=int, default=100000)
+        parser.add_argument("--comments", type=int, default=200000)
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Один и тот же seed даёт одни и те же данные.",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Число процессов, которые генерируют и вставляют куски.",
+        )
+        parser.add_argument(
+            "--alpha",
+            type=float,
+            default=seeding.ALPHA,
+            help="Показатель степенного закона популярности авторов.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=seeding.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        if options["processes"] > 1 and (
+            connection.vendor == "sqlite" and connection.is_in_memory_db()
+        ):
+            raise CommandError("Процессы не видят базу SQLite в памяти.")
+        if seeding.seeded(options["seed"]):
+            raise CommandError(
+                f"Данные с seed {options['seed']} уже есть: "
+                "выберите другой --seed."
+            )
+        started = time.monotonic()
+        created = seeding.seed(
+            users=options["users"],
+            groups=options["groups"],
+            posts=options["posts"],
+            follows=options["follows"],
+            comments=options["comments"],
+            seed=options["seed"],
+            processes=options["processes"],
+            alpha=options["alpha"],
+            batch_size=options["batch_size"],
+            log=self.stdout.write,
+        )
+        summary = ", ".join(
+            f"{kind}: {count}" for kind, count in created.items()
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Готово за {time.monotonic() - started:.0f} с ({summary})"
+            )
+        )
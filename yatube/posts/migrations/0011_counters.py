@@ -0,0 +1,94 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:10
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_of(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("posts", "Comment")
+    Follow = apps.get_model("posts", "Follow")
+    AuthorStats = apps.get_model("posts", "AuthorStats")
+    Post.objects.update(comment_count=count_of(Comment, "post"))
+    AuthorStats.objects.bulk_create(
+        (
+            AuthorStats(user_id=pk)
+            for pk in User.objects.values_list("pk", flat=True)
+        ),
+        batch_size=1000,
+    )
+    AuthorStats.objects.update(
+        post_count=count_of(Post, "author"),
+        follower_count=count_of(Follow, "author"),
+        following_count=count_of(Follow, "user"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0011_update_proxy_permissions"),
+        ("posts", "0010_timelineentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuthorStats",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+                (
+                    "post_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Число постов"
+                    ),
+                ),
+                (
+                    "follower_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Число подписчиков"
+                    ),
+                ),
+                (
+                    "following_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Число подписок"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="comment_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Число комментариев"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
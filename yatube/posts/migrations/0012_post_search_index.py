@@ -0,0 +1,62 @@
+from django.db import migrations
+
+# Основы слов для FTS5 выделяются в Python, SQL их не посчитает.
+from posts.stemmer import stem_text
+
+CREATE_INDEX = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+        "text, tokenize = 'unicode61 remove_diacritics 2')",
+    ],
+    "postgresql": [
+        "CREATE TABLE posts_post_search ("
+        "post_id integer PRIMARY KEY "
+        "REFERENCES posts_post (id) ON DELETE CASCADE, "
+        "document tsvector NOT NULL)",
+        "CREATE INDEX posts_post_search_document_idx "
+        "ON posts_post_search USING gin (document)",
+        "INSERT INTO posts_post_search (post_id, document) "
+        "SELECT id, to_tsvector('russian', text) FROM posts_post",
+    ],
+}
+TABLES = {
+    "sqlite": "posts_post_fts",
+    "postgresql": "posts_post_search",
+}
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in CREATE_INDEX:
+        return
+    for statement in CREATE_INDEX[vendor]:
+        schema_editor.execute(statement)
+    if vendor == "sqlite":
+        Post = apps.get_model("posts", "Post")
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO posts_post_fts (rowid, text) VALUES (%s, %s)",
+                (
+                    (post_id, stem_text(text))
+                    for post_id, text in Post.objects.values_list(
+                        "id", "text"
+                    ).iterator()
+                ),
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    table = TABLES.get(schema_editor.connection.vendor)
+    if table:
+        schema_editor.execute(f"DROP TABLE {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0011_counters"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:46
+
+from django.db import migrations
+from django.db.models import Count, F, Min
+
+
+def drop_duplicate_follows(apps, schema_editor):
+    Follow = apps.get_model("posts", "Follow")
+    AuthorStats = apps.get_model("posts", "AuthorStats")
+    duplicates = list(
+        Follow.objects.order_by()
+        .values("user_id", "author_id")
+        .annotate(first_id=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        Follow.objects.filter(
+            user_id=duplicate["user_id"], author_id=duplicate["author_id"]
+        ).exclude(id=duplicate["first_id"]).delete()
+        extra = duplicate["total"] - 1
+        AuthorStats.objects.filter(user_id=duplicate["author_id"]).update(
+            follower_count=F("follower_count") - extra
+        )
+        AuthorStats.objects.filter(user_id=duplicate["user_id"]).update(
+            following_count=F("following_count") - extra
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0013_post_image_variants"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_follows, migrations.RunPython.noop),
+    ]
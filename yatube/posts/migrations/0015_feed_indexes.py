@@ -0,0 +1,40 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("posts", "0014_drop_duplicate_follows"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="follow",
+            unique_together={("user", "author")},
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "created"],
+                name="posts_comme_post_id_944a68_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["author", "pub_date"],
+                name="posts_post_author__b65dbb_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["group", "pub_date"],
+                name="posts_post_group_i_5ba9fa_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:48
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_post_count(apps, schema_editor):
+    Group = apps.get_model("posts", "Group")
+    Post = apps.get_model("posts", "Post")
+    Group.objects.update(
+        post_count=Coalesce(
+            Subquery(
+                Post.objects.filter(group=OuterRef("pk"))
+                .order_by()
+                .values("group")
+                .annotate(total=Count("pk"))
+                .values("total")
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число постов'),
+        ),
+        migrations.RunPython(fill_post_count, migrations.RunPython.noop),
+    ]
@@ -8,11 +8,31 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, unique=True)
     description = models.TextField()
+    post_count = models.PositiveIntegerField(
+        "Число постов", default=0, editable=False
+    )
 
     def __str__(self) -> str:
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для ленты: всё, что рисует карточка, одним запросом."""
+        return self.select_related("author", "group").only(
+            "text",
+            "pub_date",
+            "image",
+            "image_variants",
+            "comment_count",
+            "author__username",
+            "author__first_name",
+            "author__last_name",
+            "group__slug",
+            "group__title",
+        )
+
+
 class Post(models.Model):
     text = models.TextField("Текст поста", help_text="Введите текст поста")
     pub_date = models.DateTimeField(
@@ -36,12 +56,26 @@ class Post(models.Model):
         help_text="Группа, к которой будет относиться пост",
     )
     image = models.ImageField("Картинка", upload_to="posts/", blank=True)
+    image_variants = models.TextField(
+        "Варианты картинки", blank=True, default="", editable=False
+    )
+    comment_count = models.PositiveIntegerField(
+        "Число комментариев", default=0, editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self) -> str:
         return self.text
 
     class Meta:
         ordering = ["-pub_date"]
+        # Профиль и группа фильтруют по автору или группе и сортируют
+        # по дате: составной индекс отдаёт страницу без сортировки.
+        indexes = [
+            models.Index(fields=["author", "pub_date"]),
+            models.Index(fields=["group", "pub_date"]),
+        ]
 
 
 class Comment(models.Model):
@@ -69,6 +103,9 @@ class Comment(models.Model):
     def __str__(self) -> str:
         return self.text
 
+    class Meta:
+        indexes = [models.Index(fields=["post", "created"])]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -83,3 +120,48 @@ class Follow(models.Model):
         related_name="following",
         verbose_name="Автор",
     )
+
+    class Meta:
+        unique_together = ("user", "author")
+
+
+class TimelineEntry(models.Model):
+    """Запись ленты подписок: пост автора, разложенный подписчику."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline",
+        verbose_name="Подписчик",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+        verbose_name="Пост",
+    )
+    pub_date = models.DateTimeField("Дата публикации")
+
+    class Meta:
+        ordering = ["-pub_date"]
+        unique_together = ("user", "post")
+        # post — второй ключ ленты: страница читается из индекса
+        # без досортировки совпавших по дате записей.
+        indexes = [models.Index(fields=["user", "-pub_date", "-post"])]
+
+
+class AuthorStats(models.Model):
+    """Счётчики пользователя, которые иначе пришлось бы считать COUNT(*)."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+        verbose_name="Пользователь",
+    )
+    post_count = models.PositiveIntegerField("Число постов", default=0)
+    follower_count = models.PositiveIntegerField(
+        "Число подписчиков", default=0
+    )
+    following_count = models.PositiveIntegerField("Число подписок", default=0)
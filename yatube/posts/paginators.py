@@ -0,0 +1,191 @@
+import binascii
+import datetime
+import heapq
+import itertools
+import json
+
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db.models import Q
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+FEED_ORDERING = ("-pub_date", "-id")
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(values, reverse=False):
+    """Упаковывает ключ строки в непрозрачный курсор для URL."""
+    if values is not None:
+        # Даты храним с микросекундами: усечённый ключ пропускает строки.
+        values = [
+            value.isoformat()
+            if isinstance(value, datetime.datetime)
+            else value
+            for value in values
+        ]
+    payload = json.dumps({"k": values, "r": reverse}).encode()
+    return urlsafe_base64_encode(payload)
+
+
+def decode_cursor(cursor):
+    """Распаковывает курсор, возвращает (значения ключа, направление)."""
+    try:
+        payload = json.loads(urlsafe_base64_decode(cursor).decode())
+        values, reverse = payload["k"], bool(payload["r"])
+    except (
+        binascii.Error,
+        ValueError,
+        TypeError,
+        KeyError,
+        UnicodeDecodeError,
+    ):
+        raise InvalidCursor("Некорректный курсор страницы")
+    if values is not None and not isinstance(values, list):
+        raise InvalidCursor("Некорректный курсор страницы")
+    return values, reverse
+
+
+class KeysetPage(Page):
+    """Страница ленты, соседние страницы адресуются курсорами."""
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return "<KeysetPage of %s objects>" % len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    # У страницы нет номера: всё, что считает от него, недоступно.
+    def next_page_number(self):
+        raise NotImplementedError("Страницы ленты адресуются курсором")
+
+    def previous_page_number(self):
+        raise NotImplementedError("Страницы ленты адресуются курсором")
+
+    def start_index(self):
+        raise NotImplementedError("Страницы ленты адресуются курсором")
+
+    def end_index(self):
+        raise NotImplementedError("Страницы ленты адресуются курсором")
+
+
+class KeysetPaginator(Paginator):
+    """Постраничный вывод по ключу сортировки без OFFSET и COUNT(*).
+
+    Каждая страница выбирается условием «строго после ключа последней
+    строки» по индексу, поэтому глубокие страницы стоят столько же,
+    сколько первая. Ключ обязан быть уникальным, поэтому по умолчанию
+    к pub_date добавлен id.
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING):
+        self.ordering = tuple(ordering)
+        super().__init__(object_list.order_by(*self.ordering), per_page)
+
+    @property
+    def last_cursor(self):
+        return encode_cursor(None, reverse=True)
+
+    def get_page(self, cursor):
+        """Возвращает страницу, при битом курсоре — первую."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
+
+    def page(self, cursor):
+        if not cursor:
+            values, reverse = None, False
+        else:
+            values, reverse = decode_cursor(cursor)
+            if values is not None and len(values) != len(self.ordering):
+                raise InvalidCursor("Некорректный курсор страницы")
+        rows = self._rows(values, reverse)
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if reverse:
+            rows.reverse()
+        has_next = has_more if not reverse else values is not None
+        has_previous = values is not None if not reverse else has_more
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(self._key(rows[-1]))
+        if rows and has_previous:
+            previous_cursor = encode_cursor(self._key(rows[0]), reverse=True)
+        return KeysetPage(rows, self, next_cursor, previous_cursor)
+
+    def _rows(self, values, reverse):
+        """До per_page + 1 строк после ключа values в порядке обхода."""
+        return self._slice(self.object_list, values, reverse)
+
+    def _slice(self, queryset, values, reverse):
+        if reverse:
+            queryset = queryset.reverse()
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, not reverse))
+        return list(queryset[: self.per_page + 1])
+
+    def _key(self, row):
+        names = [field.lstrip("-") for field in self.ordering]
+        if isinstance(row, dict):
+            return [row[name] for name in names]
+        return [getattr(row, name) for name in names]
+
+    def _seek(self, values, forward):
+        """Условие «строки строго после ключа» в порядке сортировки.
+
+        Нестрогая граница по первому полю повторяет первое слагаемое
+        OR, но её СУБД может взять диапазоном индекса.
+        """
+        condition = Q()
+        equal = Q()
+        bound = None
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") == forward else "gt"
+            if bound is None:
+                bound = Q(**{f"{name}__{lookup}e": value})
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return bound & condition
+
+
+class MergedKeysetPaginator(KeysetPaginator):
+    """KeysetPaginator по нескольким источникам с общим ключом.
+
+    Каждый источник читается своим диапазоном индекса не дальше
+    per_page + 1 строк после курсора, а страница собирается слиянием
+    в памяти: так лента подписок с «тянущимися» авторами не читает
+    их посты и свою ленту целиком ради одной страницы. Все поля
+    ordering должны сортироваться в одном направлении. Строка,
+    пришедшая из двух источников с одним ключом, берётся один раз.
+    """
+
+    def __init__(self, sources, per_page, ordering=FEED_ORDERING):
+        self.sources = [source.order_by(*ordering) for source in sources]
+        super().__init__(self.sources[0], per_page, ordering)
+
+    def _rows(self, values, reverse):
+        descending = self.ordering[0].startswith("-") != reverse
+        merged = heapq.merge(
+            *(
+                self._slice(source, values, reverse)
+                for source in self.sources
+            ),
+            key=self._key,
+            reverse=descending,
+        )
+        unique = (
+            next(group)
+            for _, group in itertools.groupby(merged, key=self._key)
+        )
+        return list(itertools.islice(unique, self.per_page + 1))
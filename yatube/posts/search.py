@@ -0,0 +1,171 @@
+"""Полнотекстовый поиск по постам с подключаемым индексом.
+
+Бэкенд выбирается настройкой POSTS_SEARCH_BACKEND (путь к классу),
+а по умолчанию — по СУБД: FTS5 для SQLite, tsvector для PostgreSQL.
+Индекс обновляется сигналами при сохранении и удалении поста.
+"""
+import re
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .stemmer import stem_text
+
+_QUERY_WORD = re.compile(r"\w+")
+
+
+class RawSubquery(RawSQL):
+    """Сырой подзапрос для __in: RawSQL дал бы IN ((...)) из одной строки."""
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+class SearchBackend:
+    ordering = ("-pub_date", "-id")
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.connection = connections[using]
+
+
+class SimpleSearchBackend(SearchBackend):
+    """Поиск без индекса для СУБД, которые не умеют полнотекстовый."""
+
+    def index(self, post):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def rebuild(self, posts):
+        pass
+
+    def search(self, queryset, query):
+        for word in _QUERY_WORD.findall(query):
+            queryset = queryset.filter(text__icontains=word)
+        return queryset
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 по заранее выделенным основам слов, ранжирование bm25."""
+
+    table = "posts_post_fts"
+    ordering = ("search_rank", "-id")
+
+    def index(self, post):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.table} WHERE rowid = %s", [post.id]
+            )
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, text) VALUES (%s, %s)",
+                [post.id, stem_text(post.text)],
+            )
+
+    def remove(self, post_id):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.table} WHERE rowid = %s", [post_id]
+            )
+
+    def rebuild(self, posts):
+        """Заполняет индекс заново из пар (id, text)."""
+        # Одна транзакция: в autocommit каждая строка — отдельный commit.
+        with transaction.atomic(using=self.connection.alias):
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {self.table}")
+                cursor.executemany(
+                    f"INSERT INTO {self.table} (rowid, text) "
+                    "VALUES (%s, %s)",
+                    ((post_id, stem_text(text)) for post_id, text in posts),
+                )
+
+    def search(self, queryset, query):
+        match = " ".join(
+            f'"{word}"' for word in stem_text(query).split()
+        )
+        if not match:
+            return queryset.none()
+        return queryset.filter(
+            id__in=RawSubquery(
+                f"SELECT rowid FROM {self.table} "
+                f"WHERE {self.table} MATCH %s",
+                [match],
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"SELECT bm25({self.table}) FROM {self.table} "
+                f"WHERE {self.table} MATCH %s "
+                "AND rowid = posts_post.id",
+                [match],
+                output_field=FloatField(),
+            )
+        )
+
+
+class PostgresSearchBackend(SearchBackend):
+    """tsvector с русским словарём, ранжирование ts_rank."""
+
+    table = "posts_post_search"
+    ordering = ("-search_rank", "-id")
+
+    def index(self, post):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {self.table} (post_id, document) "
+                "VALUES (%s, to_tsvector('russian', %s)) "
+                "ON CONFLICT (post_id) "
+                "DO UPDATE SET document = EXCLUDED.document",
+                [post.id, post.text],
+            )
+
+    def remove(self, post_id):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.table} WHERE post_id = %s", [post_id]
+            )
+
+    def rebuild(self, posts):
+        with transaction.atomic(using=self.connection.alias):
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {self.table}")
+                cursor.executemany(
+                    f"INSERT INTO {self.table} (post_id, document) "
+                    "VALUES (%s, to_tsvector('russian', %s))",
+                    posts,
+                )
+
+    def search(self, queryset, query):
+        if not _QUERY_WORD.search(query):
+            return queryset.none()
+        return queryset.filter(
+            id__in=RawSubquery(
+                f"SELECT post_id FROM {self.table} "
+                "WHERE document @@ plainto_tsquery('russian', %s)",
+                [query],
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"SELECT ts_rank(document, plainto_tsquery('russian', %s)) "
+                f"FROM {self.table} WHERE post_id = posts_post.id",
+                [query],
+                output_field=FloatField(),
+            )
+        )
+
+
+BACKENDS = {
+    "sqlite": SQLiteSearchBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+def get_backend(using=DEFAULT_DB_ALIAS):
+    path = getattr(settings, "POSTS_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)(using)
+    vendor = connections[using].vendor
+    return BACKENDS.get(vendor, SimpleSearchBackend)(using)
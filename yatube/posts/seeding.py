@@ -0,0 +1,324 @@
+"""Синтетические данные для нагрузочных замеров.
+
+Объекты создаются пачками bulk_create кусками по CHUNK_SIZE, куски
+могут считаться в нескольких процессах. У каждого куска свой генератор
+случайных чисел от (seed, вид, номер куска), поэтому одинаковый seed
+даёт те же данные; в нескольких процессах куски вставляются в другом
+порядке, и различаться могут первичные ключи. Имена и slug включают
+seed, поэтому повторно с тем же seed в ту же базу не заполнить:
+команда seed проверяет это через seeded(). Подписчики и посты
+распределены по авторам по степенному закону, но независимо: самые
+читаемые авторы не обязаны писать больше всех, иначе ленты подписок
+разрастались бы квадратично.
+
+Сигналы при bulk_create не срабатывают, поэтому в конце счётчики,
+ленты подписок и поисковый индекс пересобираются целиком.
+"""
+import itertools
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections
+from django.utils import timezone
+from faker import Faker
+from faker.providers.lorem.ru_RU import Provider as LoremProvider
+
+from . import counters, search, timeline
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+CHUNK_SIZE = 50000
+DAYS = 365
+# Показатель степенного закона популярности авторов.
+ALPHA = 1.1
+# Доля постов, под которыми собираются почти все комментарии.
+DENSE_SHARE = 0.01
+WORDS = LoremProvider.word_list
+
+# Общие для кусков данные; процессы-воркеры получают их через fork.
+_state = {}
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Отключает auto_now_add, чтобы даты были разбросаны по времени."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now_add in saved:
+            field.auto_now_add = auto_now_add
+
+
+def power_law_weights(count, alpha=ALPHA):
+    """Накопленные веса для random.choices: у k-го автора 1 / k^alpha."""
+    return list(
+        itertools.accumulate(1 / rank ** alpha for rank in range(1, count + 1))
+    )
+
+
+def _rng(kind, index):
+    return random.Random(f"{_state['seed']}:{kind}:{index}")
+
+
+def _text(rng, low, high):
+    return " ".join(rng.choices(WORDS, k=rng.randint(low, high))).capitalize()
+
+
+def _date(rng):
+    return _state["now"] - timedelta(
+        seconds=rng.randrange(DAYS * 24 * 60 * 60)
+    )
+
+
+def _pick(rng, ranking):
+    users, weights = _state[ranking]
+    return rng.choices(users, cum_weights=weights)[0]
+
+
+def _write(model, batch):
+    with _state.get("write_lock") or nullcontext():
+        model.objects.bulk_create(batch)
+
+
+def _insert(model, objects):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= _state["batch_size"]:
+            _write(model, batch)
+            batch = []
+    if batch:
+        _write(model, batch)
+
+
+def _users_chunk(index, start, count):
+    fake = Faker("ru_RU")
+    fake.seed_instance(f"{_state['seed']}:users:{index}")
+    password = make_password(None)
+    _insert(
+        User,
+        (
+            User(
+                username=f"{_state['prefix']}{number}",
+                first_name=fake.first_name(),
+                last_name=fake.last_name(),
+                password=password,
+            )
+            for number in range(start, start + count)
+        ),
+    )
+    return count
+
+
+def _posts_chunk(index, start, count):
+    rng = _rng("posts", index)
+    group_ids = _state["group_ids"]
+    _insert(
+        Post,
+        (
+            Post(
+                author_id=_pick(rng, "writers"),
+                group_id=rng.choice(group_ids)
+                if group_ids and rng.random() < 0.7
+                else None,
+                text=_text(rng, 5, 60),
+                pub_date=_date(rng),
+            )
+            for _ in range(count)
+        ),
+    )
+    return count
+
+
+def _comments_chunk(index, start, count):
+    rng = _rng("comments", index)
+    post_ids, dense = _state["post_ids"], _state["dense"]
+    user_ids = _state["user_ids"]
+    _insert(
+        Comment,
+        (
+            Comment(
+                post_id=rng.choice(dense)
+                if rng.random() < 0.9
+                else rng.choice(post_ids),
+                author_id=rng.choice(user_ids),
+                text=_text(rng, 3, 30),
+                created=_date(rng),
+            )
+            for _ in range(count)
+        ),
+    )
+    return count
+
+
+def _follows_chunk(index, start, count):
+    """Подписки читателей одного куска: пары не пересекаются с чужими."""
+    rng = _rng("follows", index)
+    user_ids = _state["user_ids"]
+    readers = user_ids[index::_state["follow_chunks"]]
+    count = min(count, len(readers) * (len(user_ids) - 1))
+    pairs = set()
+    attempts = 0
+    while len(pairs) < count and attempts < count * 20:
+        attempts += 1
+        reader, author = rng.choice(readers), _pick(rng, "celebrities")
+        if reader != author:
+            pairs.add((reader, author))
+    _insert(
+        Follow,
+        (Follow(user_id=user, author_id=author) for user, author in pairs),
+    )
+    return len(pairs)
+
+
+def _run(task, total, processes, chunks=None):
+    """Делит total объектов на куски и выполняет task над каждым."""
+    if chunks is None:
+        chunks = max((total + CHUNK_SIZE - 1) // CHUNK_SIZE, 1)
+    size, extra = divmod(total, chunks)
+    parts, start = [], 0
+    for index in range(chunks):
+        count = size + (index < extra)
+        parts.append((index, start, count))
+        start += count
+    if processes <= 1:
+        return sum(task(*part) for part in parts)
+    context = multiprocessing.get_context("fork")
+    # SQLite пишет только один процесс за раз: воркеры параллельно
+    # генерируют объекты, а вставляют по очереди.
+    if connection.vendor == "sqlite":
+        _state["write_lock"] = context.Lock()
+    # Соединения родителя не должны достаться воркерам после fork.
+    connections.close_all()
+    with ProcessPoolExecutor(processes, mp_context=context) as pool:
+        futures = [pool.submit(task, *part) for part in parts]
+        return sum(future.result() for future in futures)
+
+
+def _prefix(seed):
+    return f"seed{seed}_"
+
+
+def seeded(seed):
+    """Есть ли уже пользователи или группы от этого seed."""
+    prefix = _prefix(seed)
+    return (
+        User.objects.filter(username__startswith=prefix).exists()
+        or Group.objects.filter(
+            slug__startswith=prefix.replace("_", "-")
+        ).exists()
+    )
+
+
+def seed(
+    users=1000,
+    groups=20,
+    posts=10000,
+    follows=10000,
+    comments=20000,
+    seed=0,
+    processes=1,
+    alpha=ALPHA,
+    batch_size=BATCH_SIZE,
+    log=None,
+):
+    """Заполняет базу и возвращает число созданных объектов по видам."""
+    log = log or (lambda message: None)
+    prefix = _prefix(seed)
+    _state.clear()
+    _state.update(
+        seed=seed, prefix=prefix, now=timezone.now(), batch_size=batch_size
+    )
+
+    _run(_users_chunk, users, processes)
+    users_by_number = sorted(
+        User.objects.filter(username__startswith=prefix).values_list(
+            "username", "id"
+        ),
+        key=lambda pair: int(pair[0][len(prefix):]),
+    )
+    user_ids = [user_id for _, user_id in users_by_number]
+    weights = power_law_weights(len(user_ids), alpha)
+    _state["user_ids"] = user_ids
+    for ranking in ("writers", "celebrities"):
+        ranked = list(user_ids)
+        random.Random(f"{seed}:{ranking}").shuffle(ranked)
+        _state[ranking] = (ranked, weights)
+    log(f"Пользователи: {len(user_ids)}")
+
+    rng = random.Random(f"{seed}:groups")
+    slug_prefix = prefix.replace("_", "-")
+    Group.objects.bulk_create(
+        (
+            Group(
+                title=f"Группа {n}: {_text(rng, 1, 3)}",
+                slug=f"{slug_prefix}{n}",
+                description=_text(rng, 10, 30),
+            )
+            for n in range(groups)
+        ),
+        batch_size=batch_size,
+    )
+    _state["group_ids"] = list(
+        Group.objects.filter(slug__startswith=slug_prefix)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    log(f"Группы: {len(_state['group_ids'])}")
+
+    created = {"users": len(user_ids), "groups": len(_state["group_ids"])}
+    with explicit_dates(
+        Post._meta.get_field("pub_date"), Comment._meta.get_field("created")
+    ):
+        last_post_id = (
+            Post.objects.order_by("-id").values_list("id", flat=True).first()
+            or 0
+        )
+        if user_ids:
+            _run(_posts_chunk, posts, processes)
+        post_ids = list(
+            Post.objects.filter(id__gt=last_post_id)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        created["posts"] = len(post_ids)
+        log(f"Посты: {len(post_ids)}")
+
+        dense_count = max(int(len(post_ids) * DENSE_SHARE), 1)
+        dense = random.Random(f"{seed}:dense").sample(
+            post_ids, min(dense_count, len(post_ids))
+        )
+        _state.update(post_ids=post_ids, dense=dense)
+        created["comments"] = (
+            _run(_comments_chunk, comments, processes) if post_ids else 0
+        )
+        log(f"Комментарии: {created['comments']}")
+
+    if len(user_ids) > 1:
+        _state["follow_chunks"] = min(
+            max((follows + CHUNK_SIZE - 1) // CHUNK_SIZE, 1), len(user_ids)
+        )
+        created["follows"] = _run(
+            _follows_chunk, follows, processes, _state["follow_chunks"]
+        )
+    else:
+        created["follows"] = 0
+    log(f"Подписки: {created['follows']}")
+
+    counters.rebuild()
+    timeline.rebuild()
+    search.get_backend().rebuild(
+        Post.objects.values_list("id", "text").iterator()
+    )
+    log("Счётчики, ленты и поисковый индекс пересобраны")
+    return created
@@ -0,0 +1,173 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (
+    cards,
+    counters,
+    follow_graph,
+    search,
+    timeline,
+    variants,
+    versions,
+)
+from .models import Comment, Follow, Group, Post
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clean_timeline(sender, instance, **kwargs):
+    timeline.forget(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def expire_post_card(sender, instance, **kwargs):
+    cards.bump_post(instance.id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def expire_commented_post_card(sender, instance, **kwargs):
+    cards.bump_post(instance.post_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def expire_group_cards(sender, instance, **kwargs):
+    cards.bump_group(instance.id)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author_stats(instance.author_id, "post_count", 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_author_stats(instance.author_id, "post_count", -1)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, raw, **kwargs):
+    """Группа поста до сохранения: правка может перенести его в другую."""
+    instance._saved_group_id = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list("group_id", flat=True)
+        .first()
+        if instance.pk and not raw
+        else None
+    )
+
+
+@receiver(post_save, sender=Post)
+def count_group_posts(sender, instance, **kwargs):
+    old_group_id = getattr(instance, "_saved_group_id", None)
+    if old_group_id != instance.group_id:
+        if old_group_id:
+            counters.change_group_post_count(old_group_id, -1)
+        if instance.group_id:
+            counters.change_group_post_count(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_group_post(sender, instance, **kwargs):
+    if instance.group_id:
+        counters.change_group_post_count(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def expire_post_pages(sender, instance, **kwargs):
+    versions.bump(
+        *versions.post_scopes(
+            instance.id,
+            instance.author_id,
+            (getattr(instance, "_saved_group_id", None), instance.group_id),
+        )
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def expire_commented_post_pages(sender, instance, **kwargs):
+    versions.bump_post(instance.post_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def expire_group_pages(sender, instance, **kwargs):
+    versions.bump("site", f"group:{instance.id}")
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def expire_follow_pages(sender, instance, **kwargs):
+    versions.bump(f"author:{instance.author_id}", f"author:{instance.user_id}")
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comment_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_comment_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author_stats(instance.author_id, "follower_count", 1)
+        counters.change_author_stats(instance.user_id, "following_count", 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.change_author_stats(instance.author_id, "follower_count", -1)
+    counters.change_author_stats(instance.user_id, "following_count", -1)
+
+
+@receiver(post_save, sender=Follow)
+def cache_new_follow(sender, instance, created, **kwargs):
+    if created:
+        follow_graph.followed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def cache_deleted_follow(sender, instance, **kwargs):
+    follow_graph.unfollowed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def refill_timelines(sender, instance, **kwargs):
+    # После count_deleted_follow: нужен уже уменьшенный счётчик.
+    timeline.author_unfollowed(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.get_backend().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_backend().remove(instance.id)
+
+
+@receiver(post_delete, sender=Post)
+def delete_image_variants(sender, instance, **kwargs):
+    variants.delete(variants.load(instance.image_variants))
@@ -0,0 +1,82 @@
+"""Стеммер Snowball для русского языка.
+
+Нужен поиску на SQLite: в FTS5 нет русской морфологии, поэтому текст
+постов и запрос приводятся к основам слов до индексации.
+"""
+import re
+from functools import lru_cache
+
+VOWELS = "аеиоуыэюя"
+
+_RV = re.compile(f"[{VOWELS}]")
+_REGION = re.compile(f"[{VOWELS}][^{VOWELS}]")
+_WORD = re.compile(r"\w+")
+
+_PERFECTIVE_GERUND = re.compile(
+    r"(?:(?<=[ая])(?:вшись|вши|в)|(?:ившись|ывшись|ивши|ывши|ив|ыв))$"
+)
+_REFLEXIVE = re.compile(r"(?:ся|сь)$")
+_ADJECTIVE = (
+    r"(?:ими|ыми|его|ого|ему|ому|ее|ие|ые|ое|ей|ий|ый|ой|ем|им|ым|ом"
+    r"|их|ых|ую|юю|ая|яя|ою|ею)"
+)
+_PARTICIPLE = r"(?:(?<=[ая])(?:ем|нн|вш|ющ|щ)|(?:ивш|ывш|ующ))"
+_ADJECTIVAL = re.compile(f"(?:{_PARTICIPLE})?{_ADJECTIVE}$")
+_VERB = re.compile(
+    r"(?:(?<=[ая])(?:ете|йте|ешь|нно|ла|на|ли|ем|ло|но|ет|ют|ны|ть|й|л|н)"
+    r"|(?:ейте|уйте|ила|ыла|ена|ите|или|ыли|ило|ыло|ено|ует|уют|ены|ить"
+    r"|ыть|ишь|ей|уй|ил|ыл|им|ым|ен|ят|ит|ыт|ую|ю))$"
+)
+_NOUN = re.compile(
+    r"(?:иями|ями|ами|ией|иям|ием|иях|ев|ов|ие|ье|еи|ии|ей|ой|ий|ям|ем"
+    r"|ам|ом|ах|ях|ию|ью|ия|ья|а|е|и|й|о|у|ы|ь|ю|я)$"
+)
+_DERIVATIONAL = re.compile(r"ость?$")
+_SUPERLATIVE = re.compile(r"ейше?$")
+
+
+def _region(word, start):
+    match = _REGION.search(word, start)
+    return match.end() if match else len(word)
+
+
+# Словарь живого текста невелик, а частые слова повторяются постоянно.
+@lru_cache(maxsize=65536)
+def stem(word):
+    """Возвращает основу одного слова."""
+    word = word.lower().replace("ё", "е")
+    match = _RV.search(word)
+    if not match:
+        return word
+    rv_start = match.end()
+    r2_start = _region(word, _region(word, 0))
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    stripped = _PERFECTIVE_GERUND.sub("", rv, 1)
+    if stripped == rv:
+        rv = _REFLEXIVE.sub("", rv, 1)
+        for ending in (_ADJECTIVAL, _VERB, _NOUN):
+            stripped = ending.sub("", rv, 1)
+            if stripped != rv:
+                break
+    rv = stripped
+
+    if rv.endswith("и"):
+        rv = rv[:-1]
+
+    derivational = _DERIVATIONAL.search(rv)
+    if derivational and rv_start + derivational.start() >= r2_start:
+        rv = rv[: derivational.start()]
+
+    if _SUPERLATIVE.search(rv):
+        rv = _SUPERLATIVE.sub("", rv, 1)
+        if rv.endswith("нн"):
+            rv = rv[:-1]
+    elif rv.endswith("нн") or rv.endswith("ь"):
+        rv = rv[:-1]
+    return prefix + rv
+
+
+def stem_text(text):
+    """Разбивает текст на слова и возвращает их основы через пробел."""
+    return " ".join(stem(word) for word in _WORD.findall(text))
@@ -0,0 +1,24 @@
+from django import template
+
+from posts import thumbnails, variants
+
+register = template.Library()
+
+SIZES = "(min-width: 992px) 960px, 100vw"
+
+
+@register.simple_tag
+def post_thumbnail(post):
+    """Готовая миниатюра картинки поста или None, пока она готовится."""
+    return thumbnails.lookup(post.image)
+
+
+@register.inclusion_tag("posts/includes/post_picture.html")
+def post_picture(post):
+    """<picture> с WebP/AVIF-вариантами и миниатюрой для старых браузеров."""
+    return {
+        "post": post,
+        "fallback": thumbnails.lookup(post.image),
+        "sources": variants.sources(post),
+        "sizes": SIZES,
+    }
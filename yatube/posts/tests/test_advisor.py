@@ -0,0 +1,55 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import advisor, bench, seeding
+
+
+@override_settings(METRICS_SLOW_REQUEST_MS=None)
+class IndexAdvisorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seeding.seed(
+            users=30, groups=3, posts=300, follows=100, comments=200, seed=2
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_use_indexes(self):
+        """Запросы лент не читают таблицы целиком и не сортируют их."""
+        report = advisor.audit()
+        self.assertEqual(set(report), set(bench.SCENARIOS))
+        for name, queries in report.items():
+            with self.subTest(scenario=name):
+                self.assertEqual(queries, [])
+
+    def test_cached_pages_are_rendered_again(self):
+        """Страница из кэша сервера не прячет запросы от проверки."""
+        self.client.get(reverse("posts:index"))
+        with mock.patch.object(
+            advisor, "explain", wraps=advisor.explain
+        ) as explain:
+            advisor.audit(["index"])
+        self.assertTrue(explain.called)
+
+    def test_problems_are_found_in_sqlite_plans(self):
+        plan = [
+            "SCAN posts_post",
+            "SCAN posts_post USING INDEX posts_post_pub_date",
+            "SEARCH auth_user USING INTEGER PRIMARY KEY (rowid=?)",
+            "USE TEMP B-TREE FOR RIGHT PART OF ORDER BY",
+            "USE TEMP B-TREE FOR ORDER BY",
+        ]
+        if connection.vendor != "sqlite":
+            self.skipTest("Формат плана SQLite")
+        self.assertEqual(
+            advisor.problems(plan),
+            [
+                (advisor.FULL_SCAN, "SCAN posts_post"),
+                (advisor.SORT, "USE TEMP B-TREE FOR ORDER BY"),
+            ],
+        )
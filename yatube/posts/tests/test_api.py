@@ -0,0 +1,139 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import api, versions
+from ..models import Comment, Group, Post
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class ApiTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author")
+        cls.other = User.objects.create_user(username="other")
+        cls.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f"Пост {i}"
+            )
+            for i in range(25)
+        ]
+        cls.other_post = Post.objects.create(author=cls.other, text="Чужой")
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.posts[0], author=cls.other, text=f"Комментарий {i}"
+            )
+
+    def test_post_list_pages_by_cursor(self):
+        url = reverse("api:post_list")
+        with self.assertMaxQueries(1):
+            first = self.client.get(url).json()
+        self.assertEqual(len(first["results"]), 20)
+        self.assertEqual(first["results"][0]["text"], "Чужой")
+        second = self.client.get(url, {"cursor": first["next_cursor"]}).json()
+        self.assertEqual(len(second["results"]), 6)
+        self.assertIsNone(second["next_cursor"])
+        self.assertEqual(second["results"][-1]["id"], self.posts[0].id)
+
+    def test_feeds_are_scoped(self):
+        group = self.client.get(
+            reverse("api:group_posts", args=(self.group.slug,)),
+            {"limit": 100},
+        ).json()
+        self.assertEqual(len(group["results"]), 25)
+        author = self.client.get(
+            reverse("api:author_posts", args=(self.other.username,))
+        ).json()
+        self.assertEqual(
+            [post["id"] for post in author["results"]], [self.other_post.id]
+        )
+        missing = self.client.get(reverse("api:group_posts", args=("nope",)))
+        self.assertEqual(missing.status_code, 404)
+
+    def test_post_detail_and_comments(self):
+        post = self.posts[0]
+        data = self.client.get(reverse("api:post_detail", args=(post.id,)))
+        self.assertEqual(
+            data.json(),
+            {
+                "id": post.id,
+                "text": "Пост 0",
+                "pub_date": data.json()["pub_date"],
+                "author": "author",
+                "group": "group",
+                "image": None,
+                "comment_count": 3,
+            },
+        )
+        comments = self.client.get(
+            reverse("api:post_comments", args=(post.id,))
+        ).json()
+        self.assertEqual(
+            [comment["text"] for comment in comments["results"]],
+            ["Комментарий 0", "Комментарий 1", "Комментарий 2"],
+        )
+        missing = self.client.get(reverse("api:post_detail", args=(10 ** 6,)))
+        self.assertEqual(missing.status_code, 404)
+
+    def test_conditional_requests_get_not_modified(self):
+        url = reverse("api:post_detail", args=(self.posts[0].id,))
+        response = self.client.get(url)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        self.assertEqual(
+            self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=last_modified
+            ).status_code,
+            304,
+        )
+        Post.objects.filter(pk=self.posts[0].pk).update(text="Правка")
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
+
+    def test_edit_changes_last_modified(self):
+        """Правка поста не отдаёт 304 по одному If-Modified-Since."""
+        post = self.posts[0]
+        url = reverse("api:post_detail", args=(post.id,))
+        cache.set(
+            versions._key(f"post:{post.id}"),
+            time.time_ns() - 10 * versions.NANOSECONDS,
+            None,
+        )
+        last_modified = self.client.get(url)["Last-Modified"]
+        post.text = "Правка"
+        post.save()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["text"], "Правка")
+
+    def test_api_is_read_only(self):
+        response = self.client.post(reverse("api:post_list"))
+        self.assertEqual(response.status_code, 405)
+
+    def test_export_streams_json_lines(self):
+        response = self.client.get(
+            reverse("api:post_export"), {"author": "author"}
+        )
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)["id"] for line in lines],
+            [post.id for post in self.posts],
+        )
+
+    def test_export_reads_in_chunks(self):
+        with self.assertNumQueries(4):
+            lines = list(api.export_lines(Post.objects.all(), chunk_size=10))
+        self.assertEqual(len(lines), 26)
@@ -0,0 +1,55 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .. import bench, seeding
+from ..models import AuthorStats, Comment, Follow, Post, TimelineEntry
+
+
+@override_settings(METRICS_SLOW_REQUEST_MS=None)
+class BenchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.created = seeding.seed(
+            users=30, groups=3, posts=200, follows=100, comments=300, seed=1
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_builds_derived_data(self):
+        """После bulk_create пересобраны счётчики, ленты и даты."""
+        self.assertEqual(
+            self.created,
+            {
+                "users": 30,
+                "groups": 3,
+                "posts": 200,
+                "comments": 300,
+                "follows": 100,
+            },
+        )
+        self.assertEqual(Follow.objects.count(), 100)
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list("post_count", flat=True)),
+            200,
+        )
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertGreater(Post.objects.dates("pub_date", "day").count(), 1)
+        self.assertGreater(Comment.objects.dates("created", "day").count(), 1)
+
+    def test_run_measures_every_scenario(self):
+        results = bench.run(repeat=2, warmup=0)
+        self.assertEqual(set(results), set(bench.SCENARIOS))
+        for result in results.values():
+            self.assertGreater(result["queries"], 0)
+            self.assertGreater(result["p50_ms"], 0)
+            self.assertGreater(result["peak_kib"], 0)
+
+    def test_compare_reports_regressions(self):
+        expected = {"p50_ms": 10, "p95_ms": 20, "queries": 3, "peak_kib": 100}
+        baseline = {"index": expected}
+        same = dict(expected, p50_ms=12)
+        self.assertEqual(bench.compare({"index": same}, baseline), [])
+        worse = dict(expected, p95_ms=30, queries=4)
+        regressions = bench.compare({"index": worse}, baseline)
+        self.assertEqual(len(regressions), 2)
@@ -0,0 +1,81 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+
+    def get_stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются при создании и удалении записей."""
+        post = Post.objects.create(author=self.author, text="Пост")
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text="Комментарий"
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(self.get_stats(self.author).post_count, 1)
+        self.assertEqual(self.get_stats(self.author).follower_count, 1)
+        self.assertEqual(self.get_stats(self.reader).following_count, 1)
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+        self.assertEqual(self.get_stats(self.author).follower_count, 0)
+        self.assertEqual(self.get_stats(self.reader).following_count, 0)
+        post.delete()
+        self.assertEqual(self.get_stats(self.author).post_count, 0)
+
+    def test_group_post_count_follows_moves(self):
+        """Число постов группы учитывает перенос поста между группами."""
+        first = Group.objects.create(title="Первая", slug="first")
+        second = Group.objects.create(title="Вторая", slug="second")
+        post = Post.objects.create(
+            author=self.author, text="Пост", group=first
+        )
+        Post.objects.create(author=self.author, text="Ещё", group=first)
+        post.group = second
+        post.save()
+        post.text = "Правка"
+        post.save()
+        counts = dict(Group.objects.values_list("slug", "post_count"))
+        self.assertEqual(counts, {"first": 1, "second": 1})
+        post.delete()
+        second.refresh_from_db()
+        self.assertEqual(second.post_count, 0)
+
+    def test_rebuild_counters_command(self):
+        """Команда rebuild_counters исправляет разъехавшиеся счётчики."""
+        post = Post.objects.create(author=self.author, text="Пост")
+        Comment.objects.create(post=post, author=self.reader, text="Текст")
+        Follow.objects.create(user=self.reader, author=self.author)
+        group = Group.objects.create(title="Группа", slug="group")
+        Post.objects.create(author=self.author, text="В группе", group=group)
+        Post.objects.update(comment_count=7)
+        Group.objects.update(post_count=5)
+        AuthorStats.objects.all().delete()
+        call_command("rebuild_counters", stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        group.refresh_from_db()
+        self.assertEqual(group.post_count, 1)
+        stats = self.get_stats(self.author)
+        self.assertEqual(
+            (stats.post_count, stats.follower_count, stats.following_count),
+            (2, 1, 0),
+        )
+        self.assertEqual(self.get_stats(self.reader).following_count, 1)
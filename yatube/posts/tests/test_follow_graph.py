@@ -0,0 +1,125 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import follow_graph
+from ..models import Follow, Post
+from .utils import run_commit_hooks
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username="reader")
+        cls.authors = [
+            User.objects.create_user(username=f"author{i}") for i in range(3)
+        ]
+        for author in cls.authors:
+            Post.objects.create(author=author, text=f"Пост {author}")
+        Follow.objects.create(user=cls.reader, author=cls.authors[0])
+        run_commit_hooks()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_follows_reset_cached_entries(self):
+        """Подписка и отписка сбрасывают записи, и они читаются заново."""
+        first, second, third = (author.id for author in self.authors)
+        self.assertTrue(follow_graph.is_following(self.reader.id, first))
+        self.assertEqual(
+            follow_graph.follower_counts([first, second]),
+            {first: 1, second: 0},
+        )
+        self.client.get(
+            reverse("posts:profile_follow", args=(self.authors[1].username,))
+        )
+        run_commit_hooks()
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                follow_graph.followees(self.reader.id),
+                {first, second},
+            )
+            self.assertEqual(follow_graph.follower_count(second), 1)
+        self.client.get(
+            reverse("posts:profile_unfollow", args=(self.authors[0].username,))
+        )
+        run_commit_hooks()
+        follow_graph.follower_count(first)
+        with self.assertNumQueries(1):
+            self.assertFalse(follow_graph.is_following(self.reader.id, first))
+        with self.assertNumQueries(0):
+            self.assertFalse(follow_graph.is_following(self.reader.id, first))
+            self.assertEqual(follow_graph.follower_count(first), 0)
+
+    def test_hot_pages_do_not_read_follow_table(self):
+        """Профиль и лента подписок берут подписки из кэша."""
+        urls = (
+            reverse("posts:profile", args=(self.authors[0].username,)),
+            reverse("posts:follow_index"),
+        )
+        for url in urls:
+            self.client.get(url)
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(
+                    [
+                        query["sql"]
+                        for query in queries
+                        if Follow._meta.db_table in query["sql"]
+                    ]
+                )
+
+
+class FollowGraphCommitTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username="reader")
+        self.author = User.objects.create_user(username="author")
+
+    def test_rolled_back_follow_leaves_no_trace(self):
+        self.assertFalse(
+            follow_graph.is_following(self.reader.id, self.author.id)
+        )
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Follow.objects.create(user=self.reader, author=self.author)
+                # Сама транзакция видит подписку, но в кэш она не попадает.
+                self.assertTrue(
+                    follow_graph.is_following(self.reader.id, self.author.id)
+                )
+                self.assertEqual(
+                    follow_graph.follower_count(self.author.id), 1
+                )
+                raise RuntimeError
+        self.assertFalse(
+            follow_graph.is_following(self.reader.id, self.author.id)
+        )
+        self.assertEqual(follow_graph.follower_count(self.author.id), 0)
+
+    def test_entries_loaded_before_commit_are_dropped(self):
+        with transaction.atomic():
+            Follow.objects.create(user=self.reader, author=self.author)
+            # Параллельный запрос ещё видит базу до подписки.
+            cache.set(
+                follow_graph._followees_key(self.reader.id),
+                frozenset(),
+                follow_graph.FOLLOW_GRAPH_TIMEOUT,
+            )
+            cache.set(
+                follow_graph._followers_key(self.author.id),
+                0,
+                follow_graph.FOLLOW_GRAPH_TIMEOUT,
+            )
+        self.assertTrue(
+            follow_graph.is_following(self.reader.id, self.author.id)
+        )
+        self.assertEqual(follow_graph.follower_count(self.author.id), 1)
@@ -0,0 +1,164 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import follow_graph, follows
+from ..models import AuthorStats, Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class BulkFollowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username="reader")
+        cls.authors = [
+            User.objects.create_user(username=f"author{i}") for i in range(3)
+        ]
+        for author in cls.authors:
+            Post.objects.create(author=author, text=f"Пост {author}")
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as file_:
+            file_.write(content)
+        return path
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_import_follows_from_csv_and_jsonl(self):
+        """Импорт создаёт подписки, ленты и счётчики, повторы пропускает."""
+        csv_path = self.write(
+            "follows.csv",
+            "user,author\n"
+            "reader,author0\n"
+            "reader,author1\n"
+            "reader,author1\n"
+            "reader,reader\n"
+            "ghost,author0\n",
+        )
+        out = StringIO()
+        call_command("import_follows", csv_path, batch_size=2, stdout=out)
+        self.assertIn("создано 2, уже были 1", out.getvalue())
+        self.assertIn("неизвестные имена 1, на себя 1", out.getvalue())
+        jsonl_path = self.write(
+            "follows.jsonl",
+            "\n".join(
+                json.dumps({"user": "reader", "author": name})
+                for name in ("author1", "author2")
+            ),
+        )
+        out = StringIO()
+        call_command("import_follows", jsonl_path, stdout=out)
+        self.assertIn("создано 1, уже были 1", out.getvalue())
+        self.assertEqual(
+            set(
+                Follow.objects.filter(user=self.reader).values_list(
+                    "author__username", flat=True
+                )
+            ),
+            {"author0", "author1", "author2"},
+        )
+        self.assertEqual(self.stats(self.reader).following_count, 3)
+        self.assertEqual(self.stats(self.authors[1]).follower_count, 1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3
+        )
+
+    def test_bulk_follow_endpoint(self):
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        self.assertTrue(
+            follow_graph.is_following(self.reader.id, self.authors[0].id)
+        )
+        self.client.force_login(self.reader)
+        response = self.client.post(
+            reverse("posts:follow_bulk"),
+            json.dumps(
+                {
+                    "follow": ["author1", "author2", "ghost"],
+                    "unfollow": ["author0"],
+                }
+            ),
+            content_type="application/json",
+        )
+        self.assertEqual(
+            response.json(),
+            {"followed": 2, "unfollowed": 1, "unknown": ["ghost"]},
+        )
+        self.assertEqual(
+            follow_graph.followees(self.reader.id),
+            {self.authors[1].id, self.authors[2].id},
+        )
+        self.assertEqual(self.stats(self.reader).following_count, 2)
+        self.assertEqual(self.stats(self.authors[0]).follower_count, 0)
+        self.assertEqual(
+            list(
+                TimelineEntry.objects.filter(user=self.reader)
+                .order_by("post__author_id")
+                .values_list("post__author__username", flat=True)
+            ),
+            ["author1", "author2"],
+        )
+
+    def test_bulk_follow_rejects_bad_requests(self):
+        url = reverse("posts:follow_bulk")
+        self.assertEqual(self.client.post(url).status_code, 302)
+        self.client.force_login(self.reader)
+        self.assertEqual(self.client.get(url).status_code, 405)
+        for body in (
+            "[]",
+            "{",
+            {"follow": "abc"},
+            {"follow": [{"x": 1}]},
+            {"unfollow": [["a"]]},
+            {"follow": None},
+        ):
+            with self.subTest(body=body):
+                response = self.client.post(
+                    url,
+                    body if isinstance(body, str) else json.dumps(body),
+                    content_type="application/json",
+                )
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_follow_many_backfills_by_fresh_follower_counts(self):
+        """Решение о раскладке не берёт число подписчиков из старого кэша."""
+        author = self.authors[0]
+        follow_graph.follower_count(author.id)
+        cache.set(
+            follow_graph._followers_key(author.id),
+            10 ** 6,
+            follow_graph.FOLLOW_GRAPH_TIMEOUT,
+        )
+        follows.follow_many([(self.reader.id, author.id)])
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.reader, post__author=author
+            ).exists()
+        )
+
+    def test_follow_many_counts_only_inserted_pairs(self):
+        """Пары, вставленные параллельно, не считаются дважды."""
+        pairs = {(self.reader.id, author.id) for author in self.authors}
+        # Параллельная подписка успела после проверки _existing.
+        with mock.patch.object(follows, "_existing", return_value=set()):
+            Follow.objects.create(user=self.reader, author=self.authors[0])
+            self.assertEqual(follows.follow_many(pairs), 2)
+        self.assertEqual(self.stats(self.reader).following_count, 3)
+        self.assertEqual(self.stats(self.authors[0]).follower_count, 1)
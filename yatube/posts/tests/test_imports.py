@@ -0,0 +1,230 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import importing
+from ..models import AuthorStats, Follow, Group, Post, TimelineEntry
+from ..search import get_backend
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+    b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+    b"\x0A\x00\x3B"
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write(self, name, content, mode="w"):
+        path = os.path.join(self.directory, name)
+        with open(path, mode) as file_:
+            file_.write(content)
+        return path
+
+    def test_import_posts_command(self):
+        """Импорт создаёт посты с лентами, индексом и счётчиками."""
+        self.write("cat.gif", SMALL_GIF, "wb")
+        records = [
+            {
+                "author": "author",
+                "text": "Импортированный кот",
+                "group": "group",
+                "pub_date": "2020-01-02T03:04:05",
+                "image": "cat.gif",
+            },
+            {"author": "author", "text": "Второй пост"},
+            {"author": "ghost", "text": "Чужой пост"},
+            {"author": "author", "text": "   "},
+            {"author": "author", "text": "Пост", "image": "../cat.gif"},
+        ]
+        path = self.write(
+            "posts.jsonl",
+            "\n".join(json.dumps(record) for record in records) + "\n{",
+        )
+        out, err = StringIO(), StringIO()
+        call_command(
+            "import_posts",
+            path,
+            images_dir=self.directory,
+            batch_size=2,
+            stdout=out,
+            stderr=err,
+        )
+        self.assertIn("Прочитано 6, создано 2, с ошибками 4", out.getvalue())
+        self.assertIn("Строка 3: Нет автора ghost", err.getvalue())
+        self.assertIn(
+            "Строка 4: поле Text не должно быть пустым", err.getvalue()
+        )
+        self.assertIn("Строка 6:", err.getvalue())
+        post = Post.objects.get(text="Импортированный кот")
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(
+            post.pub_date, timezone.make_aware(datetime(2020, 1, 2, 3, 4, 5))
+        )
+        self.assertTrue(post.image.name.startswith("posts/cat"))
+        self.assertTrue(post.image_variants)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).post_count, 2
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.post_count, 1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+        self.assertEqual(
+            list(get_backend().search(Post.objects.all(), "кот")), [post]
+        )
+
+    def test_failed_batch_removes_copied_images(self):
+        self.write("cat.gif", SMALL_GIF, "wb")
+        records = [
+            (1, {"author": "author", "text": "Кот", "image": "cat.gif"})
+        ]
+        images = os.path.join(TEMP_MEDIA_ROOT, "posts")
+        os.makedirs(images, exist_ok=True)
+        before = set(os.listdir(images))
+        with mock.patch.object(
+            importing.timeline, "fan_out_after", side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                importing.import_records(records, images_dir=self.directory)
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(set(os.listdir(images)), before)
+
+    def test_only_touched_counters_are_recounted(self):
+        # Счётчик чужого автора разошёлся с базой, импорт его не трогает.
+        AuthorStats.objects.update_or_create(
+            user=self.reader, defaults={"post_count": 7}
+        )
+        records = [(1, {"author": "author", "text": "Пост"})]
+        importing.import_records(records)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).post_count, 1
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).post_count, 7
+        )
+
+    def test_upload_endpoint_is_staff_only(self):
+        url = reverse("posts:post_import")
+        upload = SimpleUploadedFile(
+            "posts.csv",
+            "author,text,group\nauthor,Из CSV,group\nauthor,,\n".encode(),
+        )
+        self.client.force_login(self.author)
+        response = self.client.post(url, {"file": upload})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Post.objects.exists())
+        staff = User.objects.create_user(username="staff", is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url).status_code, 405)
+        upload.seek(0)
+        response = self.client.post(url, {"file": upload})
+        self.assertEqual(
+            response.json(),
+            {
+                "read": 2,
+                "created": 1,
+                "invalid": 1,
+                "errors": [
+                    {"line": 3, "message": "поле Text не должно быть пустым"}
+                ],
+            },
+        )
+        self.assertEqual(Post.objects.get().group_id, self.group.id)
+
+
+IMPORT_SCRIPT = """
+import json, os
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from posts.models import AuthorStats, Follow, Post, TimelineEntry
+call_command("migrate", verbosity=0)
+User = get_user_model()
+author = User.objects.create_user(username="author")
+reader = User.objects.create_user(username="reader")
+Follow.objects.create(user=reader, author=author)
+call_command(
+    "import_posts", os.environ["IMPORT_PATH"], batch_size=5, processes=2
+)
+print(json.dumps([
+    Post.objects.count(),
+    AuthorStats.objects.get(user=author).post_count,
+    TimelineEntry.objects.filter(user=reader).count(),
+]))
+"""
+
+
+class ImportProcessesTests(SimpleTestCase):
+    def test_import_posts_in_processes(self):
+        """--processes: пачки вставляют воркеры в общую базу."""
+        # Тестовая база SQLite в памяти не видна дочерним процессам,
+        # поэтому команда запускается отдельно на файловой базе.
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, "posts.jsonl")
+        with open(path, "w", encoding="utf-8") as file_:
+            for number in range(23):
+                file_.write(
+                    json.dumps({"author": "author", "text": f"Пост {number}"})
+                    + "\n"
+                )
+        env = dict(
+            os.environ,
+            DATABASE_URL="sqlite:///" + os.path.join(directory, "db.sqlite3"),
+            YATUBE_CACHE_DIR=os.path.join(directory, "cache"),
+            IMPORT_PATH=path,
+        )
+        env.pop("DATABASE_REPLICA_URLS", None)
+        result = subprocess.run(
+            [sys.executable, "manage.py", "shell", "-c", IMPORT_SCRIPT],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("Прочитано 23, создано 23", result.stdout)
+        self.assertEqual(
+            json.loads(result.stdout.splitlines()[-1]), [23, 23, 23]
+        )
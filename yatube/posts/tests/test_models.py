@@ -1,7 +1,8 @@
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import Follow, Group, Post
 
 User = get_user_model()
 
@@ -58,3 +59,13 @@ class PostModelTest(TestCase):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value
                 )
+
+
+class FollowModelTest(TestCase):
+    def test_follow_pair_is_unique(self):
+        """Повторная подписка на того же автора не сохраняется."""
+        user = User.objects.create_user(username="reader")
+        author = User.objects.create_user(username="author")
+        Follow.objects.create(user=user, author=author)
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=user, author=author)
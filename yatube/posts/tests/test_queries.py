@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from .utils import QueryBudgetMixin, run_commit_hooks
+
+User = get_user_model()
+
+
+class FeedQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username="author", first_name="Лев", last_name="Толстой"
+        )
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(10):
+            post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f"Пост {i}"
+            )
+            Comment.objects.create(
+                post=post, author=cls.reader, text=f"Комментарий {i}"
+            )
+        run_commit_hooks()
+        # Страницам групп, профилей и постов нужен ещё запрос id для ETag.
+        cls.budgets = (
+            (reverse("posts:index"), 3),
+            (reverse("posts:group_list", args=(cls.group.slug,)), 5),
+            (reverse("posts:profile", args=(cls.author.username,)), 6),
+            (reverse("posts:follow_index"), 4),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds_fit_query_budget(self):
+        """Ленты не делают запросов на каждый пост страницы."""
+        for url, budget in self.budgets:
+            with self.subTest(url=url):
+                with self.assertMaxQueries(budget):
+                    response = self.reader_client.get(url)
+                self.assertEqual(len(response.context["page_obj"]), 10)
+
+    def test_feed_posts_have_comment_count(self):
+        """Посты ленты аннотированы числом комментариев."""
+        response = self.reader_client.get(reverse("posts:index"))
+        for post in response.context["page_obj"]:
+            self.assertEqual(post.comment_count, 1)
+
+    def test_post_detail_comments_fit_query_budget(self):
+        """Комментарии не догружают авторов по одному."""
+        post = Post.objects.filter(author=self.author).first()
+        for i in range(30):
+            user = User.objects.create_user(username=f"commenter{i}")
+            Comment.objects.create(post=post, author=user, text=f"Ещё {i}")
+        with self.assertMaxQueries(5):
+            response = self.reader_client.get(
+                reverse("posts:post_detail", args=(post.id,))
+            )
+        self.assertEqual(len(response.context["comments"]), 20)
+
+    def test_not_modified_pages_skip_rendering(self):
+        """На 304 страница не выбирает посты."""
+        url = reverse("posts:group_list", args=(self.group.slug,))
+        etag = self.client.get(url)["ETag"]
+        with self.assertMaxQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..stemmer import stem
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+        cls.cat_post = Post.objects.create(
+            author=cls.user, text="Кошка спит на подоконнике"
+        )
+        cls.cats_post = Post.objects.create(
+            author=cls.user, text="Кошки, кошки и ещё раз кошки"
+        )
+        cls.dog_post = Post.objects.create(
+            author=cls.user, text="Собака охраняет дом"
+        )
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse("posts:search"), {"q": query, **params}
+        )
+        return response.context["page_obj"]
+
+    def search_ids(self, query):
+        return [post.id for post in self.search(query)]
+
+    def test_stemmer(self):
+        """Стеммер приводит формы слова к одной основе."""
+        self.assertEqual(stem("кошками"), stem("кошка"))
+        self.assertEqual(stem("Публикации"), "публикац")
+
+    def test_search_matches_word_forms_ranked(self):
+        """Поиск находит словоформы и ставит релевантные посты выше."""
+        self.assertEqual(
+            self.search_ids("кошкам"), [self.cats_post.id, self.cat_post.id]
+        )
+        self.assertEqual(self.search_ids("собаки"), [self.dog_post.id])
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        post = Post.objects.get(id=self.dog_post.id)
+        post.text = "Пёс охраняет дом"
+        post.save()
+        self.assertEqual(self.search_ids("собака"), [])
+        self.assertEqual(self.search_ids("пёс"), [post.id])
+        post.delete()
+        self.assertEqual(self.search_ids("дом"), [])
+
+    def test_search_pages_keep_query(self):
+        """Страницы результатов листаются курсором с сохранением запроса."""
+        for i in range(12):
+            Post.objects.create(author=self.user, text=f"Кошка номер {i}")
+        first_page = self.search("кошка")
+        self.assertEqual(len(first_page), 10)
+        response = self.client.get(reverse("posts:search"), {"q": "кошка"})
+        self.assertContains(
+            response, "?q=%D0%BA%D0%BE%D1%88%D0%BA%D0%B0&amp;cursor="
+        )
+        second_page = self.search("кошка", cursor=first_page.next_cursor)
+        self.assertEqual(len(second_page), 4)
+        self.assertFalse(set(first_page) & set(second_page))
+
+    def test_empty_query(self):
+        """Пустой запрос показывает только форму."""
+        response = self.client.get(reverse("posts:search"))
+        self.assertIsNone(response.context["page_obj"])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке ищет через индекс."""
+        admin = User.objects.create_superuser(
+            "admin", "admin@example.com", "password"
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse("admin:posts_post_changelist"), {"q": "кошками"}
+        )
+        self.assertEqual(
+            {post.id for post in response.context["cl"].result_list},
+            {self.cat_post.id, self.cats_post.id},
+        )
@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from .. import seeding
+from ..models import AuthorStats, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+
+def snapshot():
+    return sorted(
+        map(
+            repr,
+            Post.objects.values_list(
+                "author__username", "group__slug", "text", "comment_count"
+            ),
+        )
+    )
+
+
+class SeedTests(TestCase):
+    def test_same_seed_gives_same_data(self):
+        volumes = dict(
+            users=40, groups=3, posts=150, follows=80, comments=120, seed=7
+        )
+        seeding.seed(**volumes)
+        first = snapshot()
+        User.objects.filter(username__startswith="seed7_").delete()
+        Group.objects.filter(slug__startswith="seed7-").delete()
+        seeding.seed(**volumes)
+        self.assertEqual(snapshot(), first)
+
+    def test_popularity_follows_power_law(self):
+        """Немногие авторы собирают большую часть подписчиков."""
+        seeding.seed(
+            users=200, groups=2, posts=300, follows=1000, comments=0, seed=1
+        )
+        counts = list(
+            AuthorStats.objects.order_by("-follower_count").values_list(
+                "follower_count", flat=True
+            )
+        )
+        self.assertEqual(sum(counts), 1000)
+        self.assertGreater(sum(counts[:20]), sum(counts) / 2)
+
+    def test_seed_command_rebuilds_derived_data(self):
+        call_command(
+            "seed",
+            users=20,
+            groups=2,
+            posts=100,
+            follows=60,
+            comments=50,
+            stdout=StringIO(),
+        )
+        self.assertEqual(Post.objects.count(), 100)
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list("post_count", flat=True)),
+            100,
+        )
+
+    def test_seed_command_refuses_to_reuse_seed(self):
+        call_command("seed", users=5, groups=1, posts=0, stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, "seed 0 уже есть"):
+            call_command(
+                "seed", users=5, groups=1, posts=0, stdout=StringIO()
+            )
+        self.assertEqual(User.objects.count(), 5)
@@ -0,0 +1,205 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import (
+    Client,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from PIL import Image
+
+from .. import thumbnails, variants
+from ..models import Post
+
+User = get_user_model()
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+    b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+    b"\x0A\x00\x3B"
+)
+
+
+class TempMediaMixin:
+    """Своя папка MEDIA_ROOT на класс вне дерева проекта."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+
+def uploaded_gif(name):
+    return SimpleUploadedFile(
+        name=name, content=SMALL_GIF, content_type="image/gif"
+    )
+
+
+def uploaded_png(name, size):
+    buffer = BytesIO()
+    Image.new("RGB", size, "teal").save(buffer, "PNG")
+    return SimpleUploadedFile(
+        name=name, content=buffer.getvalue(), content_type="image/png"
+    )
+
+
+@override_settings(THUMBNAIL_WORKERS=0)
+class ThumbnailLookupTests(TempMediaMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_shows_placeholder_until_thumbnail_is_ready(self):
+        """Лента показывает заглушку, пока миниатюра не готова."""
+        post = Post.objects.create(
+            author=self.user, text="Пост", image=uploaded_gif("lookup.gif")
+        )
+        self.assertIsNone(thumbnails.lookup(post.image))
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, "aspect-ratio: 960 / 339")
+        self.assertNotContains(response, "<img class=\"card-img")
+        thumbnails.generate(post.id, post.image.name)
+        thumbnail = thumbnails.lookup(post.image)
+        self.assertIsNotNone(thumbnail)
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, thumbnail.url)
+
+
+@override_settings(THUMBNAIL_WORKERS=0, POST_IMAGE_WIDTHS=(320, 640, 960))
+class ImageVariantTests(TempMediaMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_variants_do_not_exceed_source_width(self):
+        """Варианты режутся только до ширины исходной картинки."""
+        post = Post.objects.create(
+            author=self.user,
+            text="Пост",
+            image=uploaded_png("wide.png", (700, 300)),
+        )
+        thumbnails.generate(post.id, post.image.name)
+        post.refresh_from_db()
+        built = variants.load(post.image_variants)
+        self.assertEqual(
+            {(variant["width"], variant["height"]) for variant in built},
+            {(320, 113), (640, 226)},
+        )
+        self.assertIn("image/webp", {variant["type"] for variant in built})
+        for variant in built:
+            self.assertTrue(default_storage.exists(variant["name"]))
+
+    def test_narrow_image_is_not_upscaled(self):
+        """Картинка уже всех вариантов не растягивается."""
+        post = Post.objects.create(
+            author=self.user,
+            text="Пост",
+            image=uploaded_png("narrow.png", (200, 100)),
+        )
+        thumbnails.generate(post.id, post.image.name)
+        post.refresh_from_db()
+        built = variants.load(post.image_variants)
+        self.assertEqual(
+            {(variant["width"], variant["height"]) for variant in built},
+            {(200, 71)},
+        )
+
+    def test_feed_renders_picture_with_srcset(self):
+        """Карточка отдаёт <picture> с srcset по каждому формату."""
+        post = Post.objects.create(
+            author=self.user,
+            text="Пост",
+            image=uploaded_png("feed.png", (1000, 400)),
+        )
+        thumbnails.generate(post.id, post.image.name)
+        post.refresh_from_db()
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, "<picture>")
+        for source in variants.sources(post):
+            self.assertContains(
+                response,
+                f'<source type="{source["type"]}" '
+                f'srcset="{source["srcset"]}"',
+            )
+        self.assertContains(response, " 960w")
+
+    def test_new_image_replaces_old_variants(self):
+        """Варианты прежней картинки удаляются вместе с ней из поста."""
+        post = Post.objects.create(
+            author=self.user,
+            text="Пост",
+            image=uploaded_png("old.png", (400, 200)),
+        )
+        thumbnails.generate(post.id, post.image.name)
+        post.refresh_from_db()
+        old = variants.load(post.image_variants)
+        post.image = uploaded_png("new.png", (400, 200))
+        post.save()
+        thumbnails.generate(post.id, post.image.name)
+        post.refresh_from_db()
+        self.assertTrue(
+            all("new" in v["name"] for v in variants.load(post.image_variants))
+        )
+        for variant in old:
+            self.assertFalse(default_storage.exists(variant["name"]))
+        new = variants.load(post.image_variants)
+        post.delete()
+        for variant in new:
+            self.assertFalse(default_storage.exists(variant["name"]))
+
+    def test_stale_image_variants_are_discarded(self):
+        """Варианты картинки, которую уже заменили, не попадают в пост."""
+        post = Post.objects.create(
+            author=self.user,
+            text="Пост",
+            image=uploaded_png("stale.png", (400, 200)),
+        )
+        stale_name = post.image.name
+        post.image = uploaded_png("fresh.png", (400, 200))
+        post.save()
+        variants.update(post.id, stale_name)
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, "")
+
+
+@override_settings(THUMBNAIL_WORKERS=0)
+class ThumbnailScheduleTests(TempMediaMixin, TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="auth")
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_post_form_schedules_thumbnail(self):
+        """Сохранение картинки через форму готовит миниатюру заранее."""
+        self.authorized_client.post(
+            reverse("posts:post_create"),
+            data={"text": "С картинкой", "image": uploaded_gif("form.gif")},
+        )
+        post = Post.objects.get(text="С картинкой")
+        self.assertIsNotNone(thumbnails.lookup(post.image))
@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import (
+    Client,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.follower = User.objects.create_user(username="follower")
+
+    def setUp(self):
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+
+    def get_feed(self):
+        response = self.follower_client.get(reverse("posts:follow_index"))
+        return list(response.context["page_obj"])
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост раскладывается в ленту подписчика."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text="Новый пост")
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.follower, post=post
+            ).exists()
+        )
+        self.assertEqual(self.get_feed(), [post])
+
+    def test_follow_backfills_and_unfollow_cleans_timeline(self):
+        """Подписка добавляет старые посты, отписка их убирает."""
+        post = Post.objects.create(author=self.author, text="Старый пост")
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        self.assertEqual(self.get_feed(), [post])
+        follow.delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.get_feed(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_author_is_read_on_demand(self):
+        """Посты популярного автора подмешиваются при чтении ленты."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text="Популярный")
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.get_feed(), [post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_feed_merges_timeline_and_pulled_authors(self):
+        """Лента и посты популярного автора листаются общим курсором."""
+        popular = User.objects.create_user(username="popular")
+        other = User.objects.create_user(username="other")
+        Follow.objects.create(user=self.follower, author=self.author)
+        Follow.objects.create(user=self.follower, author=popular)
+        Follow.objects.create(user=other, author=popular)
+        posts = []
+        for number in range(12):
+            author = popular if number % 3 else self.author
+            posts.append(Post.objects.create(author=author, text=str(number)))
+        # Запись, оставшаяся с тех пор, когда автор раскладывался.
+        TimelineEntry.objects.create(
+            user=self.follower, post=posts[1], pub_date=posts[1].pub_date
+        )
+        url = reverse("posts:follow_index")
+        response = self.follower_client.get(url)
+        first = list(response.context["page_obj"])
+        response = self.follower_client.get(
+            url, {"cursor": response.context["page_obj"].next_cursor}
+        )
+        second = list(response.context["page_obj"])
+        self.assertEqual(first + second, posts[::-1])
+
+
+@override_settings(TIMELINE_FANOUT_LIMIT=1, TIMELINE_BACKFILL_POSTS=2)
+class TimelineRefillTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author")
+        self.follower = User.objects.create_user(username="follower")
+
+    def test_author_back_under_limit_is_fanned_out(self):
+        """После отписки ниже предела последние посты автора в ленте."""
+        other = User.objects.create_user(username="other")
+        Follow.objects.create(user=self.follower, author=self.author)
+        follow = Follow.objects.create(user=other, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f"Пост {number}")
+            for number in range(3)
+        ]
+        self.assertFalse(TimelineEntry.objects.exists())
+        follow.delete()
+        self.assertEqual(
+            set(
+                TimelineEntry.objects.filter(user=self.follower).values_list(
+                    "post_id", flat=True
+                )
+            ),
+            {posts[1].id, posts[2].id},
+        )
+
+    def test_rolled_back_unfollow_does_not_refill(self):
+        other = User.objects.create_user(username="other")
+        Follow.objects.create(user=self.follower, author=self.author)
+        follow = Follow.objects.create(user=other, author=self.author)
+        Post.objects.create(author=self.author, text="Пост")
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                follow.delete()
+                raise RuntimeError
+        self.assertFalse(TimelineEntry.objects.exists())
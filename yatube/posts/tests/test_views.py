@@ -8,7 +8,7 @@ from django.urls import reverse
 from django import forms
 from django.core.cache import cache
 
-from ..models import Post, Group
+from ..models import Comment, Post, Group
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 User = get_user_model()
@@ -141,15 +141,38 @@ class TaskPagesTests(TestCase):
         self.assertEqual(len(response.context["page_obj"]), 10)
 
     def test_second_page_contains_three_records(self):
-        response = self.client.get(self.paginated_urls[0][0] + "?page=2")
+        response = self.client.get(self.paginated_urls[0][0])
+        next_cursor = response.context["page_obj"].next_cursor
+        response = self.client.get(
+            self.paginated_urls[0][0], {"cursor": next_cursor}
+        )
         self.assertEqual(len(response.context["page_obj"]), 4)
 
+    def test_keyset_page_has_no_number(self):
+        """Страница по курсору не притворяется нумерованной."""
+        page_obj = self.client.get(self.paginated_urls[0][0]).context[
+            "page_obj"
+        ]
+        for method in (
+            page_obj.start_index,
+            page_obj.end_index,
+            page_obj.next_page_number,
+            page_obj.previous_page_number,
+        ):
+            with self.subTest(method=method.__name__):
+                with self.assertRaises(NotImplementedError):
+                    method()
+
     def test_first_group_list_page_contains_ten_records(self):
         response = self.client.get(self.paginated_urls[1][0])
         self.assertEqual(len(response.context["page_obj"]), 10)
 
     def test_second_group_list_page_contains_three_records(self):
-        response = self.client.get(self.paginated_urls[1][0] + "?page=2")
+        response = self.client.get(self.paginated_urls[1][0])
+        next_cursor = response.context["page_obj"].next_cursor
+        response = self.client.get(
+            self.paginated_urls[1][0], {"cursor": next_cursor}
+        )
         self.assertEqual(len(response.context["page_obj"]), 4)
 
     def test_first_profile_list_page_contains_ten_records(self):
@@ -157,9 +180,50 @@ class TaskPagesTests(TestCase):
         self.assertEqual(len(response.context["page_obj"]), 10)
 
     def test_second_profile_list_page_contains_three_records(self):
-        response = self.client.get(self.paginated_urls[2][0] + "?page=2")
+        response = self.client.get(self.paginated_urls[2][0])
+        next_cursor = response.context["page_obj"].next_cursor
+        response = self.client.get(
+            self.paginated_urls[2][0], {"cursor": next_cursor}
+        )
         self.assertEqual(len(response.context["page_obj"]), 4)
 
+    def test_cursor_pages_walk_feed_both_ways(self):
+        """Курсоры ведут вперёд и назад по ленте без пропусков."""
+        url = self.paginated_urls[0][0]
+        first_page = self.client.get(url).context["page_obj"]
+        self.assertFalse(first_page.has_previous())
+        second_page = self.client.get(
+            url, {"cursor": first_page.next_cursor}
+        ).context["page_obj"]
+        self.assertFalse(second_page.has_next())
+        feed_ids = list(
+            Post.objects.order_by("-pub_date", "-id").values_list(
+                "id", flat=True
+            )
+        )
+        self.assertEqual(
+            [post.id for post in first_page]
+            + [post.id for post in second_page],
+            feed_ids,
+        )
+        previous_page = self.client.get(
+            url, {"cursor": second_page.previous_cursor}
+        ).context["page_obj"]
+        self.assertEqual(list(previous_page), list(first_page))
+        last_page = self.client.get(
+            url, {"cursor": first_page.paginator.last_cursor}
+        ).context["page_obj"]
+        self.assertFalse(last_page.has_next())
+        self.assertEqual([post.id for post in last_page], feed_ids[-10:])
+
+    def test_broken_cursor_shows_first_page(self):
+        """Битый курсор открывает первую страницу ленты."""
+        response = self.client.get(
+            self.paginated_urls[0][0], {"cursor": "not-a-cursor"}
+        )
+        self.assertFalse(response.context["page_obj"].has_previous())
+        self.assertEqual(len(response.context["page_obj"]), 10)
+
     def test_post_detail_page_show_correct_context(self):
         """Шаблон post_detail сформирован с правильным контекстом."""
         response = self.authorized_client.get(self.post_url[0])
@@ -193,7 +257,7 @@ class TaskPagesTests(TestCase):
                     ):
                         result = True
                         break
-                if post_group_title == "Тестовая группа 2":
+                if i == self.group_url_2:
                     self.assertFalse(result)
                 else:
                     self.assertTrue(result)
@@ -261,17 +325,123 @@ class TaskPagesTests(TestCase):
             self.assertEqual(post_image, "posts/small_0.gif")
 
     def test_cache_post(self):
-        """Проверка корректной работы кэширования постов"""
+        """Карточки постов берутся из кэша до изменения поста"""
         response_1 = self.authorized_client.get(self.index_url[0])
-        result_1 = response_1.content
-        Post.objects.get(id=1).delete()
+        self.assertContains(response_1, self.post_2.text)
+        Post.objects.filter(id=self.post_2.id).update(text="Обход сигналов")
         response_2 = self.authorized_client.get(self.index_url[0])
-        result_2 = response_2.content
-        self.assertTrue(result_1 == result_2)
-        cache.clear()
+        self.assertEqual(response_1.content, response_2.content)
+        post = Post.objects.get(id=self.post_2.id)
+        post.text = "Отредактированный текст"
+        post.save()
         response_3 = self.authorized_client.get(self.index_url[0])
-        result_3 = response_3.content
-        self.assertFalse(result_1 != result_3)
+        self.assertContains(response_3, "Отредактированный текст")
+        post.delete()
+        response_4 = self.authorized_client.get(self.index_url[0])
+        self.assertNotContains(response_4, "Отредактированный текст")
+
+    def test_group_page_shows_only_group_posts(self):
+        """Лента группы не показывает посты других групп и без группы."""
+        other = Post.objects.create(
+            author=self.user, text="Пост другой группы", group=self.group_2
+        )
+        Post.objects.create(author=self.user, text="Пост без группы")
+        response = self.guest_client.get(self.group_url_2[0])
+        self.assertEqual(list(response.context["page_obj"]), [other])
+        self.assertContains(response, "Записей: 1")
+
+    def test_group_first_page_cache_follows_writes(self):
+        """Кэш первой страницы группы сбрасывается при переносе поста."""
+        response = self.guest_client.get(self.group_url[0])
+        self.assertContains(response, self.post_2.text)
+        Post.objects.filter(id=self.post_2.id).update(group=self.group_2)
+        response = self.guest_client.get(self.group_url[0])
+        self.assertContains(response, self.post_2.text)
+        Post.objects.filter(id=self.post_2.id).update(group=self.group)
+        post = Post.objects.get(id=self.post_2.id)
+        post.group = self.group_2
+        post.save()
+        response = self.guest_client.get(self.group_url[0])
+        self.assertNotContains(response, self.post_2.text)
+        response = self.guest_client.get(self.group_url_2[0])
+        self.assertContains(response, self.post_2.text)
+
+    def test_post_comments_are_paginated(self):
+        """Комментарии поста выводятся страницами, старые сначала."""
+        comments = [
+            Comment.objects.create(
+                post=self.post, author=self.user_2, text=f"Комментарий {i}"
+            )
+            for i in range(25)
+        ]
+        response = self.guest_client.get(self.post_url[0])
+        first_page = response.context["comments"]
+        self.assertEqual(
+            [comment["id"] for comment in first_page],
+            [comment.id for comment in comments[:20]],
+        )
+        self.assertTrue(first_page.has_next())
+        fragment_url = reverse(
+            "posts:post_comments", kwargs={"post_id": self.post.id}
+        )
+        response = self.guest_client.get(
+            fragment_url, {"cursor": first_page.next_cursor}
+        )
+        self.assertContains(response, "Комментарий 24")
+        self.assertNotContains(response, "Комментарий 19")
+        self.assertNotContains(response, "data-comments-more")
+        response = self.guest_client.get(
+            fragment_url, {"cursor": first_page.next_cursor, "format": "json"}
+        )
+        data = response.json()
+        self.assertEqual(len(data["comments"]), 5)
+        self.assertEqual(data["comments"][0]["author"], "Follower")
+        self.assertIsNone(data["next_cursor"])
+
+    def test_comments_of_missing_post_are_not_found(self):
+        response = self.guest_client.get(
+            reverse("posts:post_comments", kwargs={"post_id": 10 ** 6})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_public_pages_answer_not_modified(self):
+        """Страница отвечает 304, пока в её области ничего не менялось."""
+        urls = (
+            self.index_url[0],
+            self.group_url[0],
+            self.profile_url[0],
+            self.post_url[0],
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response["Vary"], "Cookie")
+                self.assertIn("public", response["Cache-Control"])
+                etag = response["ETag"]
+                response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                response = self.guest_client.get(
+                    url,
+                    HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+                )
+                self.assertEqual(response.status_code, 304)
+                Comment.objects.create(
+                    post=self.post, author=self.user_2, text="Новость"
+                )
+                response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_user_pages_are_private_and_per_user(self):
+        guest = self.guest_client.get(self.index_url[0])
+        user = self.authorized_client.get(self.index_url[0])
+        self.assertIn("private", user["Cache-Control"])
+        self.assertIn("no-cache", user["Cache-Control"])
+        self.assertNotEqual(guest["ETag"], user["ETag"])
+        response = self.follow_client.get(
+            self.index_url[0], HTTP_IF_NONE_MATCH=user["ETag"]
+        )
+        self.assertEqual(response.status_code, 200)
 
     def test_follow_unfollow(self):
         """Проверка корректной работы фоллоу и анфоллоу"""
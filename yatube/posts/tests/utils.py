@@ -0,0 +1,33 @@
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    @contextmanager
+    def assertMaxQueries(self, budget, using="default"):
+        """Падает, если блок выполнил больше budget SQL-запросов."""
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        executed = len(context)
+        if executed > budget:
+            queries = "\n".join(
+                query["sql"] for query in context.captured_queries
+            )
+            self.fail(
+                f"Выполнено {executed} запросов при бюджете {budget}:\n"
+                f"{queries}"
+            )
+
+
+def run_commit_hooks(using="default"):
+    """Выполняет отложенные on_commit, как если бы транзакция закрылась.
+
+    TestCase не коммитит, а captureOnCommitCallbacks есть только
+    с Django 3.2.
+    """
+    connection = connections[using]
+    hooks, connection.run_on_commit = connection.run_on_commit, []
+    for _, hook in hooks:
+        hook()
@@ -0,0 +1,95 @@
+"""Заранее подготовленные миниатюры картинок постов.
+
+Миниатюра и адаптивные варианты (см. variants) считаются в пуле
+потоков сразу после сохранения картинки, а шаблоны только ищут готовый
+результат в хранилище sorl-thumbnail и, пока задача не выполнена,
+показывают заглушку.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import cards, variants, versions
+
+logger = logging.getLogger(__name__)
+
+GEOMETRY = "960x339"
+OPTIONS = {"crop": "center", "upscale": True}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class LookupThumbnailBackend(ThumbnailBackend):
+    def lookup(self, file_, geometry_string, **options):
+        """Как get_thumbnail, но без генерации: None, если миниатюры нет."""
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault("format", self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+_backend = LookupThumbnailBackend()
+
+
+def lookup(image):
+    """Готовая миниатюра картинки поста или None."""
+    if not image:
+        return None
+    return _backend.lookup(image.name, GEOMETRY, **OPTIONS)
+
+
+def generate(post_id, image_name):
+    try:
+        variants.update(post_id, image_name)
+        _backend.get_thumbnail(image_name, GEOMETRY, **OPTIONS)
+    except Exception:
+        logger.exception("Не удалось подготовить миниатюру %s", image_name)
+        return
+    cards.bump_post(post_id)
+    versions.bump_post(post_id)
+
+
+def generate_in_worker(post_id, image_name):
+    try:
+        generate(post_id, image_name)
+    finally:
+        connection.close()
+
+
+def _get_executor(workers):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="thumbnails"
+            )
+    return _executor
+
+
+def schedule(post):
+    """Ставит подготовку миниатюры поста в очередь пула."""
+    if not post.image:
+        return
+    workers = getattr(settings, "THUMBNAIL_WORKERS", 2)
+    if not workers:
+        generate(post.id, post.image.name)
+        return
+    _get_executor(workers).submit(
+        generate_in_worker, post.id, post.image.name
+    )
@@ -0,0 +1,219 @@
+"""Лента подписок, материализованная при записи (fan-out on write).
+
+Новый пост раскладывается в TimelineEntry каждому подписчику автора,
+и страница /follow/ читается одним диапазоном по индексу
+(user, -pub_date). Авторы с числом подписчиков больше
+TIMELINE_FANOUT_LIMIT не раскладываются: их посты подмешиваются
+в ленту при чтении, иначе один пост порождал бы миллионы записей.
+Когда после отписок автор снова укладывается в предел, его последние
+посты раскладываются подписчикам заново.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from . import follow_graph
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .paginators import FEED_ORDERING
+
+BATCH_SIZE = 1000
+TIMELINE_ORDERING = ("-feed_date", "-feed_id")
+
+
+def fanout_limit():
+    return getattr(settings, "TIMELINE_FANOUT_LIMIT", 10000)
+
+
+def backfill_limit():
+    return getattr(settings, "TIMELINE_BACKFILL_POSTS", 500)
+
+
+def is_pulled(author_id):
+    """Посты автора читаются при показе ленты, а не раскладываются."""
+    return follow_graph.follower_count(author_id) > fanout_limit()
+
+
+def fan_out(post):
+    """Раскладывает новый пост в ленты подписчиков автора."""
+    if is_pulled(post.author_id):
+        return
+    follower_ids = (
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list("user_id", flat=True)
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in follower_ids
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные посты автора."""
+    if is_pulled(author_id):
+        return
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .values_list("id", "pub_date")
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts
+    )
+
+
+def backfill_many(pairs):
+    """backfill() для пачки пар (подписчик, автор) с одним чтением постов."""
+    pairs = list(pairs)
+    limit = fanout_limit()
+    counts = follow_graph.follower_counts({author for _, author in pairs})
+    pushed = {author for author, count in counts.items() if count <= limit}
+    posts = defaultdict(list)
+    rows = (
+        Post.objects.filter(author_id__in=pushed)
+        .values_list("author_id", "id", "pub_date")
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    for author_id, post_id, pub_date in rows:
+        posts[author_id].append((post_id, pub_date))
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for user_id, author_id in pairs
+        for post_id, pub_date in posts[author_id]
+    )
+
+
+def author_unfollowed(author_id, removed=1):
+    """После отписок автор мог вернуться к раскладке при записи.
+
+    Пока он читался при показе ленты, его посты не раскладывались,
+    поэтому при переходе через TIMELINE_FANOUT_LIMIT вниз последние
+    TIMELINE_BACKFILL_POSTS его постов раскладываются оставшимся
+    подписчикам — после коммита, чтобы откат отписки не оставил
+    лишних записей.
+    """
+    after = (
+        AuthorStats.objects.filter(user_id=author_id)
+        .values_list("follower_count", flat=True)
+        .first()
+        or 0
+    )
+    if after + removed > fanout_limit() >= after:
+        transaction.on_commit(lambda: _push_recent(author_id))
+
+
+def _push_recent(author_id):
+    if is_pulled(author_id):
+        return
+    posts = list(
+        Post.objects.filter(author_id=author_id)
+        .order_by(*FEED_ORDERING)
+        .values_list("id", "pub_date")[: backfill_limit()]
+    )
+    follower_ids = (
+        Follow.objects.filter(author_id=author_id)
+        .values_list("user_id", flat=True)
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for user_id in follower_ids
+        for post_id, pub_date in posts
+    )
+
+
+def forget(user_id, author_id):
+    """Убирает из ленты подписчика посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild():
+    """Раскладывает все ленты заново, например после bulk_create."""
+    entry = TimelineEntry._meta.db_table
+    follow = Follow._meta.db_table
+    post = Post._meta.db_table
+    stats = AuthorStats._meta.db_table
+    with transaction.atomic():
+        TimelineEntry.objects.all().delete()
+        # Одним INSERT ... SELECT: миллионы записей через bulk_create
+        # тратили бы время на создание объектов модели.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {entry} (user_id, post_id, pub_date) "
+                "SELECT DISTINCT f.user_id, p.id, p.pub_date "
+                f"FROM {follow} f JOIN {post} p ON p.author_id = f.author_id "
+                f"WHERE f.author_id NOT IN (SELECT user_id FROM {stats} "
+                "WHERE follower_count > %s)",
+                [fanout_limit()],
+            )
+
+
+def fan_out_after(post_id):
+    """fan_out() для всех постов с id больше post_id одним запросом.
+
+    Уже разложенные записи пропускаются, так что повторный вызов
+    для того же диапазона безопасен.
+    """
+    entry = TimelineEntry._meta.db_table
+    follow = Follow._meta.db_table
+    post = Post._meta.db_table
+    stats = AuthorStats._meta.db_table
+    ops = connection.ops
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"{ops.insert_statement(ignore_conflicts=True)} {entry} "
+            "(user_id, post_id, pub_date) "
+            "SELECT f.user_id, p.id, p.pub_date "
+            f"FROM {follow} f JOIN {post} p ON p.author_id = f.author_id "
+            "WHERE p.id > %s "
+            f"AND f.author_id NOT IN (SELECT user_id FROM {stats} "
+            "WHERE follower_count > %s) "
+            + ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+            [post_id, fanout_limit()],
+        )
+
+
+def follow_feed(user):
+    """Источники постов ленты подписок для MergedKeysetPaginator.
+
+    Своя лента и посты каждого «тянущегося» автора — отдельные
+    запросы с ключом (feed_date, feed_id) по колонкам своего индекса:
+    (user, pub_date, post) ленты или (author, pub_date) постов. Каждый
+    читает диапазон после курсора, а не всю ленту и все посты
+    популярных авторов разом.
+    """
+    sources = [
+        Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_date=F("timeline_entries__pub_date"),
+            feed_id=F("timeline_entries__post"),
+        )
+    ]
+    sources += [
+        Post.objects.filter(author_id=author_id).annotate(
+            feed_date=F("pub_date"), feed_id=F("id")
+        )
+        for author_id in _pulled_authors(user)
+    ]
+    return sources
+
+
+def _pulled_authors(user):
+    counts = follow_graph.follower_counts(follow_graph.followees(user.id))
+    limit = fanout_limit()
+    return [author_id for author_id, count in counts.items() if count > limit]
+
+
+def _bulk_insert(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
@@ -9,12 +9,20 @@ urlpatterns = [
     path("group/<slug:slug>/", views.group_posts, name="group_list"),
     path("profile/<str:username>/", views.profile, name="profile"),
     path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
+    path(
+        "posts/<int:post_id>/comments/",
+        views.post_comments,
+        name="post_comments",
+    ),
     path("create/", views.post_create, name="post_create"),
     path("posts/<int:post_id>/edit/", views.post_edit, name="post_edit"),
     path(
         "posts/<int:post_id>/comment/", views.add_comment, name="add_comment"
     ),
     path("follow/", views.follow_index, name="follow_index"),
+    path("follow/bulk/", views.follow_bulk, name="follow_bulk"),
+    path("search/", views.search, name="search"),
+    path("import/", views.post_import, name="post_import"),
     path(
         "profile/<str:username>/follow/",
         views.profile_follow,
@@ -0,0 +1,124 @@
+"""Адаптивные варианты картинок постов.
+
+Из картинки поста вырезается тот же кадр, что и у миниатюры, в
+нескольких ширинах и современных форматах: WebP всегда, AVIF — если
+установленный Pillow умеет его писать. Описание вариантов хранится
+в Post.image_variants, а тег post_picture собирает из него <picture>.
+"""
+import json
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models import Post
+
+ASPECT = (960, 339)
+WIDTHS = (320, 640, 960, 1440)
+QUALITY = 75
+UPLOAD_TO = "posts/variants"
+# Порядок важен: браузер берёт первый <source>, который понимает.
+FORMATS = (
+    ("AVIF", "avif", "image/avif"),
+    ("WEBP", "webp", "image/webp"),
+)
+
+
+def widths():
+    return getattr(settings, "POST_IMAGE_WIDTHS", WIDTHS)
+
+
+def formats():
+    """Форматы из FORMATS, которые Pillow умеет сохранять."""
+    Image.init()
+    return [format_ for format_ in FORMATS if format_[0] in Image.SAVE]
+
+
+def _frame_widths(source_width):
+    """Ширины не больше исходной, чтобы не раздувать картинку.
+
+    Картинка уже всех ширин остаётся одним вариантом своей ширины.
+    """
+    fitting = [width for width in widths() if width <= source_width]
+    return fitting or [source_width]
+
+
+def _open(image_name):
+    with default_storage.open(image_name) as file_:
+        image = Image.open(file_)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    if "A" in image.getbands() or "transparency" in image.info:
+        return image.convert("RGBA")
+    return image.convert("RGB")
+
+
+def build(image_name):
+    """Сохраняет варианты картинки и возвращает их описание."""
+    image = _open(image_name)
+    stem = posixpath.splitext(posixpath.basename(image_name))[0]
+    built = []
+    for width in _frame_widths(image.width):
+        height = round(width * ASPECT[1] / ASPECT[0])
+        frame = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        for format_, extension, mime in formats():
+            buffer = BytesIO()
+            frame.save(buffer, format_, quality=QUALITY)
+            name = default_storage.save(
+                f"{UPLOAD_TO}/{stem}-{width}w.{extension}",
+                ContentFile(buffer.getvalue()),
+            )
+            built.append(
+                {"name": name, "type": mime, "width": width, "height": height}
+            )
+    return built
+
+
+def load(image_variants):
+    return json.loads(image_variants) if image_variants else []
+
+
+def delete(variants):
+    for variant in variants:
+        default_storage.delete(variant["name"])
+
+
+def update(post_id, image_name):
+    """Готовит варианты картинки поста и записывает их в пост.
+
+    Если картинку успели заменить, пока шла работа, варианты
+    выбрасываются: их подготовит задача для новой картинки.
+    """
+    old = (
+        Post.objects.filter(pk=post_id)
+        .values_list("image_variants", flat=True)
+        .first()
+    )
+    built = build(image_name)
+    updated = Post.objects.filter(pk=post_id, image=image_name).update(
+        image_variants=json.dumps(built)
+    )
+    if not updated:
+        delete(built)
+        return
+    names = {variant["name"] for variant in built}
+    delete(
+        variant for variant in load(old) if variant["name"] not in names
+    )
+
+
+def sources(post):
+    """Источники для <picture>: по одному srcset на формат."""
+    by_type = {}
+    for variant in load(post.image_variants):
+        by_type.setdefault(variant["type"], []).append(
+            f"{default_storage.url(variant['name'])} {variant['width']}w"
+        )
+    return [
+        {"type": mime, "srcset": ", ".join(by_type[mime])}
+        for _, _, mime in FORMATS
+        if mime in by_type
+    ]
@@ -0,0 +1,141 @@
+"""Версии областей страниц и условные GET-запросы по ним.
+
+Область — то, от чего зависит страница: весь сайт («site»), группа,
+автор или пост. Версия области — время её последнего изменения в
+наносекундах; сигналы обновляют её при записи и ещё раз после коммита:
+страница, отрендеренная параллельным запросом до коммита, осталась бы
+в кэше под новой версией со старыми данными. ETag страницы считается
+по версиям её областей, адресу и пользователю, Last-Modified — по самой
+свежей версии, поэтому на повторный запрос браузера или CDN можно
+ответить 304, не выбирая посты и не рендеря шаблон. Анонимным
+посетителям без валидатора страница отдаётся из кэша страниц по тому
+же ETag.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import (
+    add_never_cache_headers,
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+
+from core import page_cache, replicas
+
+from .models import Post
+
+NANOSECONDS = 10 ** 9
+
+
+def _key(scope):
+    return f"page_version:{scope}"
+
+
+def _set(scopes):
+    now = time.time_ns()
+    cache.set_many({_key(scope): now for scope in scopes}, None)
+
+
+def bump(*scopes):
+    scopes = set(scopes)
+    _set(scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _set(scopes))
+
+
+def post_scopes(post_id, author_id, group_ids):
+    """Области, которые показывают пост: сайт, сам пост, автор, группы."""
+    scopes = ["site", f"post:{post_id}", f"author:{author_id}"]
+    scopes += [f"group:{group_id}" for group_id in group_ids if group_id]
+    return scopes
+
+
+def bump_post(post_id):
+    post = (
+        Post.objects.filter(pk=post_id)
+        .values("author_id", "group_id")
+        .first()
+    )
+    if post is not None:
+        bump(*post_scopes(post_id, post["author_id"], (post["group_id"],)))
+
+
+def get_many(scopes):
+    """Версии областей; потерянные (вытесненные) заводятся заново."""
+    keys = {_key(scope): scope for scope in scopes}
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def get(scope):
+    return get_many([scope])[scope]
+
+
+def _cache_policy(request, response):
+    patch_vary_headers(response, ("Cookie",))
+    if request.user.is_authenticated or request.META.get("CSRF_COOKIE_USED"):
+        # Страница зависит от сессии: хранить только браузеру
+        # и каждый раз сверять ETag.
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(
+            response, public=True, max_age=settings.PAGE_CACHE_MAX_AGE
+        )
+
+
+def conditional_page(scopes_func):
+    """Отдаёт 304 по версиям областей из scopes_func(request, ...).
+
+    scopes_func возвращает список областей или None, если страницы нет;
+    тогда view вызывается как обычно.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            scopes = scopes_func(request, *args, **kwargs)
+            if scopes is None:
+                return view(request, *args, **kwargs)
+            versions = get_many(scopes)
+            fingerprint = "{}|{}|{}".format(
+                request.get_full_path(),
+                request.user.pk,
+                sorted(versions.items()),
+            )
+            etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+            last_modified = max(versions.values()) // NANOSECONDS
+            # Реплика может ещё не видеть запись, сменившую версию:
+            # её рендер не должен жить ни в кэше, ни под этим ETag.
+            stale = replicas.may_be_stale(*versions.values())
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = page_cache.serve(
+                    request, view, args, kwargs, version=etag, store=not stale
+                )
+                if response.status_code != 200:
+                    return response
+                if stale and response.get("X-Page-Cache") != "hit":
+                    add_never_cache_headers(response)
+                    return response
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+            _cache_policy(request, response)
+            return response
+
+        return wrapper
+
+    return decorator
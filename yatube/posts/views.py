@@ -1,22 +1,100 @@
-from django.core.paginator import Paginator
+import io
+import json
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import transaction
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_POST
 from django.shortcuts import render, get_object_or_404
 from .models import Post, Group, User, Comment, Follow
+from .cards import CARD_TEMPLATE, render_cards
+from .counters import author_stats
+from .follow_graph import is_following
+from .follows import follow_many, unfollow_many, user_ids
+from .group_feed import first_page as group_first_page
+from .importing import import_records, read_records
 from .forms import PostForm, CommentForm
+from .paginators import (
+    FEED_ORDERING,
+    KeysetPaginator,
+    MergedKeysetPaginator,
+)
+from .search import get_backend
+from .timeline import TIMELINE_ORDERING, follow_feed
+from .versions import conditional_page
 from django.shortcuts import redirect
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
 
 
 NUMBER_OF_POSTS = 10
+MAX_BULK_FOLLOWS = 5000
+COMMENTS_PER_PAGE = 20
+COMMENT_ORDERING = ("created", "id")
+PROFILE_CARD_TEMPLATE = "posts/includes/profile_post_card.html"
+
+
+def get_page_obj(
+    request, post_list, ordering=FEED_ORDERING, card_template=CARD_TEMPLATE
+):
+    paginator = KeysetPaginator(
+        post_list.for_feed(), NUMBER_OF_POSTS, ordering
+    )
+    page_obj = paginator.get_page(request.GET.get("cursor"))
+    render_cards(page_obj, card_template)
+    return page_obj
+
+
+def get_comments_page(post_id, cursor):
+    """Страница комментариев поста по курсору, старые сначала.
+
+    Комментарии читаются через values(): вирусный пост листается
+    страницами по индексу (post, created) без создания моделей.
+    """
+    comments = Comment.objects.filter(post_id=post_id).values(
+        "id", "text", "created", "author__username"
+    )
+    paginator = KeysetPaginator(
+        comments, COMMENTS_PER_PAGE, COMMENT_ORDERING
+    )
+    return paginator.get_page(cursor)
+
+
+def _group_scopes(request, slug):
+    group_id = (
+        Group.objects.filter(slug=slug).values_list("id", flat=True).first()
+    )
+    return None if group_id is None else [f"group:{group_id}"]
+
+
+def _author_scopes(request, username):
+    author_id = (
+        User.objects.filter(username=username)
+        .values_list("id", flat=True)
+        .first()
+    )
+    return None if author_id is None else [f"author:{author_id}"]
 
 
-@cache_page(20)
+def _post_scopes(request, post_id):
+    author_id = (
+        Post.objects.filter(pk=post_id)
+        .values_list("author_id", flat=True)
+        .order_by()
+        .first()
+    )
+    if author_id is None:
+        return None
+    # Карточка автора на странице поста показывает число его постов.
+    return [f"post:{post_id}", f"author:{author_id}"]
+
+
+@conditional_page(lambda request: ["site"])
 def index(request):
     template = "posts/index.html"
     post_list = Post.objects.all()
-    paginator = Paginator(post_list, NUMBER_OF_POSTS)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = get_page_obj(request, post_list)
     context = {
         "page_obj": page_obj,
         "title": "Главная страница проекта YaTube",
@@ -24,12 +102,14 @@ def index(request):
     return render(request, template, context)
 
 
+@conditional_page(_group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, NUMBER_OF_POSTS)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    if request.GET.get("cursor"):
+        page_obj = get_page_obj(request, group.posts.all())
+    else:
+        page_obj = group_first_page(group, NUMBER_OF_POSTS)
+        render_cards(page_obj)
     context = {
         "group": group,
         "page_obj": page_obj,
@@ -37,36 +117,41 @@ def group_posts(request, slug):
     return render(request, "posts/group_list.html", context)
 
 
+@conditional_page(_author_scopes)
 def profile(request, username):
     template = "posts/profile.html"
-    author = User.objects.get(username=username)
+    author = User.objects.select_related("stats").get(username=username)
     user = request.user
+    stats = author_stats(author)
     post_list = Post.objects.filter(author=author)
-    paginator = Paginator(post_list, NUMBER_OF_POSTS)
-    post_count = post_list.count()
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
-    following = (
-        not request.user.is_anonymous
-        and author.following.filter(user=user, author=author).exists()
+    page_obj = get_page_obj(
+        request, post_list, card_template=PROFILE_CARD_TEMPLATE
+    )
+    following = not request.user.is_anonymous and is_following(
+        user.id, author.id
     )
     context = {
         "page_obj": page_obj,
         "title": f"Профайл пользователя {username}",
         "author": author,
-        "post_count": post_count,
+        "post_count": stats.post_count,
+        "follower_count": stats.follower_count,
+        "following_count": stats.following_count,
         "following": following,
     }
     return render(request, template, context)
 
 
+@conditional_page(_post_scopes)
 def post_detail(request, post_id):
     template = "posts/post_detail.html"
-    post = Post.objects.get(id=post_id)
+    post = Post.objects.select_related("author__stats", "group").get(
+        id=post_id
+    )
     group = post.group
     title = post.text[:29]
-    post_count = Post.objects.filter(author=post.author).count()
-    comments = Comment.objects.filter(post_id=post_id)
+    post_count = author_stats(post.author).post_count
+    comments = get_comments_page(post_id, request.GET.get("comments"))
     form = CommentForm(
         request.POST or None,
     )
@@ -82,7 +167,52 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+def post_comments(request, post_id):
+    """Следующая страница комментариев: HTML-фрагмент или JSON."""
+    comments = get_comments_page(post_id, request.GET.get("cursor"))
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        raise Http404("Пост не найден")
+    if request.GET.get("format") == "json":
+        return JsonResponse(
+            {
+                "comments": [
+                    {
+                        "id": comment["id"],
+                        "author": comment["author__username"],
+                        "text": comment["text"],
+                        "created": comment["created"],
+                    }
+                    for comment in comments
+                ],
+                "next_cursor": comments.next_cursor,
+            }
+        )
+    return render(
+        request,
+        "posts/includes/comments.html",
+        {"comments": comments, "post_id": post_id},
+    )
+
+
+def search(request):
+    template = "posts/search.html"
+    query = request.GET.get("q", "").strip()
+    page_obj = None
+    if query:
+        backend = get_backend()
+        post_list = backend.search(Post.objects.all(), query)
+        page_obj = get_page_obj(request, post_list, backend.ordering)
+    context = {
+        "page_obj": page_obj,
+        "query": query,
+        "page_query": urlencode({"q": query}) + "&",
+        "title": f"Поиск: {query}" if query else "Поиск",
+    }
+    return render(request, template, context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -103,6 +233,7 @@ def post_create(request):
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     post = Post.objects.get(pk=post_id)
     form = PostForm(
@@ -124,6 +255,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -138,17 +270,13 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     template = "posts/follow.html"
-    user = request.user
-    bloggers_id = (
-        Follow.objects.select_related("author_id")
-        .filter(user=user)
-        .values_list("author_id", flat=True)
+    paginator = MergedKeysetPaginator(
+        [posts.for_feed() for posts in follow_feed(request.user)],
+        NUMBER_OF_POSTS,
+        TIMELINE_ORDERING,
     )
-
-    post_list = Post.objects.filter(author_id__in=bloggers_id)
-    paginator = Paginator(post_list, NUMBER_OF_POSTS)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginator.get_page(request.GET.get("cursor"))
+    render_cards(page_obj, CARD_TEMPLATE)
     context = {
         "page_obj": page_obj,
         "title": "Cтраница избранных блоггеров YaTube",
@@ -157,6 +285,7 @@ def follow_index(request):
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
@@ -165,7 +294,81 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect("posts:follow_index")
+
+
+@login_required
+@require_POST
+def follow_bulk(request):
+    """Подписка и отписка пачкой: {"follow": [имена], "unfollow": [...]}."""
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return JsonResponse({"detail": "Ожидается JSON-объект"}, status=400)
+    follow = data.get("follow", [])
+    unfollow = data.get("unfollow", [])
+    if not all(
+        isinstance(names, list)
+        and all(isinstance(name, str) for name in names)
+        for names in (follow, unfollow)
+    ):
+        return JsonResponse(
+            {"detail": "follow и unfollow должны быть списками имён"},
+            status=400,
+        )
+    if len(follow) + len(unfollow) > MAX_BULK_FOLLOWS:
+        return JsonResponse(
+            {"detail": f"Не больше {MAX_BULK_FOLLOWS} имён за запрос"},
+            status=400,
+        )
+    ids = user_ids(follow + unfollow)
+    followed = follow_many(
+        (request.user.id, ids[name]) for name in follow if name in ids
+    )
+    unfollowed = unfollow_many(
+        request.user.id, [ids[name] for name in unfollow if name in ids]
+    )
+    return JsonResponse(
+        {
+            "followed": followed,
+            "unfollowed": unfollowed,
+            "unknown": sorted(
+                set(follow + unfollow) - set(ids)
+            ),
+        }
+    )
+
+
+@staff_member_required
+@require_POST
+def post_import(request):
+    """Загрузка файла постов (JSON Lines или CSV) для сотрудников."""
+    upload = request.FILES.get("file")
+    if upload is None:
+        return JsonResponse({"detail": "Нет файла file"}, status=400)
+    format_ = request.POST.get("format") or (
+        "csv" if upload.name.endswith(".csv") else "jsonl"
+    )
+    if format_ not in ("csv", "jsonl"):
+        return JsonResponse(
+            {"detail": f"Неизвестный формат {format_}"}, status=400
+        )
+    try:
+        with io.TextIOWrapper(upload, encoding="utf-8", newline="") as file_:
+            stats = import_records(
+                read_records(file_, format_),
+                images_dir=getattr(settings, "POST_IMPORT_IMAGES_DIR", None),
+            )
+    except UnicodeDecodeError:
+        return JsonResponse({"detail": "Файл не в UTF-8"}, status=400)
+    stats["errors"] = [
+        {"line": line, "message": message}
+        for line, message in stats["errors"]
+    ]
+    return JsonResponse(stats)
@@ -0,0 +1,15 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 has no ASGI handler of its own, so requests are served by the
+WSGI handler in a thread pool, see core/asgi.py.
+"""
+
+import os
+
+from core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
+
+application = get_asgi_application()
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from .database import databases
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -50,6 +52,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
+    "core.replicas.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -86,12 +90,19 @@ WSGI_APPLICATION = "yatube.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
-    }
-}
+# Берутся из окружения, см. yatube/database.py: DATABASE_URL,
+# DATABASE_REPLICA_URLS, DB_CONN_MAX_AGE, DB_HEALTH_CHECKS, DB_POOL_SIZE.
+# Без переменных — db.sqlite3 рядом с manage.py и постоянные соединения.
+DATABASES = databases(os.environ, BASE_DIR)
+
+# Алиасы DATABASES, с которых читают безопасные запросы; записи идут
+# в default. Локально реплику можно изобразить копией файла SQLite:
+# DATABASE_REPLICA_URLS=sqlite:///db.replica.sqlite3.
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["core.replicas.ReplicaRouter"]
+# Сколько секунд после записи пользователь читает только default,
+# чтобы видеть свои изменения, пока реплики отстают.
+REPLICA_STICKY_SECONDS = 5
 
 
 # Password validation
@@ -146,8 +157,54 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 CSRF_FAILURE_VIEW = "core.views.csrf_failure"
 
+TEST_RUNNER = "core.test_runner.TestRunner"
+
+# Кэш в файлах SQLite общий для всех воркеров и переживает перезапуск.
+# Тесты переносят его во временный каталог (core.test_runner).
+CACHE_DIR = os.environ.get("YATUBE_CACHE_DIR", os.path.join(BASE_DIR, "cache"))
+
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-    }
+        "BACKEND": "core.cache.SQLiteCache",
+        "LOCATION": os.path.join(CACHE_DIR, "default.sqlite3"),
+        "OPTIONS": {"MAX_ENTRIES": 100000, "MAX_SIZE": 256 * 2 ** 20},
+    },
+    # Отдельно, чтобы карточки и страницы не вытесняли поиск миниатюр.
+    "thumbnails": {
+        "BACKEND": "core.cache.SQLiteCache",
+        "LOCATION": os.path.join(CACHE_DIR, "thumbnails.sqlite3"),
+        "TIMEOUT": None,
+        "OPTIONS": {"MAX_ENTRIES": 1000000, "MAX_SIZE": 128 * 2 ** 20},
+    },
 }
+THUMBNAIL_CACHE = "thumbnails"
+
+# Авторы с большим числом подписчиков не раскладываются по лентам
+# при публикации, их посты подмешиваются в /follow/ при чтении.
+TIMELINE_FANOUT_LIMIT = 10000
+# Сколько последних постов такого автора раскладывается подписчикам,
+# когда после отписок он снова укладывается в предел.
+TIMELINE_BACKFILL_POSTS = 500
+
+# Запросы дольше этого (в мс) пишутся в журнал core.metrics вместе с SQL;
+# None — не писать.
+METRICS_SLOW_REQUEST_MS = 500
+
+# Потоки, готовящие миниатюры картинок постов; 0 — готовить сразу.
+THUMBNAIL_WORKERS = 2
+
+# Сколько секунд браузер и CDN могут не сверять страницу анонимного
+# посетителя; страницы пользователей сверяются по ETag всегда.
+PAGE_CACHE_MAX_AGE = 20
+
+# Сколько секунд хранится HTML страницы для анонимных посетителей;
+# страницы лент и постов к тому же сбрасываются версиями при записи.
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Каталог на сервере, откуда загрузка постов через /import/ берёт
+# картинки из поля image; None — записи с картинками отклоняются.
+POST_IMPORT_IMAGES_DIR = None
+
+# Потоки, в которых yatube/asgi.py выполняет запросы; медленные клиенты
+# ждут в цикле событий и потоков не занимают.
+ASGI_THREADS = 8
@@ -3,6 +3,8 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import metrics_view
+
 urlpatterns = [
     path("", include(("posts.urls", "posts"), namespace="posts")),
     path("", include(("posts.urls", "group"), namespace="group")),
@@ -10,6 +12,8 @@ urlpatterns = [
     path("auth/", include("users.urls", namespace="users")),
     path("auth/", include("django.contrib.auth.urls")),
     path("about/", include("about.urls", namespace="about")),
+    path("api/v1/", include("posts.api_urls", namespace="api")),
+    path("metrics", metrics_view, name="metrics"),
 ]
 
 handler404 = "core.views.page_not_found"